@@ -0,0 +1,11 @@
+"""
+E2E бенчмарки MCP сервера.
+
+Запуск (под Xvfb):
+    make bench-e2e
+или
+    xvfb-run -a python3 -m pytest benchmarks/ -q
+
+Результаты сохраняются в JSON (см. benchmarks/conftest.py) и сравниваются
+между сборками через `python3 -m benchmarks.compare base.json new.json`.
+"""
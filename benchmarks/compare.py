@@ -0,0 +1,79 @@
+"""
+Сравнение двух JSON с результатами бенчмарков.
+
+    python3 -m benchmarks.compare base.json new.json [--threshold 0.10]
+
+Код возврата 1, если p95 задержки выросла или пропускная способность
+упала больше чем на threshold (доля, по умолчанию 10%) — для гейта релизов.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(base: dict, new: dict, threshold: float) -> list:
+    """Список строк-регрессий (пустой, если регрессий нет)"""
+    regressions = []
+
+    for key, base_stats in sorted(base.get("latency", {}).items()):
+        new_stats = new.get("latency", {}).get(key)
+        if not new_stats or not base_stats.get("p95_ms"):
+            continue
+        change = new_stats["p95_ms"] / base_stats["p95_ms"] - 1.0
+        line = f"latency  {key:40s} p95 {base_stats['p95_ms']:9.2f} -> {new_stats['p95_ms']:9.2f} ms ({change:+.1%})"
+        print(line)
+        if change > threshold:
+            regressions.append(line)
+
+    for key, base_stats in sorted(base.get("throughput", {}).items()):
+        new_stats = new.get("throughput", {}).get(key)
+        if not new_stats or not base_stats.get("calls_per_s"):
+            continue
+        change = new_stats["calls_per_s"] / base_stats["calls_per_s"] - 1.0
+        line = f"through  {key:40s} {base_stats['calls_per_s']:9.1f} -> {new_stats['calls_per_s']:9.1f} calls/s ({change:+.1%})"
+        print(line)
+        if -change > threshold:
+            regressions.append(line)
+
+    base_rss = [s["rss_kb"] for s in base.get("rss", [])]
+    new_rss = [s["rss_kb"] for s in new.get("rss", [])]
+    if base_rss and new_rss:
+        change = max(new_rss) / max(base_rss) - 1.0
+        line = f"rss      {'peak':40s} {max(base_rss):9d} -> {max(new_rss):9d} KiB ({change:+.1%})"
+        print(line)
+        if change > threshold:
+            regressions.append(line)
+
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare MCP server benchmark results")
+    parser.add_argument("base", help="Baseline results JSON")
+    parser.add_argument("new", help="New results JSON")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Allowed relative regression (default: 0.10)",
+    )
+    args = parser.parse_args(argv)
+
+    regressions = compare(_load(args.base), _load(args.new), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Pytest fixtures для E2E бенчмарков MCP сервера.
+
+Переменные окружения:
+- BENCH_ITERATIONS: число измерений на tool (по умолчанию 200)
+- BENCH_WARMUP: число прогревочных вызовов (по умолчанию 10)
+- BENCH_OUTPUT: путь к JSON с результатами
+  (по умолчанию benchmarks/results/bench-<timestamp>.json)
+"""
+
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from typing import Callable, Generator, List, Optional
+
+import pytest
+
+from tests.mcp_client import MCPClient, get_default_server_path
+
+
+ITERATIONS = int(os.environ.get("BENCH_ITERATIONS", "200"))
+WARMUP = int(os.environ.get("BENCH_WARMUP", "10"))
+RSS_SAMPLE_INTERVAL = 0.5
+
+
+# ==================== Статистика ====================
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Перцентиль методом nearest-rank по отсортированному списку"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_stats(samples_ms: List[float]) -> dict:
+    """Сводка по задержкам в миллисекундах"""
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "min_ms": ordered[0] if ordered else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+    }
+
+
+# ==================== RSS сервера ====================
+
+
+def read_rss_kb(pid: int) -> Optional[int]:
+    """VmRSS процесса в KiB из /proc (только Linux)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class RSSSampler:
+    """Фоновый поток, периодически снимающий RSS процесса сервера"""
+
+    def __init__(self, pid: int, interval: float = RSS_SAMPLE_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started_at = time.monotonic()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=self.interval * 2)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = read_rss_kb(self.pid)
+            if rss is not None:
+                self.samples.append(
+                    {"t_s": round(time.monotonic() - self._started_at, 3), "rss_kb": rss}
+                )
+            self._stop.wait(self.interval)
+
+
+# ==================== Результаты ====================
+
+
+class BenchResults:
+    """Накопитель результатов, сохраняемых в JSON в конце сессии"""
+
+    def __init__(self):
+        self.latency: dict = {}
+        self.throughput: dict = {}
+        self.payload: dict = {}
+        self.rss: List[dict] = []
+        self.meta: dict = {}
+
+    def to_dict(self) -> dict:
+        return {
+            "meta": self.meta,
+            "latency": self.latency,
+            "throughput": self.throughput,
+            "payload": self.payload,
+            "rss": self.rss,
+        }
+
+
+def _git_revision() -> str:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except Exception:
+        return "unknown"
+
+
+def _default_output_path() -> str:
+    bench_dir = os.path.dirname(os.path.abspath(__file__))
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(bench_dir, "results", f"bench-{stamp}.json")
+
+
+# ==================== Fixtures ====================
+
+
+@pytest.fixture(scope="session")
+def server_path() -> str:
+    """Путь к исполняемому файлу MCP сервера"""
+    path = get_default_server_path()
+    if not os.path.exists(path):
+        pytest.skip(f"MCP server binary not found at: {path}")
+    return path
+
+
+@pytest.fixture(scope="session")
+def bench_results() -> Generator[BenchResults, None, None]:
+    """Результаты всей сессии; записываются в BENCH_OUTPUT при завершении"""
+    results = BenchResults()
+    results.meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": _git_revision(),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "iterations": ITERATIONS,
+        "warmup": WARMUP,
+    }
+
+    yield results
+
+    output = os.environ.get("BENCH_OUTPUT") or _default_output_path()
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results.to_dict(), f, indent=2, sort_keys=True)
+    print(f"\nBenchmark results written to {output}")
+
+
+@pytest.fixture(scope="session")
+def bench_client(
+    server_path: str, bench_results: BenchResults
+) -> Generator[MCPClient, None, None]:
+    """MCP клиент на всю сессию; RSS сервера снимается всё время его жизни"""
+    client = MCPClient(server_path, timeout=60.0)
+    client.start()
+
+    sampler = RSSSampler(client.process.pid)
+    sampler.start()
+
+    info = client.call_tool("system_get_info")
+    if info.success and isinstance(info.content, dict):
+        bench_results.meta["robotgo_version"] = info.content.get("version")
+
+    yield client
+
+    sampler.stop()
+    bench_results.rss = sampler.samples
+    client.stop()
+
+
+@pytest.fixture
+def bench(bench_client: MCPClient) -> Callable:
+    """
+    Измерить задержку вызова tool (в стиле pytest-benchmark).
+
+    Использование:
+        stats = bench("mouse_get_position", {})
+    """
+
+    def run(name: str, arguments: Optional[dict] = None, iterations: int = ITERATIONS):
+        for _ in range(WARMUP):
+            result = bench_client.call_tool(name, arguments)
+            assert result.success, f"{name} failed during warmup: {result.error}"
+
+        samples = []
+        last = None
+        for _ in range(iterations):
+            start = time.perf_counter()
+            last = bench_client.call_tool(name, arguments)
+            samples.append((time.perf_counter() - start) * 1000.0)
+            assert last.success, f"{name} failed: {last.error}"
+
+        return latency_stats(samples), last
+
+    return run
+
+
+# ==================== Pytest Hooks ====================
+
+
+def pytest_collection_modifyitems(config, items):
+    """Бенчмарки вызывают GUI tools, поэтому без DISPLAY пропускаются"""
+    if not os.environ.get("DISPLAY"):
+        skip_gui = pytest.mark.skip(reason="No DISPLAY environment variable")
+        for item in items:
+            item.add_marker(skip_gui)
@@ -0,0 +1,64 @@
+"""
+Задержка (p50/p95/p99) последовательных вызовов tools и размер скриншотов.
+"""
+
+import base64
+import json
+
+import pytest
+
+from .conftest import BenchResults
+
+
+# (ключ результата, tool, аргументы)
+LATENCY_CASES = [
+    ("mouse_get_position", "mouse_get_position", {}),
+    ("mouse_move", "mouse_move", {"x": 100, "y": 100}),
+    ("screen_get_size", "screen_get_size", {}),
+    ("screen_get_pixel_color", "screen_get_pixel_color", {"x": 10, "y": 10}),
+    ("window_get_active", "window_get_active", {}),
+    ("process_list", "process_list", {}),
+    ("process_find_by_name", "process_find_by_name", {"name": "python"}),
+    ("system_get_info", "system_get_info", {}),
+    ("util_sleep_0", "util_sleep", {"milliseconds": 0}),
+]
+
+SCREENSHOT_CASES = [
+    ("screen_capture_full", {}),
+    ("screen_capture_region_400x300", {"x": 0, "y": 0, "width": 400, "height": 300}),
+    (
+        "screen_capture_annotated",
+        {"show_cursor": True, "show_grid": True, "show_rulers": True},
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "key,tool,arguments", LATENCY_CASES, ids=[c[0] for c in LATENCY_CASES]
+)
+def test_tool_latency(bench, bench_results: BenchResults, key, tool, arguments):
+    """Последовательная задержка одного tool"""
+    stats, last = bench(tool, arguments)
+
+    response_bytes = len(json.dumps(last.raw_response))
+    stats["response_bytes"] = response_bytes
+    bench_results.latency[key] = stats
+
+
+@pytest.mark.parametrize(
+    "key,arguments", SCREENSHOT_CASES, ids=[c[0] for c in SCREENSHOT_CASES]
+)
+def test_screenshot_latency_and_size(bench, bench_results: BenchResults, key, arguments):
+    """Задержка screen_capture и байты на вызов (PNG и base64 в ответе)"""
+    stats, last = bench("screen_capture", arguments, iterations=50)
+
+    content = last.content
+    assert isinstance(content, dict) and content.get("type") == "image"
+
+    data = content["data"]
+    bench_results.latency[key] = stats
+    bench_results.payload[key] = {
+        "png_bytes": len(base64.b64decode(data)),
+        "base64_bytes": len(data),
+        "response_bytes": len(json.dumps(last.raw_response)),
+    }
@@ -0,0 +1,64 @@
+"""
+Пропускная способность при 1/4/16 одновременных вызывающих.
+
+Все потоки используют один MCPClient (один процесс сервера) — ответы
+сопоставляются по JSON-RPC id.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tests.mcp_client import MCPClient
+
+from .conftest import ITERATIONS, BenchResults, latency_stats
+
+
+THROUGHPUT_TOOLS = [
+    ("mouse_get_position", {}),
+    ("screen_get_pixel_color", {"x": 10, "y": 10}),
+    ("screen_capture_region_400x300", {"x": 0, "y": 0, "width": 400, "height": 300}),
+]
+
+TOOL_NAMES = {"screen_capture_region_400x300": "screen_capture"}
+
+
+def _worker(client: MCPClient, tool: str, arguments: dict, calls: int) -> list:
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        result = client.call_tool(tool, arguments)
+        samples.append((time.perf_counter() - start) * 1000.0)
+        assert result.success, f"{tool} failed: {result.error}"
+    return samples
+
+
+@pytest.mark.parametrize("concurrency", [1, 4, 16])
+@pytest.mark.parametrize(
+    "key,arguments", THROUGHPUT_TOOLS, ids=[t[0] for t in THROUGHPUT_TOOLS]
+)
+def test_throughput(
+    bench_client: MCPClient, bench_results: BenchResults, key, arguments, concurrency
+):
+    """Вызовы в секунду и задержки при N параллельных вызывающих"""
+    tool = TOOL_NAMES.get(key, key)
+    calls_per_worker = max(1, ITERATIONS // concurrency)
+
+    # Прогрев
+    _worker(bench_client, tool, arguments, 5)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(_worker, bench_client, tool, arguments, calls_per_worker)
+            for _ in range(concurrency)
+        ]
+        samples = [s for f in futures for s in f.result()]
+    elapsed = time.perf_counter() - start
+
+    stats = latency_stats(samples)
+    stats["concurrency"] = concurrency
+    stats["calls_per_s"] = len(samples) / elapsed if elapsed > 0 else 0.0
+
+    bench_results.throughput[f"{key}@{concurrency}"] = stats
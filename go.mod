@@ -5,8 +5,11 @@ go 1.24.0
 toolchain go1.24.11
 
 require (
+	github.com/godbus/dbus/v5 v5.2.0
 	github.com/hightemp/robotgo v0.0.0-20260321112049-06deeb449baa
+	github.com/jezek/xgb v1.2.0
 	github.com/mark3labs/mcp-go v0.31.0
+	golang.org/x/sys v0.38.0
 )
 
 require (
@@ -15,9 +18,7 @@ require (
 	github.com/gen2brain/shm v0.1.1 // indirect
 	github.com/go-ole/go-ole v1.3.0 // indirect
 	github.com/go-vgo/robotgo v1.0.0 // indirect
-	github.com/godbus/dbus/v5 v5.2.0 // indirect
 	github.com/google/uuid v1.6.0 // indirect
-	github.com/jezek/xgb v1.2.0 // indirect
 	github.com/lufia/plan9stats v0.0.0-20251013123823-9fd1530e3ec3 // indirect
 	github.com/otiai10/gosseract/v2 v2.4.1 // indirect
 	github.com/power-devops/perfstat v0.0.0-20240221224432-82ca36839d55 // indirect
@@ -37,5 +38,4 @@ require (
 	github.com/yusufpapurcu/wmi v1.2.4 // indirect
 	golang.org/x/exp v0.0.0-20251125195548-87e1e737ad39 // indirect
 	golang.org/x/image v0.33.0 // indirect
-	golang.org/x/sys v0.38.0 // indirect
 )
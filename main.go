@@ -4,19 +4,40 @@ import (
 	"bytes"
 	"context"
 	"encoding/base64"
+	"encoding/hex"
 	"encoding/json"
+	"errors"
 	"flag"
 	"fmt"
 	stdImage "image"
 	"image/png"
+	"io"
 	"log"
+	"math"
+	"math/rand"
+	"net"
+	"net/http"
+	"net/http/pprof"
 	"os"
 	"os/exec"
+	"os/user"
+	"path"
+	"path/filepath"
+	"regexp"
 	"runtime"
+	"sort"
+	"strconv"
 	"strings"
 	"sync"
+	"syscall"
+	"time"
+	"unicode/utf8"
 
+	"github.com/godbus/dbus/v5"
 	"github.com/hightemp/robotgo"
+	"github.com/jezek/xgb"
+	"github.com/jezek/xgb/composite"
+	"github.com/jezek/xgb/xproto"
 	"github.com/mark3labs/mcp-go/mcp"
 	"github.com/mark3labs/mcp-go/server"
 )
@@ -30,6 +51,10 @@ const ServerName = "go_computer_use_mcp_server"
 // Falls back to "dev" when built without the flag (e.g. go run .).
 var ServerVersion = "dev"
 
+// prettyJSON включает форматированный (indent) вывод JSON в ответах tools.
+// Устанавливается один раз флагом -pretty при старте и дальше только читается.
+var prettyJSON bool
+
 // ==================== DISPLAY CHECK ====================
 
 var (
@@ -87,13 +112,685 @@ func withDisplayCheck(handler server.ToolHandlerFunc) server.ToolHandlerFunc {
 	}
 }
 
-// Helper function to create JSON response
-func jsonResponse(data interface{}) string {
-	jsonBytes, err := json.MarshalIndent(data, "", "  ")
+// ==================== METRICS ====================
+
+// Метрики вызовов tools в формате Prometheus text exposition (0.0.4).
+// Собираются middleware withMetrics для всех зарегистрированных tools и
+// отдаются на /metrics SSE-транспорта.
+
+// Границы бакетов длительности вызова, секунды
+var toolDurationBuckets = []float64{0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30}
+
+// Границы бакетов размера ответа, байты
+var toolResponseBytesBuckets = []float64{64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216}
+
+type histogram struct {
+	bounds []float64
+	counts []uint64 // counts[i] — наблюдения <= bounds[i]; последний — +Inf
+	sum    float64
+	count  uint64
+}
+
+func newHistogram(bounds []float64) histogram {
+	return histogram{bounds: bounds, counts: make([]uint64, len(bounds)+1)}
+}
+
+func (h *histogram) observe(v float64) {
+	i := sort.SearchFloat64s(h.bounds, v)
+	h.counts[i]++
+	h.sum += v
+	h.count++
+}
+
+type toolMetrics struct {
+	calls         uint64
+	errors        uint64
+	inFlight      int64
+	duration      histogram
+	responseBytes histogram
+}
+
+type metricsRegistry struct {
+	mu    sync.Mutex
+	tools map[string]*toolMetrics
+}
+
+var toolMetricsRegistry = &metricsRegistry{tools: make(map[string]*toolMetrics)}
+
+// get возвращает метрики tool, создавая их при первом вызове (mu должен быть захвачен)
+func (r *metricsRegistry) get(tool string) *toolMetrics {
+	m, ok := r.tools[tool]
+	if !ok {
+		m = &toolMetrics{
+			duration:      newHistogram(toolDurationBuckets),
+			responseBytes: newHistogram(toolResponseBytesBuckets),
+		}
+		r.tools[tool] = m
+	}
+	return m
+}
+
+func (r *metricsRegistry) begin(tool string) {
+	r.mu.Lock()
+	m := r.get(tool)
+	m.calls++
+	m.inFlight++
+	r.mu.Unlock()
+}
+
+func (r *metricsRegistry) end(tool string, duration time.Duration, responseBytes int, failed bool) {
+	r.mu.Lock()
+	m := r.get(tool)
+	m.inFlight--
+	if failed {
+		m.errors++
+	}
+	m.duration.observe(duration.Seconds())
+	m.responseBytes.observe(float64(responseBytes))
+	r.mu.Unlock()
+}
+
+// resultSize — размер полезной нагрузки ответа (текст и base64 данные)
+func resultSize(result *mcp.CallToolResult) int {
+	if result == nil {
+		return 0
+	}
+	size := 0
+	for _, content := range result.Content {
+		switch c := content.(type) {
+		case mcp.TextContent:
+			size += len(c.Text)
+		case *mcp.TextContent:
+			size += len(c.Text)
+		case mcp.ImageContent:
+			size += len(c.Data)
+		case *mcp.ImageContent:
+			size += len(c.Data)
+		}
+	}
+	return size
+}
+
+// withMetrics — middleware, считающий вызовы, ошибки, длительность и размер ответа
+func withMetrics(handler server.ToolHandlerFunc) server.ToolHandlerFunc {
+	return func(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+		tool := request.Params.Name
+		start := time.Now()
+		toolMetricsRegistry.begin(tool)
+
+		result, err := handler(ctx, request)
+
+		failed := err != nil || (result != nil && result.IsError)
+		toolMetricsRegistry.end(tool, time.Since(start), resultSize(result), failed)
+		return result, err
+	}
+}
+
+var prometheusLabelEscaper = strings.NewReplacer(`\`, `\\`, `"`, `\"`, "\n", `\n`)
+
+func writeHistogram(b *strings.Builder, name, tool string, h *histogram) {
+	label := prometheusLabelEscaper.Replace(tool)
+	var cumulative uint64
+	for i, bound := range h.bounds {
+		cumulative += h.counts[i]
+		fmt.Fprintf(b, "%s_bucket{tool=\"%s\",le=\"%s\"} %d\n", name, label, strconv.FormatFloat(bound, 'f', -1, 64), cumulative)
+	}
+	cumulative += h.counts[len(h.bounds)]
+	fmt.Fprintf(b, "%s_bucket{tool=\"%s\",le=\"+Inf\"} %d\n", name, label, cumulative)
+	fmt.Fprintf(b, "%s_sum{tool=\"%s\"} %s\n", name, label, strconv.FormatFloat(h.sum, 'g', -1, 64))
+	fmt.Fprintf(b, "%s_count{tool=\"%s\"} %d\n", name, label, h.count)
+}
+
+// writePrometheus сериализует все метрики в текстовый формат Prometheus
+func (r *metricsRegistry) writePrometheus(b *strings.Builder) {
+	r.mu.Lock()
+	defer r.mu.Unlock()
+
+	tools := make([]string, 0, len(r.tools))
+	for tool := range r.tools {
+		tools = append(tools, tool)
+	}
+	sort.Strings(tools)
+
+	b.WriteString("# HELP mcp_tool_calls_total Total number of tool calls.\n# TYPE mcp_tool_calls_total counter\n")
+	for _, tool := range tools {
+		fmt.Fprintf(b, "mcp_tool_calls_total{tool=\"%s\"} %d\n", prometheusLabelEscaper.Replace(tool), r.tools[tool].calls)
+	}
+	b.WriteString("# HELP mcp_tool_errors_total Total number of failed tool calls.\n# TYPE mcp_tool_errors_total counter\n")
+	for _, tool := range tools {
+		fmt.Fprintf(b, "mcp_tool_errors_total{tool=\"%s\"} %d\n", prometheusLabelEscaper.Replace(tool), r.tools[tool].errors)
+	}
+	b.WriteString("# HELP mcp_tool_in_flight Number of tool calls currently executing.\n# TYPE mcp_tool_in_flight gauge\n")
+	for _, tool := range tools {
+		fmt.Fprintf(b, "mcp_tool_in_flight{tool=\"%s\"} %d\n", prometheusLabelEscaper.Replace(tool), r.tools[tool].inFlight)
+	}
+	b.WriteString("# HELP mcp_tool_duration_seconds Tool call latency in seconds.\n# TYPE mcp_tool_duration_seconds histogram\n")
+	for _, tool := range tools {
+		writeHistogram(b, "mcp_tool_duration_seconds", tool, &r.tools[tool].duration)
+	}
+	b.WriteString("# HELP mcp_tool_response_bytes Size of tool response payload (text and base64 image data) in bytes.\n# TYPE mcp_tool_response_bytes histogram\n")
+	for _, tool := range tools {
+		writeHistogram(b, "mcp_tool_response_bytes", tool, &r.tools[tool].responseBytes)
+	}
+}
+
+// metricsHandler отдаёт метрики на /metrics
+func metricsHandler(w http.ResponseWriter, r *http.Request) {
+	var b strings.Builder
+	toolMetricsRegistry.writePrometheus(&b)
+	w.Header().Set("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+	_, _ = w.Write([]byte(b.String()))
+}
+
+// ==================== REQUEST TIMING ====================
+
+// Opt-in блок _meta.timing в CallToolResult: время получения запроса
+// сервером, ожидание до запуска handler'а, длительность handler'а и фазы
+// (capture/encode и т.п. — из startSpan). Включается флагом -timing для всех
+// вызовов или на один вызов через _meta: {"timing": true} в запросе.
+
+// timingEnabled устанавливается флагом -timing при старте
+var timingEnabled bool
+
+// Служебные ключи, которые hook annotateToolRequest добавляет в
+// request.Params.Meta.AdditionalFields: mcp-go не передаёт JSON-RPC id и
+// время получения в handler, а hook видит и то, и другое
+const (
+	metaRequestIDKey  = "_server_request_id"
+	metaReceivedAtKey = "_server_received_at"
+)
+
+type requestTiming struct {
+	mu     sync.Mutex
+	phases map[string]float64 // миллисекунды; повторные фазы суммируются
+}
+
+type requestTimingContextKey struct{}
+
+func (t *requestTiming) addPhase(name string, d time.Duration) {
+	t.mu.Lock()
+	if t.phases == nil {
+		t.phases = make(map[string]float64)
+	}
+	t.phases[name] += durationMs(d)
+	t.mu.Unlock()
+}
+
+func durationMs(d time.Duration) float64 {
+	return float64(d.Microseconds()) / 1000
+}
+
+// requestIDString приводит JSON-RPC id к строке (число и строка дают один вид)
+func requestIDString(id interface{}) string {
+	if v, ok := id.(interface{ Value() interface{} }); ok {
+		id = v.Value()
+	}
+	switch v := id.(type) {
+	case nil:
+		return ""
+	case string:
+		return v
+	case float64:
+		return strconv.FormatFloat(v, 'f', -1, 64)
+	default:
+		return fmt.Sprint(v)
+	}
+}
+
+// annotateToolRequest — hook BeforeCallTool: запоминает id и время получения
+// запроса в его _meta, откуда их читают middleware
+func annotateToolRequest(ctx context.Context, id interface{}, message *mcp.CallToolRequest) {
+	if message.Params.Meta == nil {
+		message.Params.Meta = &mcp.Meta{}
+	}
+	if message.Params.Meta.AdditionalFields == nil {
+		message.Params.Meta.AdditionalFields = make(map[string]interface{})
+	}
+	message.Params.Meta.AdditionalFields[metaRequestIDKey] = requestIDString(id)
+	message.Params.Meta.AdditionalFields[metaReceivedAtKey] = time.Now()
+}
+
+// requestMetaField возвращает поле из _meta запроса
+func requestMetaField(request mcp.CallToolRequest, key string) (interface{}, bool) {
+	if request.Params.Meta == nil {
+		return nil, false
+	}
+	v, ok := request.Params.Meta.AdditionalFields[key]
+	return v, ok
+}
+
+func timingRequested(request mcp.CallToolRequest) bool {
+	if timingEnabled {
+		return true
+	}
+	v, _ := requestMetaField(request, "timing")
+	requested, _ := v.(bool)
+	return requested
+}
+
+// withTiming — middleware, добавляющий _meta.timing в результат
+func withTiming(handler server.ToolHandlerFunc) server.ToolHandlerFunc {
+	return func(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+		if !timingRequested(request) {
+			return handler(ctx, request)
+		}
+
+		start := time.Now()
+		received := start
+		if v, ok := requestMetaField(request, metaReceivedAtKey); ok {
+			if t, ok := v.(time.Time); ok {
+				received = t
+			}
+		}
+
+		timing := &requestTiming{}
+		result, err := handler(context.WithValue(ctx, requestTimingContextKey{}, timing), request)
+		if result == nil {
+			return result, err
+		}
+
+		timing.mu.Lock()
+		phases := timing.phases
+		timing.mu.Unlock()
+
+		if result.Meta == nil {
+			result.Meta = make(map[string]interface{})
+		}
+		result.Meta["timing"] = map[string]interface{}{
+			"server_received_unix_ms": float64(received.UnixMicro()) / 1000,
+			"queue_wait_ms":           durationMs(start.Sub(received)),
+			"handler_ms":              durationMs(time.Since(start)),
+			"phases_ms":               phases,
+		}
+		return result, err
+	}
+}
+
+// ==================== CANCELLATION ====================
+
+// Длительные tools (печать, плавный скролл, sleep, process_run) проверяют ctx
+// между шагами. ctx отменяется при отмене со стороны транспорта, по deadline
+// или по уведомлению notifications/cancelled от клиента.
+
+// inFlightCalls — отмена выполняющихся вызовов по "<session>/<request id>"
+var inFlightCalls sync.Map
+
+// typeChunkRunes — размер порции для type_text без задержки: между порциями
+// проверяется отмена
+const typeChunkRunes = 32
+
+func inFlightKey(ctx context.Context, requestID string) string {
+	sessionID := ""
+	if session := server.ClientSessionFromContext(ctx); session != nil {
+		sessionID = session.SessionID()
+	}
+	return sessionID + "/" + requestID
+}
+
+// withCancellation — middleware, регистрирующий вызов для notifications/cancelled
+func withCancellation(handler server.ToolHandlerFunc) server.ToolHandlerFunc {
+	return func(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+		v, _ := requestMetaField(request, metaRequestIDKey)
+		requestID, _ := v.(string)
+		if requestID == "" {
+			return handler(ctx, request)
+		}
+
+		ctx, cancel := context.WithCancel(ctx)
+		defer cancel()
+
+		key := inFlightKey(ctx, requestID)
+		inFlightCalls.Store(key, cancel)
+		defer inFlightCalls.Delete(key)
+
+		return handler(ctx, request)
+	}
+}
+
+// handleCancelledNotification обрабатывает notifications/cancelled:
+// {"requestId": <id>, "reason": "..."}
+func handleCancelledNotification(ctx context.Context, notification mcp.JSONRPCNotification) {
+	requestID := requestIDString(notification.Params.AdditionalFields["requestId"])
+	if requestID == "" {
+		return
+	}
+	if cancel, ok := inFlightCalls.Load(inFlightKey(ctx, requestID)); ok {
+		cancel.(context.CancelFunc)()
+	}
+}
+
+// sleepContext ждёт d либо отмены ctx
+func sleepContext(ctx context.Context, d time.Duration) error {
+	if d <= 0 {
+		return ctx.Err()
+	}
+	timer := time.NewTimer(d)
+	defer timer.Stop()
+	select {
+	case <-ctx.Done():
+		return ctx.Err()
+	case <-timer.C:
+		return nil
+	}
+}
+
+// typeContext печатает text, проверяя ctx перед каждым символом (delay > 0)
+// или каждой порцией из typeChunkRunes символов. Возвращает число
+// напечатанных символов.
+func typeContext(ctx context.Context, text string, delay int) (int, error) {
+	runes := []rune(text)
+	step := 1
+	if delay <= 0 {
+		step = typeChunkRunes
+	}
+	typed := 0
+	for typed < len(runes) {
+		if err := ctx.Err(); err != nil {
+			return typed, err
+		}
+		end := typed + step
+		if end > len(runes) {
+			end = len(runes)
+		}
+		robotgo.Type(string(runes[typed:end]))
+		typed = end
+		if delay > 0 && typed < len(runes) {
+			if err := sleepContext(ctx, time.Duration(delay)*time.Millisecond); err != nil {
+				return typed, err
+			}
+		}
+	}
+	return typed, nil
+}
+
+// ==================== TRACING ====================
+
+// Лёгкие спаны в модели OpenTelemetry: каждый вызов tool — корневой спан
+// "tools/call <tool>", внутри handler'ы открывают дочерние спаны фаз
+// (parse_args, robotgo.capture, png.encode, base64.encode). Экспорт — в
+// формате OTLP/JSON: построчно в файл (-trace-file) и/или батчами на
+// OTLP/HTTP collector (-trace-otlp). Без флагов tracer == nil и startSpan
+// ничего не аллоцирует.
+
+type span struct {
+	traceID  [16]byte
+	spanID   [8]byte
+	parentID [8]byte
+	name     string
+	start    time.Time
+	attrs    map[string]interface{}
+	errMsg   string
+	timing   *requestTiming // фазы для _meta.timing (nil, если не запрошено)
+}
+
+type spanContextKey struct{}
+
+// spanExporter асинхронно выгружает завершённые спаны
+type spanExporter struct {
+	spans    chan map[string]interface{}
+	file     *os.File
+	otlpURL  string
+	client   *http.Client
+	resource map[string]interface{}
+}
+
+// tracer инициализируется один раз в main() и дальше только читается
+var tracer *spanExporter
+
+const (
+	traceQueueSize = 4096
+	traceBatchSize = 256
+	traceFlushTick = time.Second
+)
+
+func newSpanExporter(filePath, otlpURL string) (*spanExporter, error) {
+	e := &spanExporter{
+		spans:   make(chan map[string]interface{}, traceQueueSize),
+		otlpURL: otlpURL,
+		client:  &http.Client{Timeout: 5 * time.Second},
+		resource: map[string]interface{}{
+			"attributes": []interface{}{
+				otlpAttribute("service.name", ServerName),
+				otlpAttribute("service.version", ServerVersion),
+			},
+		},
+	}
+	if filePath != "" {
+		f, err := os.OpenFile(filePath, os.O_CREATE|os.O_WRONLY|os.O_APPEND, 0o644)
+		if err != nil {
+			return nil, fmt.Errorf("failed to open trace file: %w", err)
+		}
+		e.file = f
+	}
+	go e.run()
+	return e, nil
+}
+
+// run пишет спаны в файл по мере поступления и отправляет батчи на collector
+func (e *spanExporter) run() {
+	ticker := time.NewTicker(traceFlushTick)
+	defer ticker.Stop()
+
+	var batch []interface{}
+	for {
+		select {
+		case s := <-e.spans:
+			if e.file != nil {
+				if line, err := json.Marshal(s); err == nil {
+					_, _ = e.file.Write(append(line, '\n'))
+				}
+			}
+			if e.otlpURL != "" {
+				batch = append(batch, s)
+				if len(batch) >= traceBatchSize {
+					e.sendOTLP(batch)
+					batch = nil
+				}
+			}
+		case <-ticker.C:
+			if len(batch) > 0 {
+				e.sendOTLP(batch)
+				batch = nil
+			}
+		}
+	}
+}
+
+func (e *spanExporter) sendOTLP(spans []interface{}) {
+	payload, err := json.Marshal(map[string]interface{}{
+		"resourceSpans": []interface{}{map[string]interface{}{
+			"resource": e.resource,
+			"scopeSpans": []interface{}{map[string]interface{}{
+				"scope": map[string]interface{}{"name": ServerName, "version": ServerVersion},
+				"spans": spans,
+			}},
+		}},
+	})
 	if err != nil {
+		return
+	}
+	resp, err := e.client.Post(e.otlpURL, "application/json", bytes.NewReader(payload))
+	if err != nil {
+		log.Printf("Failed to export spans: %v", err)
+		return
+	}
+	resp.Body.Close()
+}
+
+// otlpAttribute формирует KeyValue в представлении OTLP/JSON
+func otlpAttribute(key string, value interface{}) map[string]interface{} {
+	var v map[string]interface{}
+	switch val := value.(type) {
+	case bool:
+		v = map[string]interface{}{"boolValue": val}
+	case int:
+		v = map[string]interface{}{"intValue": strconv.Itoa(val)}
+	case int64:
+		v = map[string]interface{}{"intValue": strconv.FormatInt(val, 10)}
+	case float64:
+		v = map[string]interface{}{"doubleValue": val}
+	case string:
+		v = map[string]interface{}{"stringValue": val}
+	default:
+		v = map[string]interface{}{"stringValue": fmt.Sprint(val)}
+	}
+	return map[string]interface{}{"key": key, "value": v}
+}
+
+// startSpan открывает дочерний спан текущего спана из ctx (или корневой).
+// Длительность спана также попадает в фазы _meta.timing, если они запрошены.
+// Если не нужно ни то, ни другое, возвращает nil — методы span безопасны для nil.
+func startSpan(ctx context.Context, name string) (context.Context, *span) {
+	timing, _ := ctx.Value(requestTimingContextKey{}).(*requestTiming)
+	if tracer == nil && timing == nil {
+		return ctx, nil
+	}
+	s := &span{name: name, start: time.Now(), timing: timing}
+	if tracer == nil {
+		return ctx, s
+	}
+	if parent, ok := ctx.Value(spanContextKey{}).(*span); ok {
+		s.traceID = parent.traceID
+		s.parentID = parent.spanID
+	} else {
+		putUint64(s.traceID[:8], rand.Uint64())
+		putUint64(s.traceID[8:], rand.Uint64())
+	}
+	putUint64(s.spanID[:], rand.Uint64())
+	return context.WithValue(ctx, spanContextKey{}, s), s
+}
+
+func putUint64(b []byte, v uint64) {
+	for i := 0; i < 8; i++ {
+		b[i] = byte(v >> (56 - 8*i))
+	}
+}
+
+func (s *span) setAttr(key string, value interface{}) {
+	if s == nil {
+		return
+	}
+	if s.attrs == nil {
+		s.attrs = make(map[string]interface{})
+	}
+	s.attrs[key] = value
+}
+
+func (s *span) setError(err error) {
+	if s == nil || err == nil {
+		return
+	}
+	s.errMsg = err.Error()
+}
+
+// end завершает спан и ставит его в очередь экспорта (без блокировки:
+// при переполнении очереди спан отбрасывается)
+func (s *span) end() {
+	if s == nil {
+		return
+	}
+	endTime := time.Now()
+	if s.timing != nil {
+		s.timing.addPhase(s.name, endTime.Sub(s.start))
+	}
+	if tracer == nil {
+		return
+	}
+
+	attrs := make([]interface{}, 0, len(s.attrs))
+	for key, value := range s.attrs {
+		attrs = append(attrs, otlpAttribute(key, value))
+	}
+	kind := 1 // SPAN_KIND_INTERNAL
+	if s.parentID == [8]byte{} {
+		kind = 2 // SPAN_KIND_SERVER
+	}
+	record := map[string]interface{}{
+		"traceId":           hex.EncodeToString(s.traceID[:]),
+		"spanId":            hex.EncodeToString(s.spanID[:]),
+		"name":              s.name,
+		"kind":              kind,
+		"startTimeUnixNano": strconv.FormatInt(s.start.UnixNano(), 10),
+		"endTimeUnixNano":   strconv.FormatInt(endTime.UnixNano(), 10),
+		"attributes":        attrs,
+	}
+	if s.parentID != [8]byte{} {
+		record["parentSpanId"] = hex.EncodeToString(s.parentID[:])
+	}
+	if s.errMsg != "" {
+		record["status"] = map[string]interface{}{"code": 2, "message": s.errMsg} // STATUS_CODE_ERROR
+	}
+
+	select {
+	case tracer.spans <- record:
+	default:
+	}
+}
+
+// withTracing — middleware, открывающий корневой спан на каждый вызов tool
+func withTracing(handler server.ToolHandlerFunc) server.ToolHandlerFunc {
+	return func(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+		if tracer == nil {
+			return handler(ctx, request)
+		}
+		ctx, root := startSpan(ctx, "tools/call "+request.Params.Name)
+		root.setAttr("mcp.tool.name", request.Params.Name)
+
+		result, err := handler(ctx, request)
+
+		root.setError(err)
+		root.setAttr("mcp.tool.response_bytes", resultSize(result))
+		if result != nil && result.IsError {
+			root.setAttr("mcp.tool.is_error", true)
+		}
+		root.end()
+		return result, err
+	}
+}
+
+// jsonEncoder — переиспользуемая пара буфер+encoder для jsonResponse
+type jsonEncoder struct {
+	buf bytes.Buffer
+	enc *json.Encoder
+}
+
+// maxPooledJSONBuffer — буферы крупнее (например, после process_list) не
+// возвращаются в пул, чтобы не держать память под редкие большие ответы
+const maxPooledJSONBuffer = 64 * 1024
+
+var jsonEncoderPool = sync.Pool{
+	New: func() interface{} {
+		e := &jsonEncoder{}
+		e.enc = json.NewEncoder(&e.buf)
+		return e
+	},
+}
+
+// Helper function to create JSON response.
+// Compact by default: the text is embedded as an escaped string inside the
+// JSON-RPC envelope, so indentation only adds bytes. Use -pretty for debugging.
+// Handlers pass the typed structs from the RESPONSE TYPES section; encoding
+// goes through a pooled json.Encoder to avoid per-call buffer allocations.
+func jsonResponse(data interface{}) string {
+	e := jsonEncoderPool.Get().(*jsonEncoder)
+	defer func() {
+		if e.buf.Cap() <= maxPooledJSONBuffer {
+			e.buf.Reset()
+			jsonEncoderPool.Put(e)
+		}
+	}()
+
+	if prettyJSON {
+		e.enc.SetIndent("", "  ")
+	} else {
+		e.enc.SetIndent("", "")
+	}
+	if err := e.enc.Encode(data); err != nil {
 		return fmt.Sprintf(`{"error": "%s"}`, err.Error())
 	}
-	return string(jsonBytes)
+
+	// Encode всегда дописывает '\n' в конце
+	return string(bytes.TrimSuffix(e.buf.Bytes(), []byte("\n")))
 }
 
 // Helper function to get int argument
@@ -187,6 +884,27 @@ func getStringArrayArg(args map[string]interface{}, key string) []string {
 	return nil
 }
 
+// getIntArrayArg возвращает массив целых чисел (JSON числа приходят как float64)
+func getIntArrayArg(args map[string]interface{}, key string) ([]int, error) {
+	val, ok := args[key]
+	if !ok || val == nil {
+		return nil, nil
+	}
+	arr, ok := val.([]interface{})
+	if !ok {
+		return nil, fmt.Errorf("%s must be an array of integers", key)
+	}
+	result := make([]int, 0, len(arr))
+	for _, item := range arr {
+		f, ok := item.(float64)
+		if !ok || f != math.Trunc(f) {
+			return nil, fmt.Errorf("%s must be an array of integers", key)
+		}
+		result = append(result, int(f))
+	}
+	return result, nil
+}
+
 // Helper function to get args as map
 func getArgs(request mcp.CallToolRequest) map[string]interface{} {
 	if args, ok := request.Params.Arguments.(map[string]interface{}); ok {
@@ -195,62 +913,363 @@ func getArgs(request mcp.CallToolRequest) map[string]interface{} {
 	return make(map[string]interface{})
 }
 
-// ==================== MOUSE HANDLERS ====================
+// ==================== RESPONSE TYPES ====================
 
-func mouseMoveHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+// Типизированные ответы tools. encoding/json кеширует кодировщик для
+// структуры, поэтому они дешевле map[string]interface{} на горячих путях.
 
-	x, err := getRequiredIntArg(args, "x")
-	if err != nil {
-		return nil, err
-	}
-	y, err := getRequiredIntArg(args, "y")
-	if err != nil {
-		return nil, err
-	}
+type statusResponse struct {
+	Status  string `json:"status"`
+	Message string `json:"message"`
+}
 
-	displayId := getIntArg(args, "display_id", -1)
+// Mouse
 
-	if displayId >= 0 {
-		robotgo.Move(x, y, displayId)
-	} else {
-		robotgo.Move(x, y)
-	}
+type positionResponse struct {
+	X int `json:"x"`
+	Y int `json:"y"`
+}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse moved to (%d, %d)", x, y),
-	})), nil
+type moveSmoothResponse struct {
+	Status  string `json:"status"`
+	Success bool   `json:"success"`
+	Message string `json:"message"`
 }
 
-func mouseMoveSmoothHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+// Keyboard
 
-	x, err := getRequiredIntArg(args, "x")
-	if err != nil {
-		return nil, err
-	}
-	y, err := getRequiredIntArg(args, "y")
-	if err != nil {
-		return nil, err
-	}
+type clipboardResponse struct {
+	Text string `json:"text"`
+}
 
-	low := getFloatArg(args, "low", 1.0)
-	high := getFloatArg(args, "high", 3.0)
+// Screen
 
-	success := robotgo.MoveSmooth(x, y, low, high)
+type sizeResponse struct {
+	Width  int `json:"width"`
+	Height int `json:"height"`
+}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"success": success,
-		"message": fmt.Sprintf("Mouse moved smoothly to (%d, %d)", x, y),
-	})), nil
+type countResponse struct {
+	Count int `json:"count"`
 }
 
-func mouseMoveRelativeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+type boundsResponse struct {
+	X      int `json:"x"`
+	Y      int `json:"y"`
+	Width  int `json:"width"`
+	Height int `json:"height"`
+}
 
-	x, err := getRequiredIntArg(args, "x")
+type colorResponse struct {
+	Color string `json:"color"`
+}
+
+type captureSaveResponse struct {
+	Status  string `json:"status"`
+	Message string `json:"message"`
+	Path    string `json:"path"`
+}
+
+// Window
+
+// xwinHandle — вид robotgo.Handle в JSON на X11; поле handle индексного
+// пути строится из XID без обращения к robotgo
+type xwinHandle struct {
+	XWin uint32 `json:"XWin"`
+}
+
+type activeWindowResponse struct {
+	Handle interface{} `json:"handle"`
+	Xid    uint32      `json:"xid,omitempty"` // XID из индекса окон, годится для параметра handle
+	Title  string      `json:"title"`
+	Pid    int         `json:"pid"`
+}
+
+type titleResponse struct {
+	Title string `json:"title"`
+}
+
+type windowInfo struct {
+	Handle   uint32   `json:"handle"` // XID
+	Pid      int      `json:"pid"`
+	Title    string   `json:"title"`
+	Class    string   `json:"class"`
+	Instance string   `json:"instance,omitempty"`
+	X        int      `json:"x"`
+	Y        int      `json:"y"`
+	Width    int      `json:"width"`
+	Height   int      `json:"height"`
+	Visible  bool     `json:"visible"`
+	Active   bool     `json:"active,omitempty"`
+	Desktop  int      `json:"desktop"` // -1 — все рабочие столы или неизвестно
+	States   []string `json:"states,omitempty"`
+}
+
+type windowListResponse struct {
+	Windows []windowInfo `json:"windows"`
+	Count   int          `json:"count"`
+}
+
+type windowWaitForResponse struct {
+	Status    string      `json:"status"` // exists, active, settled или timeout
+	Window    *windowInfo `json:"window,omitempty"`
+	ElapsedMs float64     `json:"elapsed_ms"`
+}
+
+type windowCaptureResponse struct {
+	Handle    uint32 `json:"handle,omitempty"`
+	X         int    `json:"x"` // положение снимка на экране, для перевода координат
+	Y         int    `json:"y"`
+	Width     int    `json:"width"`
+	Height    int    `json:"height"`
+	Offscreen bool   `json:"offscreen,omitempty"`
+}
+
+type windowArrangeResponse struct {
+	Windows   []windowInfo `json:"windows"`
+	Count     int          `json:"count"`
+	Settled   bool         `json:"settled"` // false — окна ещё менялись к моменту таймаута
+	ElapsedMs float64      `json:"elapsed_ms"`
+}
+
+// Process
+
+type processInfo struct {
+	Pid       int      `json:"pid"`
+	Name      string   `json:"name,omitempty"`
+	User      string   `json:"user,omitempty"`
+	Cmdline   string   `json:"cmdline,omitempty"`
+	CPU       *float64 `json:"cpu,omitempty"`
+	RSS       *int64   `json:"rss,omitempty"`
+	StartTime string   `json:"start_time,omitempty"`
+}
+
+type processListResponse struct {
+	Processes  []processInfo `json:"processes"`
+	Count      int           `json:"count"`
+	Total      int           `json:"total"`
+	NextOffset *int          `json:"next_offset,omitempty"`
+}
+
+type pidsResponse struct {
+	Pids  []int `json:"pids"`
+	Count int   `json:"count"`
+}
+
+type nameResponse struct {
+	Name string `json:"name"`
+}
+
+type existsResponse struct {
+	Exists bool `json:"exists"`
+}
+
+type processStartedResponse struct {
+	Status  string `json:"status"`
+	Pid     int    `json:"pid"`
+	Command string `json:"command"`
+	Message string `json:"message"`
+}
+
+type processCompletedResponse struct {
+	Status               string `json:"status"`
+	Output               string `json:"output"`
+	Truncated            bool   `json:"truncated,omitempty"`
+	DroppedBytes         int64  `json:"dropped_bytes,omitempty"`
+	DroppedNotifications int    `json:"dropped_notifications,omitempty"` // порции stream, не отправленные клиенту
+}
+
+type managedProcessStatus struct {
+	Pid         int    `json:"pid"`
+	Command     string `json:"command"`
+	Running     bool   `json:"running"`
+	ExitCode    *int   `json:"exit_code,omitempty"`
+	State       string `json:"state,omitempty"`
+	StartedAt   string `json:"started_at"`
+	ExitedAt    string `json:"exited_at,omitempty"`
+	StdoutBytes int64  `json:"stdout_bytes"`
+	StderrBytes int64  `json:"stderr_bytes"`
+}
+
+type managedProcessListResponse struct {
+	Processes []managedProcessStatus `json:"processes"`
+	Count     int                    `json:"count"`
+}
+
+type processOutputResponse struct {
+	Pid          int    `json:"pid"`
+	Stream       string `json:"stream"`
+	Output       string `json:"output"`
+	Offset       int64  `json:"offset"`
+	NextOffset   int64  `json:"next_offset"`
+	DroppedBytes int64  `json:"dropped_bytes,omitempty"`
+	Running      bool   `json:"running"`
+}
+
+type processStatsEntry struct {
+	Pid              int                 `json:"pid"`
+	Name             string              `json:"name,omitempty"`
+	CPUPercent       float64             `json:"cpu_percent"`
+	RSS              int64               `json:"rss"`
+	VMS              int64               `json:"vms"`
+	Threads          int                 `json:"threads"`
+	ReadBytesPerSec  *float64            `json:"read_bytes_per_sec,omitempty"`
+	WriteBytesPerSec *float64            `json:"write_bytes_per_sec,omitempty"`
+	ReadCharsPerSec  *float64            `json:"read_chars_per_sec,omitempty"`
+	WriteCharsPerSec *float64            `json:"write_chars_per_sec,omitempty"`
+	IntervalMs       float64             `json:"interval_ms"`
+	SampledAt        string              `json:"sampled_at,omitempty"`
+	Watched          bool                `json:"watched,omitempty"`
+	History          []processStatsEntry `json:"history,omitempty"`
+	Error            string              `json:"error,omitempty"`
+}
+
+type processStatsResponse struct {
+	Processes []processStatsEntry `json:"processes"`
+	Count     int                 `json:"count"`
+}
+
+type processWatchResponse struct {
+	Watched    []int `json:"watched"`
+	Count      int   `json:"count"`
+	IntervalMs int   `json:"interval_ms"`
+}
+
+type processKillFailure struct {
+	Pid   int    `json:"pid"`
+	Error string `json:"error"`
+}
+
+type processKillResponse struct {
+	Status    string               `json:"status"` // success или partial
+	Message   string               `json:"message"`
+	Signal    string               `json:"signal"`
+	Signaled  []int                `json:"signaled"`
+	Escalated []int                `json:"escalated,omitempty"` // добиты SIGKILL после force_after_ms
+	Failed    []processKillFailure `json:"failed,omitempty"`
+}
+
+type processWaitForResponse struct {
+	Status         string  `json:"status"` // exited, found или timeout
+	Pid            int     `json:"pid,omitempty"`
+	Name           string  `json:"name,omitempty"`
+	AlreadyRunning bool    `json:"already_running,omitempty"`
+	Method         string  `json:"method"` // pidfd, netlink или poll
+	ElapsedMs      float64 `json:"elapsed_ms"`
+}
+
+// Accessibility
+
+type uiNode struct {
+	ID          string          `json:"id"` // "bus/path", годится для параметра node
+	Role        string          `json:"role"`
+	Name        string          `json:"name,omitempty"`
+	Description string          `json:"description,omitempty"`
+	States      []string        `json:"states,omitempty"`
+	Bounds      *boundsResponse `json:"bounds,omitempty"`
+	ChildCount  int             `json:"child_count"`
+	Children    []*uiNode       `json:"children,omitempty"`
+}
+
+type uiTreeResponse struct {
+	Root      *uiNode `json:"root"`
+	NodeCount int     `json:"node_count"`
+	Fetched   int     `json:"fetched"`             // узлов прочитано по D-Bus, остальные — из кэша
+	TimedOut  int     `json:"timed_out,omitempty"` // узлов не ответило вовремя, пропущены с поддеревьями
+	Truncated bool    `json:"truncated,omitempty"`
+	ElapsedMs float64 `json:"elapsed_ms"`
+}
+
+type uiElement struct {
+	ID     string          `json:"id"`
+	Role   string          `json:"role"`
+	Name   string          `json:"name,omitempty"`
+	States []string        `json:"states,omitempty"`
+	Bounds *boundsResponse `json:"bounds"`
+	X      int             `json:"x"` // центр элемента, для mouse_click_at
+	Y      int             `json:"y"`
+}
+
+type uiFindResponse struct {
+	Elements  []uiElement `json:"elements"`
+	Count     int         `json:"count"`
+	Searched  int         `json:"searched"`            // просмотрено узлов
+	Fetched   int         `json:"fetched"`             // из них прочитано по D-Bus
+	TimedOut  int         `json:"timed_out,omitempty"` // не ответили вовремя, пропущены с поддеревьями
+	Partial   bool        `json:"partial,omitempty"`   // истёк timeout_ms, просмотрена часть дерева
+	Truncated bool        `json:"truncated,omitempty"`
+	ElapsedMs float64     `json:"elapsed_ms"`
+}
+
+// System
+
+type systemInfoResponse struct {
+	Version       string `json:"version"`
+	Is64Bit       bool   `json:"is_64bit"`
+	MainDisplayID int    `json:"main_display_id"`
+	DisplaysCount int    `json:"displays_count"`
+}
+
+type alertResponse struct {
+	ClickedDefault bool `json:"clicked_default"`
+}
+
+// ==================== MOUSE HANDLERS ====================
+
+func mouseMoveHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	x, err := getRequiredIntArg(args, "x")
+	if err != nil {
+		return nil, err
+	}
+	y, err := getRequiredIntArg(args, "y")
+	if err != nil {
+		return nil, err
+	}
+
+	displayId := getIntArg(args, "display_id", -1)
+
+	if displayId >= 0 {
+		robotgo.Move(x, y, displayId)
+	} else {
+		robotgo.Move(x, y)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse moved to (%d, %d)", x, y),
+	})), nil
+}
+
+func mouseMoveSmoothHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	x, err := getRequiredIntArg(args, "x")
+	if err != nil {
+		return nil, err
+	}
+	y, err := getRequiredIntArg(args, "y")
+	if err != nil {
+		return nil, err
+	}
+
+	low := getFloatArg(args, "low", 1.0)
+	high := getFloatArg(args, "high", 3.0)
+
+	success := robotgo.MoveSmooth(x, y, low, high)
+
+	return mcp.NewToolResultText(jsonResponse(moveSmoothResponse{
+		Status:  "success",
+		Success: success,
+		Message: fmt.Sprintf("Mouse moved smoothly to (%d, %d)", x, y),
+	})), nil
+}
+
+func mouseMoveRelativeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	x, err := getRequiredIntArg(args, "x")
 	if err != nil {
 		return nil, err
 	}
@@ -261,19 +1280,16 @@ func mouseMoveRelativeHandler(ctx context.Context, request mcp.CallToolRequest)
 
 	robotgo.MoveRelative(x, y)
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse moved relative by (%d, %d)", x, y),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse moved relative by (%d, %d)", x, y),
 	})), nil
 }
 
 func mouseGetPositionHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
 	x, y := robotgo.Location()
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"x": x,
-		"y": y,
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(positionResponse{X: x, Y: y})), nil
 }
 
 func mouseClickHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
@@ -288,9 +1304,9 @@ func mouseClickHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.C
 		robotgo.Click(button)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse %s click performed", button),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse %s click performed", button),
 	})), nil
 }
 
@@ -315,9 +1331,9 @@ func mouseClickAtHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp
 		robotgo.MoveClick(x, y, button)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse %s click at (%d, %d)", button, x, y),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse %s click at (%d, %d)", button, x, y),
 	})), nil
 }
 
@@ -336,9 +1352,9 @@ func mouseToggleHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.
 		robotgo.Toggle(button, "up")
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse button %s %s", button, action),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse button %s %s", button, action),
 	})), nil
 }
 
@@ -358,9 +1374,9 @@ func mouseDragHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.Ca
 
 	robotgo.Drag(x, y, button)
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse dragged to (%d, %d)", x, y),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse dragged to (%d, %d)", x, y),
 	})), nil
 }
 
@@ -387,9 +1403,9 @@ func mouseDragSmoothHandler(ctx context.Context, request mcp.CallToolRequest) (*
 	_ = robotgo.MoveSmooth(x, y, low, high)
 	_ = robotgo.Toggle(button, "up")
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse dragged smoothly to (%d, %d)", x, y),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse dragged smoothly to (%d, %d)", x, y),
 	})), nil
 }
 
@@ -413,9 +1429,9 @@ func mouseScrollHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.
 		robotgo.Scroll(x, y)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse scrolled (%d, %d)", x, y),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse scrolled (%d, %d)", x, y),
 	})), nil
 }
 
@@ -434,9 +1450,9 @@ func mouseScrollDirectionHandler(ctx context.Context, request mcp.CallToolReques
 
 	robotgo.ScrollDir(amount, direction)
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse scrolled %s by %d", direction, amount),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse scrolled %s by %d", direction, amount),
 	})), nil
 }
 
@@ -451,11 +1467,17 @@ func mouseScrollSmoothHandler(ctx context.Context, request mcp.CallToolRequest)
 	num := getIntArg(args, "num", 5)
 	delay := getIntArg(args, "delay", 100)
 
-	robotgo.ScrollSmooth(to, num, delay)
+	// Шаги robotgo.ScrollSmooth, но с проверкой отмены между ними
+	for i := 0; i < num; i++ {
+		robotgo.Scroll(0, to)
+		if err := sleepContext(ctx, time.Duration(delay)*time.Millisecond); err != nil {
+			return nil, fmt.Errorf("smooth scroll cancelled after %d of %d steps: %w", i+1, num, err)
+		}
+	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Mouse scrolled smoothly to %d", to),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Mouse scrolled smoothly to %d", to),
 	})), nil
 }
 
@@ -481,9 +1503,9 @@ func keyTapHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallT
 		robotgo.KeyTap(key)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Key '%s' tapped", key),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Key '%s' tapped", key),
 	})), nil
 }
 
@@ -506,9 +1528,9 @@ func keyToggleHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.Ca
 		robotgo.KeyToggle(key, "up")
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Key '%s' %s", key, action),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Key '%s' %s", key, action),
 	})), nil
 }
 
@@ -522,15 +1544,13 @@ func typeTextHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.Cal
 
 	delay := getIntArg(args, "delay", 0)
 
-	if delay > 0 {
-		robotgo.TypeDelay(text, delay)
-	} else {
-		robotgo.Type(text)
+	if typed, err := typeContext(ctx, text, delay); err != nil {
+		return nil, fmt.Errorf("typing cancelled after %d characters: %w", typed, err)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Text typed: %d characters", len(text)),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Text typed: %d characters", len(text)),
 	})), nil
 }
 
@@ -547,11 +1567,13 @@ func typeTextDelayedHandler(ctx context.Context, request mcp.CallToolRequest) (*
 		return nil, err
 	}
 
-	robotgo.TypeDelay(text, delay)
+	if typed, err := typeContext(ctx, text, delay); err != nil {
+		return nil, fmt.Errorf("typing cancelled after %d characters: %w", typed, err)
+	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Text typed with %dms delay: %d characters", delay, len(text)),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Text typed with %dms delay: %d characters", delay, len(text)),
 	})), nil
 }
 
@@ -561,9 +1583,7 @@ func clipboardReadHandler(ctx context.Context, request mcp.CallToolRequest) (*mc
 		return nil, fmt.Errorf("failed to read clipboard: %w", err)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"text": text,
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(clipboardResponse{Text: text})), nil
 }
 
 func clipboardWriteHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
@@ -579,9 +1599,9 @@ func clipboardWriteHandler(ctx context.Context, request mcp.CallToolRequest) (*m
 		return nil, fmt.Errorf("failed to write to clipboard: %w", err)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": "Text written to clipboard",
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: "Text written to clipboard",
 	})), nil
 }
 
@@ -598,9 +1618,9 @@ func clipboardPasteHandler(ctx context.Context, request mcp.CallToolRequest) (*m
 		return nil, fmt.Errorf("failed to paste text: %w", err)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": "Text pasted via clipboard",
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: "Text pasted via clipboard",
 	})), nil
 }
 
@@ -618,18 +1638,13 @@ func screenGetSizeHandler(ctx context.Context, request mcp.CallToolRequest) (*mc
 		width, height = robotgo.GetScreenSize()
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"width":  width,
-		"height": height,
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(sizeResponse{Width: width, Height: height})), nil
 }
 
 func screenGetDisplaysNumHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
 	count := robotgo.DisplaysNum()
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"count": count,
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(countResponse{Count: count})), nil
 }
 
 func screenGetDisplayBoundsHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
@@ -642,15 +1657,11 @@ func screenGetDisplayBoundsHandler(ctx context.Context, request mcp.CallToolRequ
 
 	x, y, w, h := robotgo.GetDisplayBounds(displayId)
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"x":      x,
-		"y":      y,
-		"width":  w,
-		"height": h,
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(boundsResponse{X: x, Y: y, Width: w, Height: h})), nil
 }
 
 func screenCaptureHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	_, parseSpan := startSpan(ctx, "parse_args")
 	args := getArgs(request)
 
 	x := getIntArg(args, "x", -1)
@@ -664,6 +1675,7 @@ func screenCaptureHandler(ctx context.Context, request mcp.CallToolRequest) (*mc
 	showGrid := getBoolArg(args, "show_grid", false)
 	gridSize := getIntArg(args, "grid_size", 100)
 	showRulers := getBoolArg(args, "show_rulers", false)
+	parseSpan.end()
 
 	// Validate display_id if provided
 	if displayId >= 0 {
@@ -693,7 +1705,10 @@ func screenCaptureHandler(ctx context.Context, request mcp.CallToolRequest) (*mc
 	var img stdImage.Image
 	var err error
 
-	if showCursor || showGrid || showRulers {
+	annotated := showCursor || showGrid || showRulers
+	_, captureSpan := startSpan(ctx, "robotgo.capture")
+	captureSpan.setAttr("annotated", annotated)
+	if annotated {
 		annotOpts := robotgo.AnnotationOptions{
 			ShowCursor: showCursor,
 			ShowGrid:   showGrid,
@@ -706,6 +1721,13 @@ func screenCaptureHandler(ctx context.Context, request mcp.CallToolRequest) (*mc
 	} else {
 		img, err = robotgo.CaptureImg(captureArgs...)
 	}
+	captureSpan.setError(err)
+	if img != nil {
+		bounds := img.Bounds()
+		captureSpan.setAttr("width", bounds.Dx())
+		captureSpan.setAttr("height", bounds.Dy())
+	}
+	captureSpan.end()
 
 	if err != nil {
 		return nil, fmt.Errorf("failed to capture screen: %w", err)
@@ -714,16 +1736,11 @@ func screenCaptureHandler(ctx context.Context, request mcp.CallToolRequest) (*mc
 		return nil, fmt.Errorf("failed to capture screen: nil image returned")
 	}
 
-	// Encode to PNG
-	var buf bytes.Buffer
-	err = png.Encode(&buf, img)
+	base64Str, err := encodePNGBase64(ctx, img)
 	if err != nil {
-		return nil, fmt.Errorf("failed to encode image: %w", err)
+		return nil, err
 	}
 
-	// Base64 encode
-	base64Str := base64.StdEncoding.EncodeToString(buf.Bytes())
-
 	// Return image using native MCP ImageContent
 	return &mcp.CallToolResult{
 		Content: []mcp.Content{
@@ -732,6 +1749,25 @@ func screenCaptureHandler(ctx context.Context, request mcp.CallToolRequest) (*mc
 	}, nil
 }
 
+// encodePNGBase64 кодирует изображение в PNG и затем в base64 для ImageContent
+func encodePNGBase64(ctx context.Context, img stdImage.Image) (string, error) {
+	_, encodeSpan := startSpan(ctx, "png.encode")
+	var buf bytes.Buffer
+	err := png.Encode(&buf, img)
+	encodeSpan.setAttr("bytes", buf.Len())
+	encodeSpan.setError(err)
+	encodeSpan.end()
+	if err != nil {
+		return "", fmt.Errorf("failed to encode image: %w", err)
+	}
+
+	_, base64Span := startSpan(ctx, "base64.encode")
+	encoded := base64.StdEncoding.EncodeToString(buf.Bytes())
+	base64Span.setAttr("bytes", len(encoded))
+	base64Span.end()
+	return encoded, nil
+}
+
 func screenCaptureSaveHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
 	args := getArgs(request)
 
@@ -750,15 +1786,18 @@ func screenCaptureSaveHandler(ctx context.Context, request mcp.CallToolRequest)
 		captureArgs = append(captureArgs, x, y, width, height)
 	}
 
+	_, saveSpan := startSpan(ctx, "robotgo.save_capture")
 	err = robotgo.SaveCapture(path, captureArgs...)
+	saveSpan.setError(err)
+	saveSpan.end()
 	if err != nil {
 		return nil, fmt.Errorf("failed to save capture: %w", err)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Screenshot saved to %s", path),
-		"path":    path,
+	return mcp.NewToolResultText(jsonResponse(captureSaveResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Screenshot saved to %s", path),
+		Path:    path,
 	})), nil
 }
 
@@ -783,9 +1822,7 @@ func screenGetPixelColorHandler(ctx context.Context, request mcp.CallToolRequest
 		color = robotgo.GetPixelColor(x, y)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"color": color,
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(colorResponse{Color: color})), nil
 }
 
 func screenGetMouseColorHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
@@ -800,332 +1837,4370 @@ func screenGetMouseColorHandler(ctx context.Context, request mcp.CallToolRequest
 		color = robotgo.GetLocationColor()
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"color": color,
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(colorResponse{Color: color})), nil
 }
 
-// ==================== WINDOW HANDLERS ====================
+// ==================== WINDOW INDEX ====================
+
+// Индекс окон верхнего уровня X11 для window_* инструментов. Отдельное
+// соединение с X-сервером (xgb, без cgo) подписывается на события корневого
+// и клиентских окон: PropertyNotify (заголовок, PID, состояние,
+// _NET_CLIENT_LIST_STACKING, _NET_ACTIVE_WINDOW), ConfigureNotify
+// (геометрия), CreateNotify/DestroyNotify, MapNotify/UnmapNotify.
+// Обработчики читают индекс из памяти, без round-trip к X-серверу. Индекс
+// меняет только горутина событий; запросы берут RLock. Если X недоступен
+// (Wayland без XWayland, macOS, Windows), инструменты работают через
+// robotgo, как раньше.
+
+// winStateNames — состояния _NET_WM_STATE, которые попадают в индекс
+var winStateNames = []string{
+	"HIDDEN", "MAXIMIZED_VERT", "MAXIMIZED_HORZ", "FULLSCREEN", "ABOVE",
+	"BELOW", "STICKY", "SHADED", "MODAL", "SKIP_TASKBAR", "DEMANDS_ATTENTION",
+}
 
-func windowGetActiveHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	handle := robotgo.GetActive()
-	title := robotgo.GetTitle()
-	pid := robotgo.GetPid()
+var winAtomNames = []string{
+	"_NET_CLIENT_LIST", "_NET_CLIENT_LIST_STACKING", "_NET_ACTIVE_WINDOW",
+	"_NET_WM_PID", "_NET_WM_NAME", "UTF8_STRING", "_NET_WM_STATE",
+	"_NET_WM_DESKTOP", "_NET_FRAME_EXTENTS", "_NET_CLOSE_WINDOW", "WM_CHANGE_STATE",
+}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"handle": handle,
-		"title":  title,
-		"pid":    pid,
-	})), nil
+type winEntry struct {
+	xid      xproto.Window
+	frame    xproto.Window // предок окна — прямой потомок корня (рамка WM) или само окно
+	pid      int
+	title    string
+	class    string
+	instance string
+	// клиентская область в координатах экрана
+	x, y, width, height int
+	extents             [4]int // _NET_FRAME_EXTENTS: left, right, top, bottom
+	mapped              bool
+	states              []string // lowercase без префикса _NET_WM_STATE_
+	desktop             int      // _NET_WM_DESKTOP; -1 — все рабочие столы или неизвестно
+	stack               int      // порядок наложения, 0 — самое нижнее окно
+}
+
+// bounds — внешние границы окна вместе с декорациями WM, как у robotgo.GetBounds
+func (e *winEntry) bounds() (x, y, width, height int) {
+	left, right, top, bottom := e.extents[0], e.extents[1], e.extents[2], e.extents[3]
+	return e.x - left, e.y - top, e.width + left + right, e.height + top + bottom
+}
+
+func (e *winEntry) hasState(state string) bool {
+	for _, s := range e.states {
+		if s == state {
+			return true
+		}
+	}
+	return false
+}
+
+// visible — окно отображено и не свёрнуто
+func (e *winEntry) visible() bool {
+	return e.mapped && !e.hasState("hidden")
+}
+
+type winIndex struct {
+	startOnce sync.Once
+	startErr  error
+
+	conn       *xgb.Conn
+	root       xproto.Window
+	lsbFirst   bool // порядок байт пикселей в GetImage
+	atoms      map[string]xproto.Atom
+	stateNames map[xproto.Atom]string
+
+	// XComposite для window_capture(offscreen); redirected — рамки,
+	// уже перенаправленные в off-screen pixmap
+	compositeOnce sync.Once
+	compositeErr  error
+	compositeMu   sync.Mutex
+	redirected    map[xproto.Window]bool
+
+	mu      sync.RWMutex
+	windows map[xproto.Window]*winEntry
+	frames  map[xproto.Window]xproto.Window // рамка WM → клиентское окно
+	active  xproto.Window
+	ewmh    bool // WM ведёт _NET_CLIENT_LIST; иначе окна — потомки корня
+	closed  bool
+	changed chan struct{} // закрывается при каждом изменении индекса
+}
+
+var windowIndex = &winIndex{}
+
+// start подключается к X-серверу при первом обращении
+func (wi *winIndex) start() error {
+	wi.startOnce.Do(func() { wi.startErr = wi.connect() })
+	return wi.startErr
+}
+
+// available сообщает, можно ли отвечать из индекса
+func (wi *winIndex) available() bool {
+	if wi.start() != nil {
+		return false
+	}
+	wi.mu.RLock()
+	defer wi.mu.RUnlock()
+	return !wi.closed
+}
+
+func (wi *winIndex) connect() error {
+	conn, err := xgb.NewConn()
+	if err != nil {
+		return fmt.Errorf("failed to connect to X server: %w", err)
+	}
+	setup := xproto.Setup(conn)
+	wi.conn = conn
+	wi.root = setup.DefaultScreen(conn).Root
+	wi.lsbFirst = setup.ImageByteOrder == xproto.ImageOrderLSBFirst
+	wi.windows = make(map[xproto.Window]*winEntry)
+	wi.frames = make(map[xproto.Window]xproto.Window)
+	wi.changed = make(chan struct{})
+
+	// Все InternAtom уходят одним пакетом, ответы читаются потом
+	names := append([]string(nil), winAtomNames...)
+	for _, state := range winStateNames {
+		names = append(names, "_NET_WM_STATE_"+state)
+	}
+	cookies := make([]xproto.InternAtomCookie, len(names))
+	for i, name := range names {
+		cookies[i] = xproto.InternAtom(conn, false, uint16(len(name)), name)
+	}
+	wi.atoms = make(map[string]xproto.Atom, len(names))
+	wi.stateNames = make(map[xproto.Atom]string, len(winStateNames))
+	for i, cookie := range cookies {
+		reply, err := cookie.Reply()
+		if err != nil {
+			conn.Close()
+			return fmt.Errorf("failed to intern atom %s: %w", names[i], err)
+		}
+		wi.atoms[names[i]] = reply.Atom
+		if state, ok := strings.CutPrefix(names[i], "_NET_WM_STATE_"); ok {
+			wi.stateNames[reply.Atom] = strings.ToLower(state)
+		}
+	}
+
+	mask := []uint32{xproto.EventMaskSubstructureNotify | xproto.EventMaskPropertyChange}
+	if err := xproto.ChangeWindowAttributesChecked(conn, wi.root, xproto.CwEventMask, mask).Check(); err != nil {
+		conn.Close()
+		return fmt.Errorf("failed to select root window events: %w", err)
+	}
+
+	wi.syncClients()
+	wi.syncActive()
+	go wi.loop()
+	return nil
+}
+
+// loop применяет события X к индексу до закрытия соединения
+func (wi *winIndex) loop() {
+	for {
+		ev, xerr := wi.conn.WaitForEvent()
+		if ev == nil && xerr == nil {
+			wi.mu.Lock()
+			wi.closed = true
+			wi.notifyLocked()
+			wi.mu.Unlock()
+			log.Printf("X connection closed, window index disabled")
+			return
+		}
+		if xerr != nil {
+			// BadWindow от окон, закрытых между событием и запросом
+			continue
+		}
+		wi.handleEvent(ev)
+	}
+}
+
+func (wi *winIndex) handleEvent(ev xgb.Event) {
+	switch e := ev.(type) {
+	case xproto.PropertyNotifyEvent:
+		if e.Window == wi.root {
+			switch e.Atom {
+			case wi.atoms["_NET_CLIENT_LIST_STACKING"], wi.atoms["_NET_CLIENT_LIST"]:
+				wi.syncClients()
+			case wi.atoms["_NET_ACTIVE_WINDOW"]:
+				wi.syncActive()
+			}
+			return
+		}
+		if _, ok := wi.windows[e.Window]; ok {
+			wi.refreshProperty(e.Window, e.Atom)
+		}
+
+	case xproto.ConfigureNotifyEvent:
+		// Собственное событие клиента (StructureNotify) или перемещение
+		// рамки WM (SubstructureNotify корня)
+		xid := e.Window
+		if client, ok := wi.frames[xid]; ok {
+			xid = client
+		}
+		if _, ok := wi.windows[xid]; ok {
+			wi.refreshGeometry(xid)
+		}
+		// Без EWMH порядок наложения берётся из QueryTree корня
+		if e.Event == wi.root && !wi.ewmh && !e.OverrideRedirect {
+			wi.syncClients()
+		}
+
+	case xproto.MapNotifyEvent:
+		wi.setMapped(e.Window, true)
+	case xproto.UnmapNotifyEvent:
+		wi.setMapped(e.Window, false)
+
+	case xproto.ReparentNotifyEvent:
+		if _, ok := wi.windows[e.Window]; ok {
+			wi.refreshGeometry(e.Window)
+		}
+
+	case xproto.CreateNotifyEvent:
+		if e.Parent == wi.root && !e.OverrideRedirect && !wi.ewmh {
+			wi.syncClients()
+		}
+
+	case xproto.DestroyNotifyEvent:
+		wi.mu.Lock()
+		if _, ok := wi.windows[e.Window]; ok {
+			wi.removeLocked(e.Window)
+			wi.notifyLocked()
+		}
+		delete(wi.frames, e.Window)
+		wi.mu.Unlock()
+		wi.compositeMu.Lock()
+		delete(wi.redirected, e.Window)
+		wi.compositeMu.Unlock()
+	}
+}
+
+// readClientList возвращает окна верхнего уровня снизу вверх
+func (wi *winIndex) readClientList() ([]xproto.Window, bool) {
+	for _, name := range []string{"_NET_CLIENT_LIST_STACKING", "_NET_CLIENT_LIST"} {
+		reply, err := xproto.GetProperty(wi.conn, false, wi.root, wi.atoms[name], xproto.AtomWindow, 0, 1<<16).Reply()
+		if err == nil && reply.Type != xproto.AtomNone {
+			return propWindows(reply), true
+		}
+	}
+
+	// WM без EWMH (или без WM): отображаемые потомки корня
+	tree, err := xproto.QueryTree(wi.conn, wi.root).Reply()
+	if err != nil {
+		return nil, false
+	}
+	cookies := make([]xproto.GetWindowAttributesCookie, len(tree.Children))
+	for i, child := range tree.Children {
+		cookies[i] = xproto.GetWindowAttributes(wi.conn, child)
+	}
+	var xids []xproto.Window
+	for i, cookie := range cookies {
+		attrs, err := cookie.Reply()
+		if err != nil || attrs.OverrideRedirect || attrs.Class != xproto.WindowClassInputOutput {
+			continue
+		}
+		xids = append(xids, tree.Children[i])
+	}
+	return xids, false
+}
+
+// syncClients сверяет индекс со списком окон: новые загружаются, исчезнувшие
+// удаляются, порядок наложения обновляется
+func (wi *winIndex) syncClients() {
+	xids, ewmh := wi.readClientList()
+
+	var added []*winEntry
+	for _, xid := range xids {
+		if _, ok := wi.windows[xid]; !ok {
+			if e := wi.loadWindow(xid); e != nil {
+				added = append(added, e)
+			}
+		}
+	}
+
+	present := make(map[xproto.Window]int, len(xids))
+	for i, xid := range xids {
+		present[xid] = i
+	}
+
+	wi.mu.Lock()
+	defer wi.mu.Unlock()
+	wi.ewmh = ewmh
+	for _, e := range added {
+		wi.windows[e.xid] = e
+		if e.frame != e.xid {
+			wi.frames[e.frame] = e.xid
+		}
+	}
+	for xid := range wi.windows {
+		if _, ok := present[xid]; !ok {
+			wi.removeLocked(xid)
+		}
+	}
+	for xid, e := range wi.windows {
+		e.stack = present[xid]
+	}
+	wi.notifyLocked()
+}
+
+func (wi *winIndex) syncActive() {
+	reply, err := xproto.GetProperty(wi.conn, false, wi.root, wi.atoms["_NET_ACTIVE_WINDOW"], xproto.AtomWindow, 0, 1).Reply()
+	var active xproto.Window
+	if err == nil {
+		if xids := propWindows(reply); len(xids) > 0 {
+			active = xids[0]
+		}
+	}
+	wi.mu.Lock()
+	wi.active = active
+	wi.notifyLocked()
+	wi.mu.Unlock()
+}
+
+// windowProps — запросы свойств окна, отправленные одним пакетом
+type windowProps struct {
+	pid, netName, name, class, state, desktop, extents xproto.GetPropertyCookie
+}
+
+func (wi *winIndex) requestProps(xid xproto.Window) windowProps {
+	get := func(atom, typ xproto.Atom) xproto.GetPropertyCookie {
+		return xproto.GetProperty(wi.conn, false, xid, atom, typ, 0, 1<<12)
+	}
+	return windowProps{
+		pid:     get(wi.atoms["_NET_WM_PID"], xproto.AtomCardinal),
+		netName: get(wi.atoms["_NET_WM_NAME"], wi.atoms["UTF8_STRING"]),
+		name:    get(xproto.AtomWmName, xproto.AtomAny),
+		class:   get(xproto.AtomWmClass, xproto.AtomString),
+		state:   get(wi.atoms["_NET_WM_STATE"], xproto.AtomAtom),
+		desktop: get(wi.atoms["_NET_WM_DESKTOP"], xproto.AtomCardinal),
+		extents: get(wi.atoms["_NET_FRAME_EXTENTS"], xproto.AtomCardinal),
+	}
+}
+
+// loadWindow подписывается на события окна и читает его состояние. Подписка
+// идёт первой, чтобы изменения между чтением и подпиской не потерялись
+func (wi *winIndex) loadWindow(xid xproto.Window) *winEntry {
+	mask := []uint32{xproto.EventMaskPropertyChange | xproto.EventMaskStructureNotify}
+	xproto.ChangeWindowAttributes(wi.conn, xid, xproto.CwEventMask, mask)
+
+	attrsCookie := xproto.GetWindowAttributes(wi.conn, xid)
+	props := wi.requestProps(xid)
+	attrs, err := attrsCookie.Reply()
+	if err != nil {
+		return nil
+	}
+
+	e := &winEntry{xid: xid, desktop: -1, mapped: attrs.MapState == xproto.MapStateViewable}
+	wi.applyProps(e, props)
+	if !wi.readGeometry(e) {
+		return nil
+	}
+	return e
+}
+
+func (wi *winIndex) applyProps(e *winEntry, props windowProps) {
+	if values := propCardinals(props.pid); len(values) > 0 {
+		e.pid = int(values[0])
+	}
+	e.title = propString(props.netName)
+	if e.title == "" {
+		e.title = propString(props.name)
+	}
+	if reply, err := props.class.Reply(); err == nil {
+		parts := strings.Split(strings.TrimRight(string(reply.Value), "\x00"), "\x00")
+		e.instance = parts[0]
+		if len(parts) > 1 {
+			e.class = parts[1]
+		}
+	}
+	e.states = wi.propStates(props.state)
+	if values := propCardinals(props.desktop); len(values) > 0 && values[0] != 0xFFFFFFFF {
+		e.desktop = int(values[0])
+	}
+	if values := propCardinals(props.extents); len(values) == 4 {
+		for i, v := range values {
+			e.extents[i] = int(v)
+		}
+	}
+}
+
+// readGeometry обновляет положение, размер и рамку окна. Вызывается только
+// из горутины событий (или до её запуска)
+func (wi *winIndex) readGeometry(e *winEntry) bool {
+	geomCookie := xproto.GetGeometry(wi.conn, xproto.Drawable(e.xid))
+	posCookie := xproto.TranslateCoordinates(wi.conn, e.xid, wi.root, 0, 0)
+	geom, err := geomCookie.Reply()
+	if err != nil {
+		return false
+	}
+	pos, err := posCookie.Reply()
+	if err != nil {
+		return false
+	}
+	e.x, e.y = int(pos.DstX), int(pos.DstY)
+	e.width, e.height = int(geom.Width), int(geom.Height)
+
+	// Рамка — предок, чей родитель корень. Обычно один уровень
+	frame := e.xid
+	for {
+		tree, err := xproto.QueryTree(wi.conn, frame).Reply()
+		if err != nil || tree.Parent == wi.root || tree.Parent == 0 {
+			break
+		}
+		frame = tree.Parent
+	}
+	e.frame = frame
+	return true
+}
+
+// update применяет изменение к копии записи и подменяет её под блокировкой:
+// читатели видят либо старое, либо новое состояние окна целиком
+func (wi *winIndex) update(xid xproto.Window, change func(e *winEntry) bool) {
+	current, ok := wi.windows[xid]
+	if !ok {
+		return
+	}
+	next := *current
+	if !change(&next) {
+		return
+	}
+	wi.mu.Lock()
+	defer wi.mu.Unlock()
+	if _, ok := wi.windows[xid]; !ok {
+		return
+	}
+	if current.frame != next.frame {
+		delete(wi.frames, current.frame)
+		if next.frame != next.xid {
+			wi.frames[next.frame] = xid
+		}
+	}
+	wi.windows[xid] = &next
+	wi.notifyLocked()
+}
+
+func (wi *winIndex) refreshGeometry(xid xproto.Window) {
+	wi.update(xid, wi.readGeometry)
+}
+
+func (wi *winIndex) refreshProperty(xid xproto.Window, atom xproto.Atom) {
+	switch atom {
+	case wi.atoms["_NET_WM_PID"], wi.atoms["_NET_WM_NAME"], xproto.AtomWmName, xproto.AtomWmClass,
+		wi.atoms["_NET_WM_STATE"], wi.atoms["_NET_WM_DESKTOP"], wi.atoms["_NET_FRAME_EXTENTS"]:
+	default:
+		return
+	}
+	// Заголовок зависит от двух свойств, поэтому перечитываются все сразу
+	props := wi.requestProps(xid)
+	wi.update(xid, func(e *winEntry) bool {
+		e.pid, e.title, e.class, e.instance = 0, "", "", ""
+		e.states, e.desktop, e.extents = nil, -1, [4]int{}
+		wi.applyProps(e, props)
+		return true
+	})
+}
+
+func (wi *winIndex) setMapped(xid xproto.Window, mapped bool) {
+	wi.update(xid, func(e *winEntry) bool {
+		if e.mapped == mapped {
+			return false
+		}
+		e.mapped = mapped
+		return true
+	})
+}
+
+func (wi *winIndex) removeLocked(xid xproto.Window) {
+	if e, ok := wi.windows[xid]; ok {
+		delete(wi.frames, e.frame)
+		delete(wi.windows, xid)
+	}
+}
+
+func (wi *winIndex) notifyLocked() {
+	close(wi.changed)
+	wi.changed = make(chan struct{})
+}
+
+func (wi *winIndex) propStates(cookie xproto.GetPropertyCookie) []string {
+	var states []string
+	for _, atom := range propCardinals(cookie) {
+		if name, ok := wi.stateNames[xproto.Atom(atom)]; ok {
+			states = append(states, name)
+		}
+	}
+	return states
+}
+
+func propCardinals(cookie xproto.GetPropertyCookie) []uint32 {
+	reply, err := cookie.Reply()
+	if err != nil || reply.Format != 32 {
+		return nil
+	}
+	values := make([]uint32, 0, len(reply.Value)/4)
+	for i := 0; i+4 <= len(reply.Value); i += 4 {
+		values = append(values, xgb.Get32(reply.Value[i:]))
+	}
+	return values
+}
+
+func propWindows(reply *xproto.GetPropertyReply) []xproto.Window {
+	if reply.Format != 32 {
+		return nil
+	}
+	xids := make([]xproto.Window, 0, len(reply.Value)/4)
+	for i := 0; i+4 <= len(reply.Value); i += 4 {
+		xids = append(xids, xproto.Window(xgb.Get32(reply.Value[i:])))
+	}
+	return xids
+}
+
+func propString(cookie xproto.GetPropertyCookie) string {
+	reply, err := cookie.Reply()
+	if err != nil || reply.Format != 8 {
+		return ""
+	}
+	return string(reply.Value)
+}
+
+// list возвращает окна сверху вниз по порядку наложения
+func (wi *winIndex) list() []winEntry {
+	wi.mu.RLock()
+	defer wi.mu.RUnlock()
+	result := make([]winEntry, 0, len(wi.windows))
+	for _, e := range wi.windows {
+		result = append(result, *e)
+	}
+	sort.Slice(result, func(i, j int) bool { return result[i].stack > result[j].stack })
+	return result
+}
+
+func (wi *winIndex) lookup(xid xproto.Window) (winEntry, bool) {
+	wi.mu.RLock()
+	defer wi.mu.RUnlock()
+	if e, ok := wi.windows[xid]; ok {
+		return *e, true
+	}
+	return winEntry{}, false
+}
+
+// byPID возвращает верхнее окно процесса, отображаемые окна в приоритете
+func (wi *winIndex) byPID(pid int) (winEntry, bool) {
+	wi.mu.RLock()
+	defer wi.mu.RUnlock()
+	var best *winEntry
+	for _, e := range wi.windows {
+		if e.pid != pid {
+			continue
+		}
+		if best == nil || e.visible() && !best.visible() ||
+			e.visible() == best.visible() && e.stack > best.stack {
+			best = e
+		}
+	}
+	if best == nil {
+		return winEntry{}, false
+	}
+	return *best, true
+}
+
+func (wi *winIndex) activeWindow() (winEntry, bool) {
+	wi.mu.RLock()
+	defer wi.mu.RUnlock()
+	if e, ok := wi.windows[wi.active]; ok {
+		return *e, true
+	}
+	return winEntry{}, false
+}
+
+// changes возвращает канал, который закроется при следующем изменении индекса
+func (wi *winIndex) changes() <-chan struct{} {
+	wi.mu.RLock()
+	defer wi.mu.RUnlock()
+	return wi.changed
+}
+
+// Операции над окнами по XID. Состояние окон меняет WM, поэтому запросы
+// идут ему client message'ами EWMH/ICCCM (как у robotgo), а геометрия —
+// ConfigureWindow. Индекс обновится сам по пришедшим событиям.
+
+const (
+	ewmhSourcePager   = 2 // запрос от пейджера/инструмента, а не от приложения
+	ewmhStateRemove   = 0
+	ewmhStateAdd      = 1
+	icccmIconicState  = 3
+	clientMessageMask = xproto.EventMaskSubstructureNotify | xproto.EventMaskSubstructureRedirect
+)
+
+func clientMessage(xid xproto.Window, atom xproto.Atom, data ...uint32) string {
+	values := make([]uint32, 5)
+	copy(values, data)
+	event := xproto.ClientMessageEvent{
+		Format: 32,
+		Window: xid,
+		Type:   atom,
+		Data:   xproto.ClientMessageDataUnionData32New(values),
+	}
+	return string(event.Bytes())
+}
+
+func (wi *winIndex) sendClientMessage(xid xproto.Window, atom xproto.Atom, data ...uint32) error {
+	event := clientMessage(xid, atom, data...)
+	return xproto.SendEventChecked(wi.conn, false, wi.root, clientMessageMask, event).Check()
+}
+
+// queueClientMessage отправляет client message без ожидания ответа — для
+// пакетных операций, которые завершаются одним Sync
+func (wi *winIndex) queueClientMessage(xid xproto.Window, atom xproto.Atom, data ...uint32) {
+	xproto.SendEvent(wi.conn, false, wi.root, clientMessageMask, clientMessage(xid, atom, data...))
+}
+
+func (wi *winIndex) activate(xid xproto.Window) error {
+	return wi.sendClientMessage(xid, wi.atoms["_NET_ACTIVE_WINDOW"], ewmhSourcePager)
+}
+
+func (wi *winIndex) minimize(xid xproto.Window) error {
+	return wi.sendClientMessage(xid, wi.atoms["WM_CHANGE_STATE"], icccmIconicState)
+}
+
+func (wi *winIndex) maximize(xid xproto.Window) error {
+	return wi.sendClientMessage(xid, wi.atoms["_NET_WM_STATE"], ewmhStateAdd,
+		uint32(wi.atoms["_NET_WM_STATE_MAXIMIZED_VERT"]), uint32(wi.atoms["_NET_WM_STATE_MAXIMIZED_HORZ"]), ewmhSourcePager)
+}
+
+func (wi *winIndex) close(xid xproto.Window) error {
+	return wi.sendClientMessage(xid, wi.atoms["_NET_CLOSE_WINDOW"], 0, ewmhSourcePager)
+}
+
+func (wi *winIndex) move(xid xproto.Window, x, y int) error {
+	return xproto.ConfigureWindowChecked(wi.conn, xid, xproto.ConfigWindowX|xproto.ConfigWindowY,
+		[]uint32{uint32(int32(x)), uint32(int32(y))}).Check()
+}
+
+// compositeRepaintDelay — пауза после перенаправления окна: X-сервер не
+// копирует старое содержимое в новый pixmap, приложение перерисовывает
+// окно по Expose
+const compositeRepaintDelay = 100 * time.Millisecond
+
+func (wi *winIndex) initComposite() error {
+	wi.compositeOnce.Do(func() {
+		if err := composite.Init(wi.conn); err != nil {
+			wi.compositeErr = fmt.Errorf("XComposite is not available: %w", err)
+			return
+		}
+		if _, err := composite.QueryVersion(wi.conn, 0, 4).Reply(); err != nil {
+			wi.compositeErr = fmt.Errorf("XComposite is not available: %w", err)
+			return
+		}
+		wi.redirected = make(map[xproto.Window]bool)
+	})
+	return wi.compositeErr
+}
+
+// captureOffscreen читает содержимое окна из его off-screen pixmap
+// (XComposite), поэтому перекрытые части окна тоже попадают в снимок.
+// Рамка перенаправляется при первом снимке и остаётся перенаправленной до
+// закрытия окна; с композитным WM окна уже перенаправлены, и это бесплатно
+func (wi *winIndex) captureOffscreen(ctx context.Context, e winEntry, includeFrame bool) (stdImage.Image, error) {
+	if err := wi.initComposite(); err != nil {
+		return nil, err
+	}
+
+	wi.compositeMu.Lock()
+	fresh := !wi.redirected[e.frame]
+	if fresh {
+		if err := composite.RedirectWindowChecked(wi.conn, e.frame, composite.RedirectAutomatic).Check(); err != nil {
+			wi.compositeMu.Unlock()
+			return nil, fmt.Errorf("failed to redirect window: %w", err)
+		}
+		wi.redirected[e.frame] = true
+	}
+	wi.compositeMu.Unlock()
+	if fresh {
+		if err := sleepContext(ctx, compositeRepaintDelay); err != nil {
+			return nil, err
+		}
+	}
+
+	pixmap, err := xproto.NewPixmapId(wi.conn)
+	if err != nil {
+		return nil, err
+	}
+	if err := composite.NameWindowPixmapChecked(wi.conn, e.frame, pixmap).Check(); err != nil {
+		return nil, fmt.Errorf("failed to get window pixmap: %w", err)
+	}
+	defer xproto.FreePixmap(wi.conn, pixmap)
+
+	// Pixmap рамки включает декорации; клиентская область — со смещением
+	var x, y int16
+	width, height := e.width, e.height
+	if includeFrame {
+		geom, err := xproto.GetGeometry(wi.conn, xproto.Drawable(e.frame)).Reply()
+		if err != nil {
+			return nil, err
+		}
+		width, height = int(geom.Width), int(geom.Height)
+	} else if e.frame != e.xid {
+		pos, err := xproto.TranslateCoordinates(wi.conn, e.xid, e.frame, 0, 0).Reply()
+		if err != nil {
+			return nil, err
+		}
+		x, y = pos.DstX, pos.DstY
+	}
+
+	reply, err := xproto.GetImage(wi.conn, xproto.ImageFormatZPixmap, xproto.Drawable(pixmap),
+		x, y, uint16(width), uint16(height), math.MaxUint32).Reply()
+	if err != nil {
+		return nil, fmt.Errorf("failed to read window pixmap: %w", err)
+	}
+	return zpixmapToImage(reply.Data, reply.Depth, width, height, wi.lsbFirst)
+}
+
+// zpixmapToImage переводит ZPixmap глубины 24/32 (32 бита на пиксель) в RGBA
+func zpixmapToImage(data []byte, depth byte, width, height int, lsbFirst bool) (*stdImage.RGBA, error) {
+	if depth != 24 && depth != 32 {
+		return nil, fmt.Errorf("unsupported window depth: %d", depth)
+	}
+	if len(data) < width*height*4 {
+		return nil, fmt.Errorf("short image data: %d bytes for %dx%d", len(data), width, height)
+	}
+	img := stdImage.NewRGBA(stdImage.Rect(0, 0, width, height))
+	for i := 0; i < width*height; i++ {
+		src, dst := data[i*4:i*4+4], img.Pix[i*4:i*4+4]
+		if lsbFirst {
+			dst[0], dst[1], dst[2] = src[2], src[1], src[0] // B G R X
+		} else {
+			dst[0], dst[1], dst[2] = src[1], src[2], src[3] // X R G B
+		}
+		dst[3] = 0xFF
+	}
+	return img, nil
+}
+
+// windowArrangement — целевое состояние одного окна для window_arrange
+type windowArrangement struct {
+	target        windowTarget
+	hasPosition   bool
+	x, y          int
+	hasSize       bool
+	width, height int
+	state         string // "", normal, maximized, minimized или fullscreen
+}
+
+// arrange ставит в очередь запросы для всех окон и ждёт X-сервер один раз
+// в конце. Состояние снимается до смены геометрии (развёрнутому окну WM
+// не даст изменить размер) и ставится после неё
+func (wi *winIndex) arrange(items []windowArrangement) {
+	maxVert := uint32(wi.atoms["_NET_WM_STATE_MAXIMIZED_VERT"])
+	maxHorz := uint32(wi.atoms["_NET_WM_STATE_MAXIMIZED_HORZ"])
+	fullscreen := uint32(wi.atoms["_NET_WM_STATE_FULLSCREEN"])
+	wmState := wi.atoms["_NET_WM_STATE"]
+
+	for _, item := range items {
+		xid := item.target.xid
+		if item.state != "" && item.state != "maximized" {
+			wi.queueClientMessage(xid, wmState, ewmhStateRemove, maxVert, maxHorz, ewmhSourcePager)
+		}
+		if item.state != "" && item.state != "fullscreen" {
+			wi.queueClientMessage(xid, wmState, ewmhStateRemove, fullscreen, 0, ewmhSourcePager)
+		}
+		if item.state == "normal" {
+			if e, ok := wi.lookup(xid); ok && !e.visible() {
+				wi.queueClientMessage(xid, wi.atoms["_NET_ACTIVE_WINDOW"], ewmhSourcePager)
+			}
+		}
+
+		var mask uint16
+		var values []uint32
+		if item.hasPosition {
+			mask |= xproto.ConfigWindowX | xproto.ConfigWindowY
+			values = append(values, uint32(int32(item.x)), uint32(int32(item.y)))
+		}
+		if item.hasSize {
+			mask |= xproto.ConfigWindowWidth | xproto.ConfigWindowHeight
+			values = append(values, uint32(item.width), uint32(item.height))
+		}
+		if mask != 0 {
+			xproto.ConfigureWindow(wi.conn, xid, mask, values)
+		}
+
+		switch item.state {
+		case "maximized":
+			wi.queueClientMessage(xid, wmState, ewmhStateAdd, maxVert, maxHorz, ewmhSourcePager)
+		case "fullscreen":
+			wi.queueClientMessage(xid, wmState, ewmhStateAdd, fullscreen, 0, ewmhSourcePager)
+		case "minimized":
+			wi.queueClientMessage(xid, wi.atoms["WM_CHANGE_STATE"], icccmIconicState)
+		}
+	}
+	wi.conn.Sync()
+}
+
+func (wi *winIndex) resize(xid xproto.Window, width, height int) error {
+	if width <= 0 || height <= 0 {
+		return fmt.Errorf("invalid size %dx%d", width, height)
+	}
+	return xproto.ConfigureWindowChecked(wi.conn, xid, xproto.ConfigWindowWidth|xproto.ConfigWindowHeight,
+		[]uint32{uint32(width), uint32(height)}).Check()
+}
+
+// ==================== WINDOW HANDLERS ====================
+
+// windowTarget — окно, выбранное параметрами handle или pid. xid == 0 —
+// окна нет в индексе (или X недоступен), и операция идёт через robotgo по pid
+type windowTarget struct {
+	xid   xproto.Window
+	pid   int
+	byPID bool // окно выбрано параметром pid: сообщения называют его по PID
+}
+
+func (t windowTarget) String() string {
+	if t.byPID || t.xid == 0 {
+		return fmt.Sprintf("with PID %d", t.pid)
+	}
+	return fmt.Sprintf("0x%x", uint32(t.xid))
+}
+
+// parseWindowHandle принимает XID числом, строкой ("0x1a00007" или
+// десятичной) или объектом {"XWin": ...}, который возвращает
+// window_get_active в поле handle
+func parseWindowHandle(val interface{}) (xproto.Window, error) {
+	var xid uint64
+	var err error
+	switch v := val.(type) {
+	case float64:
+		if v <= 0 || v != math.Trunc(v) || v > math.MaxUint32 {
+			err = fmt.Errorf("invalid window handle: %v", v)
+		}
+		xid = uint64(v)
+	case string:
+		xid, err = strconv.ParseUint(v, 0, 32)
+	case map[string]interface{}:
+		return parseWindowHandle(v["XWin"])
+	default:
+		err = fmt.Errorf("invalid window handle: %v", val)
+	}
+	if err != nil || xid == 0 {
+		return 0, fmt.Errorf("invalid window handle: %v", val)
+	}
+	return xproto.Window(xid), nil
+}
+
+// resolveWindow выбирает окно по handle или pid. PID разрешается через
+// индекс окон, без запросов к X-серверу; ok == false — не передан ни один
+// из параметров
+func resolveWindow(args map[string]interface{}) (target windowTarget, ok bool, err error) {
+	if val, has := args["handle"]; has && val != nil {
+		xid, err := parseWindowHandle(val)
+		if err != nil {
+			return target, false, err
+		}
+		if err := windowIndex.start(); err != nil {
+			return target, false, fmt.Errorf("window handles require an X11 display: %w", err)
+		}
+		target.xid = xid
+		if e, found := windowIndex.lookup(xid); found {
+			target.pid = e.pid
+		}
+		return target, true, nil
+	}
+
+	if _, has := args["pid"]; !has {
+		return target, false, nil
+	}
+	target.pid, err = getRequiredIntArg(args, "pid")
+	if err != nil {
+		return target, false, err
+	}
+	target.byPID = true
+	if windowIndex.available() {
+		if e, found := windowIndex.byPID(target.pid); found {
+			target.xid = e.xid
+		}
+	}
+	return target, true, nil
+}
+
+// requireWindow — resolveWindow для инструментов, которым окно обязательно
+func requireWindow(args map[string]interface{}) (windowTarget, error) {
+	target, ok, err := resolveWindow(args)
+	if err == nil && !ok {
+		err = fmt.Errorf("missing required parameter: pid or handle")
+	}
+	return target, err
+}
+
+// indexedWindow возвращает запись индекса для окна, выбранного по handle;
+// окна вне индекса (не верхнего уровня, уже закрытые) — ошибка
+func indexedWindow(target windowTarget) (winEntry, error) {
+	e, ok := windowIndex.lookup(target.xid)
+	if !ok {
+		return e, fmt.Errorf("window %s not found", target)
+	}
+	return e, nil
+}
+
+func windowGetActiveHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	if windowIndex.available() {
+		if e, ok := windowIndex.activeWindow(); ok {
+			return mcp.NewToolResultText(jsonResponse(activeWindowResponse{
+				Handle: xwinHandle{XWin: uint32(e.xid)},
+				Xid:    uint32(e.xid),
+				Title:  e.title,
+				Pid:    e.pid,
+			})), nil
+		}
+	}
+	handle := robotgo.GetActive()
+	title := robotgo.GetTitle()
+	pid := robotgo.GetPid()
+
+	return mcp.NewToolResultText(jsonResponse(activeWindowResponse{
+		Handle: handle,
+		Title:  title,
+		Pid:    pid,
+	})), nil
+}
+
+func windowGetTitleHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	target, ok, err := resolveWindow(args)
+	if err != nil {
+		return nil, err
+	}
+
+	if ok && target.xid != 0 {
+		e, err := indexedWindow(target)
+		if err != nil {
+			return nil, err
+		}
+		return mcp.NewToolResultText(jsonResponse(titleResponse{Title: e.title})), nil
+	}
+	if !ok && windowIndex.available() {
+		if e, found := windowIndex.activeWindow(); found {
+			return mcp.NewToolResultText(jsonResponse(titleResponse{Title: e.title})), nil
+		}
+	}
+
+	var title string
+	if ok {
+		title = robotgo.GetTitle(target.pid)
+	} else {
+		title = robotgo.GetTitle()
+	}
+
+	return mcp.NewToolResultText(jsonResponse(titleResponse{Title: title})), nil
+}
+
+func windowGetBoundsHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	target, err := requireWindow(args)
+	if err != nil {
+		return nil, err
+	}
+
+	if target.xid != 0 {
+		e, err := indexedWindow(target)
+		if err != nil {
+			return nil, err
+		}
+		x, y, w, h := e.bounds()
+		return mcp.NewToolResultText(jsonResponse(boundsResponse{X: x, Y: y, Width: w, Height: h})), nil
+	}
+
+	x, y, w, h := robotgo.GetBounds(target.pid)
+
+	return mcp.NewToolResultText(jsonResponse(boundsResponse{X: x, Y: y, Width: w, Height: h})), nil
+}
+
+func windowSetActiveHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	target, err := requireWindow(args)
+	if err != nil {
+		return nil, err
+	}
+
+	if target.xid != 0 {
+		err = windowIndex.activate(target.xid)
+	} else {
+		err = robotgo.ActivePid(target.pid)
+	}
+	if err != nil {
+		return nil, fmt.Errorf("failed to activate window: %w", err)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Window %s activated", target),
+	})), nil
+}
+
+func windowMoveHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	target, err := requireWindow(args)
+	if err != nil {
+		return nil, err
+	}
+	x, err := getRequiredIntArg(args, "x")
+	if err != nil {
+		return nil, err
+	}
+	y, err := getRequiredIntArg(args, "y")
+	if err != nil {
+		return nil, err
+	}
+
+	if target.xid != 0 {
+		if err := windowIndex.move(target.xid, x, y); err != nil {
+			return nil, fmt.Errorf("failed to move window: %w", err)
+		}
+	} else {
+		robotgo.MoveWindow(target.pid, x, y)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Window moved to (%d, %d)", x, y),
+	})), nil
+}
+
+func windowResizeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	target, err := requireWindow(args)
+	if err != nil {
+		return nil, err
+	}
+	width, err := getRequiredIntArg(args, "width")
+	if err != nil {
+		return nil, err
+	}
+	height, err := getRequiredIntArg(args, "height")
+	if err != nil {
+		return nil, err
+	}
+
+	if target.xid != 0 {
+		if err := windowIndex.resize(target.xid, width, height); err != nil {
+			return nil, fmt.Errorf("failed to resize window: %w", err)
+		}
+	} else {
+		robotgo.ResizeWindow(target.pid, width, height)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Window resized to %dx%d", width, height),
+	})), nil
+}
+
+func windowMinimizeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	target, err := requireWindow(args)
+	if err != nil {
+		return nil, err
+	}
+
+	if target.xid != 0 {
+		if err := windowIndex.minimize(target.xid); err != nil {
+			return nil, fmt.Errorf("failed to minimize window: %w", err)
+		}
+	} else {
+		robotgo.MinWindow(target.pid)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: "Window minimized",
+	})), nil
+}
+
+func windowMaximizeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	target, err := requireWindow(args)
+	if err != nil {
+		return nil, err
+	}
+
+	if target.xid != 0 {
+		if err := windowIndex.maximize(target.xid); err != nil {
+			return nil, fmt.Errorf("failed to maximize window: %w", err)
+		}
+	} else {
+		robotgo.MaxWindow(target.pid)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: "Window maximized",
+	})), nil
+}
+
+func windowCloseHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	target, ok, err := resolveWindow(args)
+	if err != nil {
+		return nil, err
+	}
+
+	switch {
+	case ok && target.xid != 0:
+		if err := windowIndex.close(target.xid); err != nil {
+			return nil, fmt.Errorf("failed to close window: %w", err)
+		}
+	case ok:
+		robotgo.CloseWindow(target.pid)
+	default:
+		robotgo.CloseWindow()
+	}
+
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: "Window closed",
+	})), nil
+}
+
+func windowCaptureHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	_, parseSpan := startSpan(ctx, "parse_args")
+	args := getArgs(request)
+	target, err := requireWindow(args)
+	includeFrame := getBoolArg(args, "include_frame", false)
+	offscreen := getBoolArg(args, "offscreen", false)
+	parseSpan.end()
+	if err != nil {
+		return nil, err
+	}
+
+	response := windowCaptureResponse{Handle: uint32(target.xid), Offscreen: offscreen}
+	var img stdImage.Image
+	if target.xid != 0 {
+		e, err := indexedWindow(target)
+		if err != nil {
+			return nil, err
+		}
+		if includeFrame {
+			response.X, response.Y, response.Width, response.Height = e.bounds()
+		} else {
+			response.X, response.Y, response.Width, response.Height = e.x, e.y, e.width, e.height
+		}
+		if offscreen {
+			_, captureSpan := startSpan(ctx, "xcomposite.capture")
+			img, err = windowIndex.captureOffscreen(ctx, e, includeFrame)
+			captureSpan.setError(err)
+			captureSpan.end()
+			if err != nil {
+				return nil, fmt.Errorf("failed to capture window: %w", err)
+			}
+		}
+	} else {
+		if offscreen {
+			return nil, fmt.Errorf("offscreen capture requires an X11 window from the window index")
+		}
+		response.X, response.Y, response.Width, response.Height = robotgo.GetBounds(target.pid)
+	}
+	if response.Width <= 0 || response.Height <= 0 {
+		return nil, fmt.Errorf("window %s has no visible area", target)
+	}
+
+	if img == nil {
+		_, captureSpan := startSpan(ctx, "robotgo.capture")
+		img, err = robotgo.CaptureImg(response.X, response.Y, response.Width, response.Height)
+		captureSpan.setError(err)
+		captureSpan.end()
+		if err != nil {
+			return nil, fmt.Errorf("failed to capture window: %w", err)
+		}
+		if img == nil {
+			return nil, fmt.Errorf("failed to capture window: nil image returned")
+		}
+	}
+
+	base64Str, err := encodePNGBase64(ctx, img)
+	if err != nil {
+		return nil, err
+	}
+
+	return &mcp.CallToolResult{
+		Content: []mcp.Content{
+			mcp.NewImageContent(base64Str, "image/png"),
+			mcp.NewTextContent(jsonResponse(response)),
+		},
+	}, nil
+}
+
+const (
+	defaultArrangeTimeoutMs = 2000
+	// arrangeBoundsTolerance — допустимое расхождение итоговой геометрии с
+	// запрошенной: WM может сдвинуть окно на толщину рамки и заголовка
+	arrangeBoundsTolerance = 50
+)
+
+// parseWindowArrangement разбирает элемент массива windows. Окно должно
+// быть в индексе: запросы идут пакетом по XID
+func parseWindowArrangement(val interface{}) (windowArrangement, error) {
+	var item windowArrangement
+	entry, ok := val.(map[string]interface{})
+	if !ok {
+		return item, fmt.Errorf("windows entries must be objects")
+	}
+	target, err := requireWindow(entry)
+	if err != nil {
+		return item, err
+	}
+	if target.xid == 0 {
+		return item, fmt.Errorf("window %s not found", target)
+	}
+	item.target = target
+
+	_, hasX := entry["x"]
+	_, hasY := entry["y"]
+	if hasX || hasY {
+		if item.x, err = getRequiredIntArg(entry, "x"); err != nil {
+			return item, err
+		}
+		if item.y, err = getRequiredIntArg(entry, "y"); err != nil {
+			return item, err
+		}
+		item.hasPosition = true
+	}
+	_, hasWidth := entry["width"]
+	_, hasHeight := entry["height"]
+	if hasWidth || hasHeight {
+		if item.width, err = getRequiredIntArg(entry, "width"); err != nil {
+			return item, err
+		}
+		if item.height, err = getRequiredIntArg(entry, "height"); err != nil {
+			return item, err
+		}
+		if item.width <= 0 || item.height <= 0 {
+			return item, fmt.Errorf("invalid size %dx%d", item.width, item.height)
+		}
+		item.hasSize = true
+	}
+
+	item.state = getStringArg(entry, "state", "")
+	switch item.state {
+	case "", "normal", "maximized", "minimized", "fullscreen":
+	default:
+		return item, fmt.Errorf("invalid state %q: expected normal, maximized, minimized or fullscreen", item.state)
+	}
+	return item, nil
+}
+
+func windowArrangeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	entries, ok := args["windows"].([]interface{})
+	if !ok || len(entries) == 0 {
+		return nil, fmt.Errorf("missing required parameter: windows")
+	}
+	if err := windowIndex.start(); err != nil {
+		return nil, fmt.Errorf("window_arrange requires an X11 display: %w", err)
+	}
+	// Все элементы проверяются до первого запроса: ошибка не оставит
+	// окна расставленными наполовину
+	items := make([]windowArrangement, 0, len(entries))
+	for i, entry := range entries {
+		item, err := parseWindowArrangement(entry)
+		if err != nil {
+			return nil, fmt.Errorf("windows[%d]: %w", i, err)
+		}
+		items = append(items, item)
+	}
+	settle := time.Duration(getIntArg(args, "settle_ms", defaultWindowSettleMs)) * time.Millisecond
+	timeout := time.Duration(getIntArg(args, "timeout_ms", defaultArrangeTimeoutMs)) * time.Millisecond
+
+	start := time.Now()
+	windowIndex.arrange(items)
+
+	// WM применяет запросы асинхронно: итоговая геометрия берётся из индекса,
+	// когда окна перестанут меняться
+	waitCtx, cancel := context.WithTimeout(ctx, timeout)
+	defer cancel()
+	states := make([]windowWaitState, len(items))
+	for i, item := range items {
+		states[i].settle = settle
+		// Ожидаемая геометрия не даёт принять за итог состояние до реакции
+		// WM. После смены состояния (развернуть, свернуть) геометрию задаёт WM
+		if item.state == "" || item.state == "normal" {
+			states[i].expectArrangement(item)
+		}
+	}
+	response := windowArrangeResponse{}
+	for {
+		changes := windowIndex.changes()
+		now := time.Now()
+		settled := true
+		var recheck time.Duration
+		for i, item := range items {
+			e, ok := windowIndex.lookup(item.target.xid)
+			if !ok {
+				continue // окно закрылось
+			}
+			if done, wait := states[i].observe(&e, now); !done {
+				settled = false
+				recheck = max(recheck, wait)
+			}
+		}
+		if settled {
+			response.Settled = true
+			break
+		}
+		var timer *time.Timer
+		var timerC <-chan time.Time
+		if recheck > 0 {
+			timer = time.NewTimer(recheck)
+			timerC = timer.C
+		}
+		select {
+		case <-changes:
+		case <-timerC:
+		case <-waitCtx.Done():
+		}
+		if timer != nil {
+			timer.Stop()
+		}
+		if ctx.Err() != nil {
+			return nil, fmt.Errorf("arrange cancelled: %w", ctx.Err())
+		}
+		if waitCtx.Err() != nil {
+			break
+		}
+	}
+
+	active, _ := windowIndex.activeWindow()
+	response.Windows = make([]windowInfo, 0, len(items))
+	for _, item := range items {
+		if e, ok := windowIndex.lookup(item.target.xid); ok {
+			response.Windows = append(response.Windows, describeWindow(&e, e.xid == active.xid))
+		}
+	}
+	response.Count = len(response.Windows)
+	response.ElapsedMs = durationMs(time.Since(start))
+
+	return mcp.NewToolResultText(jsonResponse(response)), nil
+}
+
+// windowFilter — условия отбора окон из индекса
+type windowFilter struct {
+	title       *regexp.Regexp
+	class       string // lowercase; сравнивается с классом и экземпляром WM_CLASS
+	pid         int    // 0 — любой процесс
+	visibleOnly bool
+}
+
+func parseWindowFilter(args map[string]interface{}) (windowFilter, error) {
+	filter := windowFilter{
+		class:       strings.ToLower(getStringArg(args, "class", "")),
+		pid:         getIntArg(args, "pid", 0),
+		visibleOnly: getBoolArg(args, "visible_only", false),
+	}
+	if pattern := getStringArg(args, "title_pattern", ""); pattern != "" {
+		re, err := regexp.Compile(pattern)
+		if err != nil {
+			return filter, fmt.Errorf("invalid title_pattern %q: %w", pattern, err)
+		}
+		filter.title = re
+	}
+	return filter, nil
+}
+
+func (f windowFilter) match(e *winEntry) bool {
+	if f.pid != 0 && e.pid != f.pid {
+		return false
+	}
+	if f.class != "" && strings.ToLower(e.class) != f.class && strings.ToLower(e.instance) != f.class {
+		return false
+	}
+	if f.visibleOnly && !e.visible() {
+		return false
+	}
+	return f.title == nil || f.title.MatchString(e.title)
+}
+
+func describeWindow(e *winEntry, active bool) windowInfo {
+	x, y, width, height := e.bounds()
+	return windowInfo{
+		Handle:   uint32(e.xid),
+		Pid:      e.pid,
+		Title:    e.title,
+		Class:    e.class,
+		Instance: e.instance,
+		X:        x,
+		Y:        y,
+		Width:    width,
+		Height:   height,
+		Visible:  e.visible(),
+		Active:   active,
+		Desktop:  e.desktop,
+		States:   e.states,
+	}
+}
+
+func windowListHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	filter, err := parseWindowFilter(args)
+	if err != nil {
+		return nil, err
+	}
+	if err := windowIndex.start(); err != nil {
+		return nil, fmt.Errorf("window_list requires an X11 display: %w", err)
+	}
+
+	active, _ := windowIndex.activeWindow()
+	windows := []windowInfo{}
+	for _, e := range windowIndex.list() {
+		if filter.match(&e) {
+			windows = append(windows, describeWindow(&e, e.xid == active.xid))
+		}
+	}
+
+	return mcp.NewToolResultText(jsonResponse(windowListResponse{
+		Windows: windows,
+		Count:   len(windows),
+	})), nil
+}
+
+const (
+	defaultWindowWaitTimeoutMs = 10000
+	// defaultWindowSettleMs — сколько окно должно не двигаться и не менять
+	// размер, чтобы считаться установившимся
+	defaultWindowSettleMs = 200
+)
+
+// windowWaitState проверяет условие ожидания по текущему состоянию индекса
+type windowWaitState struct {
+	condition string
+	filter    windowFilter
+	settle    time.Duration
+
+	// для settled: ожидаемые x, y, width, height (nil — любое значение)
+	// и допуск в пикселях. Без них первое наблюдение — это состояние до
+	// реакции WM на только что отправленный запрос
+	expect    [4]*int
+	tolerance int
+
+	// для settled: последние границы окна и время их изменения
+	xid     xproto.Window
+	bounds  [4]int
+	changed time.Time
+}
+
+// parseExpectedBounds читает необязательные x, y, width, height
+func (ws *windowWaitState) parseExpectedBounds(args map[string]interface{}) {
+	for i, key := range []string{"x", "y", "width", "height"} {
+		if _, ok := args[key]; ok {
+			value := getIntArg(args, key, 0)
+			ws.expect[i] = &value
+		}
+	}
+	ws.tolerance = getIntArg(args, "tolerance", 0)
+}
+
+// expectArrangement ждёт геометрию, запрошенную элементом window_arrange
+func (ws *windowWaitState) expectArrangement(item windowArrangement) {
+	if item.hasPosition {
+		ws.expect[0], ws.expect[1] = &item.x, &item.y
+	}
+	if item.hasSize {
+		ws.expect[2], ws.expect[3] = &item.width, &item.height
+	}
+	ws.tolerance = arrangeBoundsTolerance
+}
+
+func (ws *windowWaitState) reachedExpected(bounds [4]int) bool {
+	for i, want := range ws.expect {
+		if want == nil {
+			continue
+		}
+		if diff := bounds[i] - *want; diff > ws.tolerance || -diff > ws.tolerance {
+			return false
+		}
+	}
+	return true
+}
+
+// check возвращает окно, если условие выполнено; для settled также время,
+// через которое стоит проверить снова без событий
+func (ws *windowWaitState) check(now time.Time) (*winEntry, bool, time.Duration) {
+	active, hasActive := windowIndex.activeWindow()
+	var match *winEntry
+	for _, e := range windowIndex.list() {
+		if !ws.filter.match(&e) {
+			continue
+		}
+		if ws.condition == "active" {
+			if hasActive && e.xid == active.xid {
+				return &e, true, 0
+			}
+			continue
+		}
+		match = &e
+		break
+	}
+	if match == nil {
+		ws.xid = 0
+		return nil, false, 0
+	}
+
+	switch ws.condition {
+	case "exists":
+		return match, true, 0
+	case "settled":
+		done, recheck := ws.observe(match, now)
+		return match, done, recheck
+	}
+	return match, false, 0
+}
+
+// observe запоминает границы окна; true — они достигли ожидаемых и не
+// менялись settle, иначе время до следующей проверки (0 — ждать событий)
+func (ws *windowWaitState) observe(e *winEntry, now time.Time) (bool, time.Duration) {
+	x, y, w, h := e.bounds()
+	bounds := [4]int{x, y, w, h}
+	if ws.changed.IsZero() || e.xid != ws.xid || bounds != ws.bounds {
+		ws.xid, ws.bounds, ws.changed = e.xid, bounds, now
+	}
+	if !ws.reachedExpected(bounds) {
+		return false, 0
+	}
+	if quiet := now.Sub(ws.changed); quiet < ws.settle {
+		return false, ws.settle - quiet
+	}
+	return true, 0
+}
+
+func windowWaitForHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	filter, err := parseWindowFilter(args)
+	if err != nil {
+		return nil, err
+	}
+	state := &windowWaitState{
+		condition: getStringArg(args, "condition", "exists"),
+		filter:    filter,
+		settle:    time.Duration(getIntArg(args, "settle_ms", defaultWindowSettleMs)) * time.Millisecond,
+	}
+	switch state.condition {
+	case "exists", "active", "settled":
+	default:
+		return nil, fmt.Errorf("invalid condition %q: expected exists, active or settled", state.condition)
+	}
+	state.parseExpectedBounds(args)
+	if err := windowIndex.start(); err != nil {
+		return nil, fmt.Errorf("window_wait_for requires an X11 display: %w", err)
+	}
+
+	timeoutMs := getIntArg(args, "timeout_ms", defaultWindowWaitTimeoutMs)
+	waitCtx := ctx
+	if timeoutMs > 0 {
+		var cancel context.CancelFunc
+		waitCtx, cancel = context.WithTimeout(ctx, time.Duration(timeoutMs)*time.Millisecond)
+		defer cancel()
+	}
+
+	start := time.Now()
+	response := windowWaitForResponse{Status: "timeout"}
+	for {
+		// Канал берётся до проверки: изменение между ними не потеряется
+		changes := windowIndex.changes()
+		if !windowIndex.available() {
+			return nil, fmt.Errorf("X connection closed")
+		}
+		e, done, recheck := state.check(time.Now())
+		if e != nil {
+			active, _ := windowIndex.activeWindow()
+			info := describeWindow(e, e.xid == active.xid)
+			response.Window = &info
+		}
+		if done {
+			response.Status = state.condition
+			break
+		}
+
+		var timer *time.Timer
+		var timerC <-chan time.Time
+		if recheck > 0 {
+			timer = time.NewTimer(recheck)
+			timerC = timer.C
+		}
+		select {
+		case <-changes:
+		case <-timerC:
+		case <-waitCtx.Done():
+		}
+		if timer != nil {
+			timer.Stop()
+		}
+		if ctx.Err() != nil {
+			return nil, fmt.Errorf("wait cancelled: %w", ctx.Err())
+		}
+		if waitCtx.Err() != nil {
+			break
+		}
+	}
+	response.ElapsedMs = durationMs(time.Since(start))
+
+	return mcp.NewToolResultText(jsonResponse(response)), nil
+}
+
+// ==================== PROCESS INDEX ====================
+
+// Индекс процессов для process_list/process_find_by_name/process_get_name.
+// На Linux снимок /proc строится один раз, а при следующих вызовах
+// перечитывается только список PID: имена читаются лишь для новых PID,
+// завершившиеся удаляются. procfs не обновляет mtime каталога /proc при
+// появлении процессов, поэтому изменения ищутся сравнением множеств PID.
+// PID, переиспользованный между обходами, выявляется по времени запуска
+// (поле 22 /proc/<pid>/stat), которое проверяется только у PID,
+// попавших в ответ запроса.
+// Имена дополнительно индексируются в hash map (lowercase имя → PID).
+// На других ОС запросы идут в robotgo, как раньше.
+
+const (
+	// procIndexMinRefresh — вызовы чаще этого интервала обслуживаются текущим снимком
+	procIndexMinRefresh = 50 * time.Millisecond
+	// procIndexVerifyInterval — сколько доверять проверке времени запуска PID
+	procIndexVerifyInterval = time.Second
+)
+
+type procEntry struct {
+	name     string
+	lower    string
+	uid      int       // реальный UID владельца
+	start    uint64    // время запуска в тиках с загрузки: отличает переиспользованный PID
+	verified time.Time // когда start последний раз сверялся с /proc
+	gen      uint64    // поколение последнего обхода /proc, в котором PID был виден
+}
+
+type procIndex struct {
+	mu        sync.Mutex
+	root      string
+	entries   map[int]*procEntry
+	byName    map[string][]int
+	gen       uint64
+	refreshed time.Time
+}
+
+var processIndex = newProcIndex("/proc")
+
+func newProcIndex(root string) *procIndex {
+	return &procIndex{
+		root:    root,
+		entries: make(map[int]*procEntry),
+		byName:  make(map[string][]int),
+	}
+}
+
+// refreshLocked синхронизирует индекс с /proc по списку PID; файлы
+// процессов читаются только для новых PID
+func (ix *procIndex) refreshLocked() error {
+	if !ix.refreshed.IsZero() && time.Since(ix.refreshed) < procIndexMinRefresh {
+		return nil
+	}
+
+	dir, err := os.Open(ix.root)
+	if err != nil {
+		return err
+	}
+	names, err := dir.Readdirnames(-1)
+	dir.Close()
+	if err != nil {
+		return err
+	}
+
+	ix.gen++
+	for _, n := range names {
+		if n == "" || n[0] < '0' || n[0] > '9' {
+			continue
+		}
+		pid, err := strconv.Atoi(n)
+		if err != nil {
+			continue
+		}
+		if e, ok := ix.entries[pid]; ok {
+			e.gen = ix.gen
+			continue
+		}
+		ix.loadLocked(pid)
+	}
+
+	for pid, e := range ix.entries {
+		if e.gen != ix.gen {
+			delete(ix.entries, pid)
+			ix.removeNameLocked(e.lower, pid)
+		}
+	}
+
+	ix.refreshed = time.Now()
+	return nil
+}
+
+// loadLocked читает PID и добавляет его в индекс; nil — процесс завершился
+// между чтением каталога и его файлов
+func (ix *procIndex) loadLocked(pid int) *procEntry {
+	start, err := readProcStartTicks(ix.root, pid)
+	if err != nil {
+		return nil
+	}
+	name, uid, err := readProcIdentity(ix.root, pid)
+	if err != nil {
+		return nil
+	}
+	e := &procEntry{name: name, lower: strings.ToLower(name), uid: uid, start: start, verified: time.Now(), gen: ix.gen}
+	ix.entries[pid] = e
+	ix.byName[e.lower] = append(ix.byName[e.lower], pid)
+	return e
+}
+
+// verifyLocked сверяет время запуска PID перед выдачей в ответ. Другое
+// время — это новый процесс на месте завершившегося: запись перечитывается.
+// nil — процесс завершился
+func (ix *procIndex) verifyLocked(pid int, e *procEntry) *procEntry {
+	now := time.Now()
+	if now.Sub(e.verified) < procIndexVerifyInterval {
+		return e
+	}
+	start, err := readProcStartTicks(ix.root, pid)
+	if err == nil && start == e.start {
+		e.verified = now
+		return e
+	}
+	delete(ix.entries, pid)
+	ix.removeNameLocked(e.lower, pid)
+	if err != nil {
+		return nil
+	}
+	return ix.loadLocked(pid)
+}
+
+// invalidate заставляет следующий запрос перечитать /proc — вызывается,
+// когда сервер сам запускает или завершает процессы
+func (ix *procIndex) invalidate() {
+	ix.mu.Lock()
+	ix.refreshed = time.Time{}
+	ix.mu.Unlock()
+}
+
+func (ix *procIndex) removeNameLocked(lower string, pid int) {
+	pids := ix.byName[lower]
+	for i, p := range pids {
+		if p == pid {
+			pids = append(pids[:i], pids[i+1:]...)
+			break
+		}
+	}
+	if len(pids) == 0 {
+		delete(ix.byName, lower)
+	} else {
+		ix.byName[lower] = pids
+	}
+}
+
+// readProcIdentity возвращает имя и реальный UID процесса из
+// /proc/<pid>/status. Имя определяется так же, как в gopsutil (через него
+// работает robotgo): Name, а если он обрезан ядром до 15 символов —
+// basename argv[0], начинающийся с Name
+func readProcIdentity(root string, pid int) (string, int, error) {
+	procDir := root + "/" + strconv.Itoa(pid)
+	status, err := os.ReadFile(procDir + "/status")
+	if err != nil {
+		return "", 0, err
+	}
+
+	name, uid := "", -1
+	for _, line := range strings.Split(string(status), "\n") {
+		key, value, ok := strings.Cut(line, ":")
+		if !ok {
+			continue
+		}
+		switch key {
+		case "Name":
+			name = strings.TrimSpace(value)
+		case "Uid":
+			if fields := strings.Fields(value); len(fields) > 0 {
+				if v, err := strconv.Atoi(fields[0]); err == nil {
+					uid = v
+				}
+			}
+		}
+		if uid >= 0 && name != "" {
+			break
+		}
+	}
+
+	if len(name) < 15 {
+		return name, uid, nil
+	}
+	cmdline, err := os.ReadFile(procDir + "/cmdline")
+	if err != nil || len(cmdline) == 0 {
+		return name, uid, nil
+	}
+	argv0, _, _ := bytes.Cut(cmdline, []byte{0})
+	if extended := filepath.Base(string(argv0)); strings.HasPrefix(extended, name) {
+		return extended, uid, nil
+	}
+	return name, uid, nil
+}
+
+// processRecord — процесс из индекса (отсортированный по PID список)
+type processRecord struct {
+	pid  int
+	name string
+	uid  int // -1, если неизвестен (не Linux)
+}
+
+func (ix *procIndex) list() ([]processRecord, error) {
+	ix.mu.Lock()
+	defer ix.mu.Unlock()
+
+	if err := ix.refreshLocked(); err != nil {
+		return nil, err
+	}
+	// verifyLocked может пересоздать запись, поэтому map не обходится напрямую
+	pids := make([]int, 0, len(ix.entries))
+	for pid := range ix.entries {
+		pids = append(pids, pid)
+	}
+	list := make([]processRecord, 0, len(pids))
+	for _, pid := range pids {
+		if e := ix.verifyLocked(pid, ix.entries[pid]); e != nil {
+			list = append(list, processRecord{pid: pid, name: e.name, uid: e.uid})
+		}
+	}
+	sort.Slice(list, func(i, j int) bool { return list[i].pid < list[j].pid })
+	return list, nil
+}
+
+// findIDs ищет процессы, имя которых содержит name без учёта регистра
+// (как robotgo.FindIds); перебираются уникальные имена, а не все PID
+func (ix *procIndex) findIDs(name string) ([]int, error) {
+	ix.mu.Lock()
+	defer ix.mu.Unlock()
+
+	if err := ix.refreshLocked(); err != nil {
+		return nil, err
+	}
+	needle := strings.ToLower(name)
+	var candidates []int
+	for lower, namePids := range ix.byName {
+		if strings.Contains(lower, needle) {
+			candidates = append(candidates, namePids...)
+		}
+	}
+	pids := candidates[:0]
+	for _, pid := range candidates {
+		if e := ix.verifyLocked(pid, ix.entries[pid]); e != nil && strings.Contains(e.lower, needle) {
+			pids = append(pids, pid)
+		}
+	}
+	sort.Ints(pids)
+	return pids, nil
+}
+
+func (ix *procIndex) name(pid int) (string, error) {
+	ix.mu.Lock()
+	defer ix.mu.Unlock()
+
+	if err := ix.refreshLocked(); err != nil {
+		return "", err
+	}
+	if e, ok := ix.entries[pid]; ok {
+		if e = ix.verifyLocked(pid, e); e != nil {
+			return e.name, nil
+		}
+		return "", fmt.Errorf("process %d not found", pid)
+	}
+	// Процесс мог появиться после последнего обхода
+	if name, _, err := readProcIdentity(ix.root, pid); err == nil {
+		return name, nil
+	}
+	return "", fmt.Errorf("process %d not found", pid)
+}
+
+func listProcesses() ([]processRecord, error) {
+	if runtime.GOOS == "linux" {
+		return processIndex.list()
+	}
+	processes, err := robotgo.Process()
+	if err != nil {
+		return nil, err
+	}
+	list := make([]processRecord, 0, len(processes))
+	for _, p := range processes {
+		list = append(list, processRecord{pid: p.Pid, name: p.Name, uid: -1})
+	}
+	return list, nil
+}
+
+// ==================== PROCESS DETAILS ====================
+
+// Чтение /proc/<pid>/stat, cmdline и сведений о пользователях — для полей
+// process_list и статистики процессов. Вне Linux файлов нет, и поля,
+// которые из них берутся, остаются пустыми.
+
+// procClockTicks — USER_HZ, единица времени в /proc/<pid>/stat. Без cgo
+// sysconf(_SC_CLK_TCK) недоступен; на всех поддерживаемых Linux это 100
+const procClockTicks = 100
+
+// procStat — поля /proc/<pid>/stat (нумерация полей — по proc(5))
+type procStat struct {
+	state      string
+	ppid       int
+	pgrp       int
+	utime      uint64 // в тиках procClockTicks
+	stime      uint64
+	numThreads int
+	startTicks uint64 // с момента загрузки
+	rssPages   int64
+}
+
+// readProcStatFields возвращает поля /proc/<pid>/stat после comm:
+// fields[0] — поле 3 (state)
+func readProcStatFields(root string, pid int) ([]string, error) {
+	data, err := os.ReadFile(root + "/" + strconv.Itoa(pid) + "/stat")
+	if err != nil {
+		return nil, err
+	}
+	// comm (поле 2) в скобках может содержать пробелы и скобки
+	end := bytes.LastIndexByte(data, ')')
+	if end < 0 {
+		return nil, fmt.Errorf("malformed /proc/%d/stat", pid)
+	}
+	fields := strings.Fields(string(data[end+1:]))
+	if len(fields) < 22 {
+		return nil, fmt.Errorf("malformed /proc/%d/stat", pid)
+	}
+	return fields, nil
+}
+
+// readProcStartTicks — время запуска процесса (поле 22) в тиках с загрузки
+func readProcStartTicks(root string, pid int) (uint64, error) {
+	fields, err := readProcStatFields(root, pid)
+	if err != nil {
+		return 0, err
+	}
+	return strconv.ParseUint(fields[22-3], 10, 64)
+}
+
+func readProcStat(pid int) (procStat, error) {
+	var st procStat
+	fields, err := readProcStatFields("/proc", pid)
+	if err != nil {
+		return st, err
+	}
+	field := func(n int) string { return fields[n-3] }
+	st.state = field(3)
+	st.ppid, _ = strconv.Atoi(field(4))
+	st.pgrp, _ = strconv.Atoi(field(5))
+	st.utime, _ = strconv.ParseUint(field(14), 10, 64)
+	st.stime, _ = strconv.ParseUint(field(15), 10, 64)
+	st.numThreads, _ = strconv.Atoi(field(20))
+	st.startTicks, _ = strconv.ParseUint(field(22), 10, 64)
+	st.rssPages, _ = strconv.ParseInt(field(24), 10, 64)
+	return st, nil
+}
+
+// startTime — время запуска процесса
+func (st procStat) startTime() time.Time {
+	return procBootTime().Add(time.Duration(st.startTicks) * time.Second / procClockTicks)
+}
+
+// cpuTime — суммарное процессорное время (user + system)
+func (st procStat) cpuTime() time.Duration {
+	return time.Duration(st.utime+st.stime) * time.Second / procClockTicks
+}
+
+var (
+	bootTimeOnce sync.Once
+	bootTime     time.Time
+)
+
+// procBootTime — время загрузки системы (btime из /proc/stat)
+func procBootTime() time.Time {
+	bootTimeOnce.Do(func() {
+		data, err := os.ReadFile("/proc/stat")
+		if err != nil {
+			return
+		}
+		for _, line := range strings.Split(string(data), "\n") {
+			if value, ok := strings.CutPrefix(line, "btime "); ok {
+				if sec, err := strconv.ParseInt(strings.TrimSpace(value), 10, 64); err == nil {
+					bootTime = time.Unix(sec, 0)
+				}
+				return
+			}
+		}
+	})
+	return bootTime
+}
+
+// readProcCmdline возвращает командную строку процесса через пробел
+func readProcCmdline(pid int) string {
+	data, err := os.ReadFile("/proc/" + strconv.Itoa(pid) + "/cmdline")
+	if err != nil {
+		return ""
+	}
+	data = bytes.TrimRight(data, "\x00")
+	return string(bytes.ReplaceAll(data, []byte{0}, []byte{' '}))
+}
+
+// userNames кеширует uid → имя пользователя
+var userNames sync.Map
+
+func userName(uid int) string {
+	if uid < 0 {
+		return ""
+	}
+	if name, ok := userNames.Load(uid); ok {
+		return name.(string)
+	}
+	name := strconv.Itoa(uid)
+	if u, err := user.LookupId(name); err == nil {
+		name = u.Username
+	}
+	userNames.Store(uid, name)
+	return name
+}
+
+// lookupUID принимает имя пользователя или числовой UID
+func lookupUID(name string) (int, error) {
+	if uid, err := strconv.Atoi(name); err == nil {
+		return uid, nil
+	}
+	u, err := user.Lookup(name)
+	if err != nil {
+		return 0, fmt.Errorf("unknown user %q: %w", name, err)
+	}
+	return strconv.Atoi(u.Uid)
+}
+
+func findProcessIDs(name string) ([]int, error) {
+	if runtime.GOOS == "linux" {
+		return processIndex.findIDs(name)
+	}
+	return robotgo.FindIds(name)
+}
+
+func processName(pid int) (string, error) {
+	if runtime.GOOS == "linux" {
+		return processIndex.name(pid)
+	}
+	return robotgo.FindName(pid)
+}
+
+// ==================== PROCESS HANDLERS ====================
+
+// processListFields — поля, которые можно запросить в process_list
+var processListFields = map[string]bool{
+	"pid": true, "name": true, "user": true, "cmdline": true,
+	"cpu": true, "rss": true, "start_time": true,
+}
+
+// compileNamePattern возвращает функцию сопоставления имени процесса:
+// glob (без учёта регистра) или regex (синтаксис Go regexp)
+func compileNamePattern(pattern, patternType string) (func(string) bool, error) {
+	switch patternType {
+	case "glob":
+		lower := strings.ToLower(pattern)
+		if _, err := path.Match(lower, ""); err != nil {
+			return nil, fmt.Errorf("invalid glob pattern %q: %w", pattern, err)
+		}
+		return func(name string) bool {
+			matched, _ := path.Match(lower, strings.ToLower(name))
+			return matched
+		}, nil
+	case "regex":
+		re, err := regexp.Compile(pattern)
+		if err != nil {
+			return nil, fmt.Errorf("invalid regex %q: %w", pattern, err)
+		}
+		return re.MatchString, nil
+	default:
+		return nil, fmt.Errorf("invalid pattern_type %q: expected glob or regex", patternType)
+	}
+}
+
+// describeProcess заполняет запрошенные поля; файлы /proc читаются только
+// для процессов, попавших в страницу ответа
+func describeProcess(record processRecord, fields map[string]bool) processInfo {
+	info := processInfo{Pid: record.pid}
+	if fields["name"] {
+		info.Name = record.name
+	}
+	if fields["user"] {
+		info.User = userName(record.uid)
+	}
+	if fields["cmdline"] {
+		info.Cmdline = readProcCmdline(record.pid)
+	}
+	if fields["cpu"] || fields["rss"] || fields["start_time"] {
+		st, err := readProcStat(record.pid)
+		if err != nil {
+			return info
+		}
+		started := st.startTime()
+		if fields["cpu"] {
+			// Среднее за время жизни процесса, как %CPU в ps
+			cpu := 0.0
+			if elapsed := time.Since(started); elapsed > 0 {
+				cpu = math.Round(float64(st.cpuTime())/float64(elapsed)*10000) / 100
+			}
+			info.CPU = &cpu
+		}
+		if fields["rss"] {
+			rss := st.rssPages * int64(os.Getpagesize())
+			info.RSS = &rss
+		}
+		if fields["start_time"] {
+			info.StartTime = started.Format(time.RFC3339)
+		}
+	}
+	return info
+}
+
+func processListHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	var match func(string) bool
+	if pattern := getStringArg(args, "name_pattern", ""); pattern != "" {
+		var err error
+		match, err = compileNamePattern(pattern, getStringArg(args, "pattern_type", "glob"))
+		if err != nil {
+			return nil, err
+		}
+	}
+
+	uid := -1
+	if userArg := getStringArg(args, "user", ""); userArg != "" {
+		if runtime.GOOS != "linux" {
+			return nil, fmt.Errorf("user filter is only supported on Linux")
+		}
+		var err error
+		if uid, err = lookupUID(userArg); err != nil {
+			return nil, err
+		}
+	}
+
+	fields := map[string]bool{"pid": true, "name": true}
+	if requested := getStringArrayArg(args, "fields"); len(requested) > 0 {
+		fields = map[string]bool{"pid": true}
+		for _, field := range requested {
+			if !processListFields[field] {
+				return nil, fmt.Errorf("unknown field %q", field)
+			}
+			fields[field] = true
+		}
+	}
+
+	offset := getIntArg(args, "offset", 0)
+	limit := getIntArg(args, "limit", 0)
+	if offset < 0 || limit < 0 {
+		return nil, fmt.Errorf("offset and limit must not be negative")
+	}
+
+	records, err := listProcesses()
+	if err != nil {
+		return nil, fmt.Errorf("failed to get process list: %w", err)
+	}
+
+	matched := records[:0]
+	for _, record := range records {
+		if match != nil && !match(record.name) {
+			continue
+		}
+		if uid >= 0 && record.uid != uid {
+			continue
+		}
+		matched = append(matched, record)
+	}
+
+	page := matched
+	if offset >= len(page) {
+		page = nil
+	} else {
+		page = page[offset:]
+	}
+	if limit > 0 && len(page) > limit {
+		page = page[:limit]
+	}
+
+	processList := make([]processInfo, 0, len(page))
+	for _, record := range page {
+		processList = append(processList, describeProcess(record, fields))
+	}
+
+	response := processListResponse{
+		Processes: processList,
+		Count:     len(processList),
+		Total:     len(matched),
+	}
+	if next := offset + len(page); next < len(matched) {
+		response.NextOffset = &next
+	}
+	return mcp.NewToolResultText(jsonResponse(response)), nil
+}
+
+func processFindByNameHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	name, err := getRequiredStringArg(args, "name")
+	if err != nil {
+		return nil, err
+	}
+
+	pids, err := findProcessIDs(name)
+	if err != nil {
+		return nil, fmt.Errorf("failed to find processes: %w", err)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(pidsResponse{Pids: pids, Count: len(pids)})), nil
+}
+
+func processGetNameHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	pid, err := getRequiredIntArg(args, "pid")
+	if err != nil {
+		return nil, err
+	}
+
+	name, err := processName(pid)
+	if err != nil {
+		return nil, fmt.Errorf("failed to get process name: %w", err)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(nameResponse{Name: name})), nil
+}
+
+func processExistsHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	pid, err := getRequiredIntArg(args, "pid")
+	if err != nil {
+		return nil, err
+	}
+
+	exists, err := robotgo.PidExists(pid)
+	if err != nil {
+		return nil, fmt.Errorf("failed to check process: %w", err)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(existsResponse{Exists: exists})), nil
+}
+
+// killSignals — сигналы, которые принимает process_kill
+var killSignals = map[string]syscall.Signal{
+	"TERM": syscall.SIGTERM,
+	"KILL": syscall.SIGKILL,
+	"INT":  syscall.SIGINT,
+}
+
+// signalProcess отправляет сигнал процессу. SIGKILL идёт через
+// os.Process.Kill, который работает и вне Unix
+func signalProcess(pid int, sig syscall.Signal) error {
+	proc, err := os.FindProcess(pid)
+	if err != nil {
+		return err
+	}
+	if sig == syscall.SIGKILL {
+		return proc.Kill()
+	}
+	return proc.Signal(sig)
+}
+
+// expandKillTargets добавляет к целям их группы процессов (group) и/или
+// всех потомков (tree). Один снимок /proc: ppid и pgrp всех процессов
+func expandKillTargets(pids []int, group, tree bool) ([]int, error) {
+	if runtime.GOOS != "linux" {
+		return nil, fmt.Errorf("group and tree are only supported on Linux")
+	}
+	records, err := listProcesses()
+	if err != nil {
+		return nil, err
+	}
+	children := make(map[int][]int)
+	members := make(map[int][]int)
+	for _, r := range records {
+		st, err := readProcStat(r.pid)
+		if err != nil {
+			continue
+		}
+		children[st.ppid] = append(children[st.ppid], r.pid)
+		members[st.pgrp] = append(members[st.pgrp], r.pid)
+	}
+
+	// Группа сервера обычно включает и его клиента (node, npm, pytest)
+	ownGroup := serverProcessGroup()
+	if group {
+		for _, pid := range pids {
+			if st, err := readProcStat(pid); err == nil && st.pgrp == ownGroup {
+				return nil, fmt.Errorf("process %d is in the server's process group %d; group=true would signal the server and its client", pid, ownGroup)
+			}
+		}
+	}
+
+	seen := make(map[int]bool, len(pids))
+	result := make([]int, 0, len(pids))
+	add := func(pid int) bool {
+		if seen[pid] {
+			return false
+		}
+		seen[pid] = true
+		result = append(result, pid)
+		return true
+	}
+	for _, pid := range pids {
+		add(pid)
+		if group {
+			if st, err := readProcStat(pid); err == nil {
+				for _, member := range members[st.pgrp] {
+					add(member)
+				}
+			}
+		}
+	}
+	if tree {
+		// Обход в ширину от всех целей, включая добавленные из групп
+		for i := 0; i < len(result); i++ {
+			for _, child := range children[result[i]] {
+				add(child)
+			}
+		}
+	}
+	return result, nil
+}
+
+// killTargets собирает PID из pid, pids и name_pattern
+func killTargets(args map[string]interface{}) ([]int, error) {
+	pids, err := statsPIDs(args)
+	if err != nil {
+		return nil, err
+	}
+	namePattern := getStringArg(args, "name_pattern", "")
+	if len(pids) == 0 && namePattern == "" {
+		return nil, fmt.Errorf("missing required parameter: pid, pids or name_pattern")
+	}
+	if namePattern != "" {
+		match, err := compileNamePattern(namePattern, getStringArg(args, "pattern_type", "glob"))
+		if err != nil {
+			return nil, err
+		}
+		processIndex.invalidate()
+		records, err := listProcesses()
+		if err != nil {
+			return nil, fmt.Errorf("failed to list processes: %w", err)
+		}
+		for _, r := range records {
+			if match(r.name) {
+				pids = append(pids, r.pid)
+			}
+		}
+	}
+	return pids, nil
+}
+
+func processKillHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	signalName := strings.TrimPrefix(strings.ToUpper(getStringArg(args, "signal", "KILL")), "SIG")
+	sig, ok := killSignals[signalName]
+	if !ok {
+		return nil, fmt.Errorf("unsupported signal: %s (use TERM, KILL or INT)", signalName)
+	}
+	forceAfterMs := getIntArg(args, "force_after_ms", 0)
+
+	pids, err := killTargets(args)
+	if err != nil {
+		return nil, err
+	}
+	group := getBoolArg(args, "group", false)
+	tree := getBoolArg(args, "tree", false)
+	if group || tree {
+		if pids, err = expandKillTargets(pids, group, tree); err != nil {
+			return nil, err
+		}
+	}
+
+	response := processKillResponse{Status: "success", Signal: signalName, Signaled: []int{}}
+	self := os.Getpid()
+	seen := make(map[int]bool, len(pids))
+	for _, pid := range pids {
+		// Сервер может оказаться в группе или среди совпадений по имени
+		if pid == self || seen[pid] {
+			continue
+		}
+		seen[pid] = true
+		if err := signalProcess(pid, sig); err != nil {
+			response.Failed = append(response.Failed, processKillFailure{Pid: pid, Error: err.Error()})
+			continue
+		}
+		response.Signaled = append(response.Signaled, pid)
+	}
+	processIndex.invalidate()
+
+	// Один PID без успеха — ошибка, как раньше
+	if len(response.Signaled) == 0 && len(response.Failed) > 0 {
+		if len(response.Failed) == 1 {
+			return nil, fmt.Errorf("failed to kill process %d: %s", response.Failed[0].Pid, response.Failed[0].Error)
+		}
+		return nil, fmt.Errorf("failed to signal %d processes: %s", len(response.Failed), response.Failed[0].Error)
+	}
+
+	// Мягкое завершение с дедлайном: кто не вышел за force_after_ms — SIGKILL
+	if forceAfterMs > 0 && sig != syscall.SIGKILL && len(response.Signaled) > 0 {
+		deadline := time.Now().Add(time.Duration(forceAfterMs) * time.Millisecond)
+		alive := append([]int(nil), response.Signaled...)
+		for {
+			remaining := alive[:0]
+			for _, pid := range alive {
+				if pidAlive(pid) {
+					remaining = append(remaining, pid)
+				}
+			}
+			alive = remaining
+			if len(alive) == 0 || !time.Now().Before(deadline) {
+				break
+			}
+			if err := sleepContext(ctx, processPollInterval); err != nil {
+				return nil, err
+			}
+		}
+		for _, pid := range alive {
+			if err := signalProcess(pid, syscall.SIGKILL); err == nil {
+				response.Escalated = append(response.Escalated, pid)
+			}
+		}
+		processIndex.invalidate()
+	}
+
+	if len(response.Failed) > 0 {
+		response.Status = "partial"
+	}
+	switch {
+	case len(response.Signaled) == 0:
+		response.Message = "No matching processes"
+	case len(response.Signaled) == 1 && len(response.Failed) == 0 && signalName == "KILL":
+		response.Message = fmt.Sprintf("Process %d killed", response.Signaled[0])
+	default:
+		response.Message = fmt.Sprintf("Sent SIG%s to %d processes", signalName, len(response.Signaled))
+	}
+	if len(response.Escalated) > 0 {
+		response.Message += fmt.Sprintf(", %d killed after %dms", len(response.Escalated), forceAfterMs)
+	}
+
+	return mcp.NewToolResultText(jsonResponse(response)), nil
+}
+
+const (
+	// defaultMaxOutputBytes — сколько последних байт вывода process_run
+	// возвращает по умолчанию
+	defaultMaxOutputBytes = 1 << 20
+	// streamChunkBytes и streamFlushInterval ограничивают частоту
+	// notifications/progress при stream=true
+	streamChunkBytes    = 16 << 10
+	streamFlushInterval = 200 * time.Millisecond
+)
+
+// outputRing — io.Writer, который хранит только последние limit байт
+// вывода: память не растёт вместе с выводом процесса
+type outputRing struct {
+	mu    sync.Mutex
+	buf   []byte
+	limit int
+	start int // индекс самого старого байта, когда буфер заполнен
+	total int64
+}
+
+func newOutputRing(limit int) *outputRing {
+	if limit < 0 {
+		limit = 0
+	}
+	return &outputRing{limit: limit}
+}
+
+func (r *outputRing) Write(p []byte) (int, error) {
+	r.mu.Lock()
+	defer r.mu.Unlock()
+
+	n := len(p)
+	r.total += int64(n)
+	if r.limit == 0 {
+		return n, nil
+	}
+	if len(p) >= r.limit {
+		r.buf = append(r.buf[:0], p[len(p)-r.limit:]...)
+		r.start = 0
+		return n, nil
+	}
+	if free := r.limit - len(r.buf); free > 0 {
+		if len(p) <= free {
+			r.buf = append(r.buf, p...)
+			return n, nil
+		}
+		r.buf = append(r.buf, p[:free]...)
+		p = p[free:]
+	}
+	// Буфер заполнен — перезаписываем самые старые байты по кругу
+	for len(p) > 0 {
+		c := copy(r.buf[r.start:], p)
+		p = p[c:]
+		r.start = (r.start + c) % r.limit
+	}
+	return n, nil
+}
+
+// String возвращает сохранённый хвост вывода; при усечении начало
+// выравнивается по границе UTF-8 символа
+func (r *outputRing) String() string {
+	out, start := r.Since(0)
+	if start > 0 {
+		out = trimPartialRuneHead(out)
+	}
+	return string(out)
+}
+
+// Since возвращает сохранённый вывод начиная с абсолютного смещения offset
+// (в байтах от начала вывода процесса) и смещение первого возвращённого
+// байта: оно больше offset, если часть вывода уже вытеснена из буфера
+func (r *outputRing) Since(offset int64) ([]byte, int64) {
+	r.mu.Lock()
+	defer r.mu.Unlock()
+
+	first := r.total - int64(len(r.buf))
+	if offset < first {
+		offset = first
+	}
+	if offset >= r.total {
+		return nil, r.total
+	}
+	skip := int(offset - first)
+	out := make([]byte, 0, len(r.buf)-skip)
+	if head := r.buf[r.start:]; skip < len(head) {
+		out = append(out, head[skip:]...)
+		out = append(out, r.buf[:r.start]...)
+	} else {
+		out = append(out, r.buf[skip-len(head):r.start]...)
+	}
+	return out, offset
+}
+
+// Total — сколько байт всего было записано
+func (r *outputRing) Total() int64 {
+	r.mu.Lock()
+	defer r.mu.Unlock()
+	return r.total
+}
+
+// trimPartialRuneHead отбрасывает продолжение UTF-8 символа в начале b
+func trimPartialRuneHead(b []byte) []byte {
+	for i := 0; i < utf8.UTFMax && len(b) > 0 && !utf8.RuneStart(b[0]); i++ {
+		b = b[1:]
+	}
+	return b
+}
+
+// trimPartialRuneTail отбрасывает незавершённый UTF-8 символ в конце b
+func trimPartialRuneTail(b []byte) []byte {
+	for i := len(b) - 1; i >= 0 && i >= len(b)-utf8.UTFMax; i-- {
+		if utf8.RuneStart(b[i]) {
+			if !utf8.FullRune(b[i:]) {
+				return b[:i]
+			}
+			break
+		}
+	}
+	return b
+}
+
+// Dropped — сколько байт вывода не поместилось в буфер
+func (r *outputRing) Dropped() int64 {
+	r.mu.Lock()
+	defer r.mu.Unlock()
+	return r.total - int64(len(r.buf))
+}
+
+// progressStreamer пересылает вывод процесса клиенту порциями в
+// notifications/progress (message — текст порции, progress — байт отправлено)
+type progressStreamer struct {
+	ctx     context.Context
+	srv     *server.MCPServer
+	token   mcp.ProgressToken
+	mu      sync.Mutex
+	pending []byte
+	sent    int64
+	failed  int // неотправленные уведомления
+	done    chan struct{}
+	stopped sync.WaitGroup
+}
+
+// newProgressStreamer возвращает nil, если клиент не передал progressToken
+func newProgressStreamer(ctx context.Context, request mcp.CallToolRequest) *progressStreamer {
+	srv := server.ServerFromContext(ctx)
+	if srv == nil || request.Params.Meta == nil || request.Params.Meta.ProgressToken == nil {
+		return nil
+	}
+	p := &progressStreamer{
+		ctx:   ctx,
+		srv:   srv,
+		token: request.Params.Meta.ProgressToken,
+		done:  make(chan struct{}),
+	}
+	p.stopped.Add(1)
+	go p.run()
+	return p
+}
+
+func (p *progressStreamer) run() {
+	defer p.stopped.Done()
+	ticker := time.NewTicker(streamFlushInterval)
+	defer ticker.Stop()
+	for {
+		select {
+		case <-p.done:
+			return
+		case <-ticker.C:
+			p.mu.Lock()
+			p.flushLocked()
+			p.mu.Unlock()
+		}
+	}
+}
+
+func (p *progressStreamer) Write(b []byte) (int, error) {
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	p.pending = append(p.pending, b...)
+	if len(p.pending) >= streamChunkBytes {
+		p.flushLocked()
+	}
+	return len(b), nil
+}
+
+func (p *progressStreamer) flushLocked() {
+	if len(p.pending) == 0 {
+		return
+	}
+	p.sent += int64(len(p.pending))
+	// mcp-go отбрасывает уведомление, если очередь сессии полна; порция
+	// остаётся только в итоговом output
+	err := p.srv.SendNotificationToClient(p.ctx, "notifications/progress", map[string]interface{}{
+		"progressToken": p.token,
+		"progress":      p.sent,
+		"message":       string(p.pending),
+	})
+	if err != nil {
+		p.failed++
+	}
+	p.pending = p.pending[:0]
+}
+
+// close останавливает периодическую отправку, досылает остаток вывода и
+// возвращает число неотправленных уведомлений
+func (p *progressStreamer) close() int {
+	close(p.done)
+	p.stopped.Wait()
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	p.flushLocked()
+	return p.failed
+}
+
+// processSpec — что и как запускать в process_run
+type processSpec struct {
+	argv    []string
+	display string // command или argv через пробел — для ответов и process_status
+	dir     string
+	env     []string // nil — окружение сервера
+	stdin   *string
+}
+
+// parseProcessSpec разбирает command (делится по пробелам, без shell) или
+// argv (аргументы как есть), а также cwd, env и stdin
+func parseProcessSpec(args map[string]interface{}) (processSpec, error) {
+	var spec processSpec
+
+	rawArgv, hasArgv := args["argv"]
+	command := getStringArg(args, "command", "")
+	switch {
+	case hasArgv && command != "":
+		return spec, fmt.Errorf("pass either command or argv, not both")
+	case hasArgv:
+		items, ok := rawArgv.([]interface{})
+		if !ok {
+			return spec, fmt.Errorf("argv must be an array of strings")
+		}
+		for _, item := range items {
+			arg, ok := item.(string)
+			if !ok {
+				return spec, fmt.Errorf("argv must be an array of strings")
+			}
+			spec.argv = append(spec.argv, arg)
+		}
+		spec.display = strings.Join(spec.argv, " ")
+	case command != "":
+		spec.argv = strings.Fields(command)
+		spec.display = command
+	default:
+		return spec, fmt.Errorf("missing required parameter: command or argv")
+	}
+	if len(spec.argv) == 0 {
+		return spec, fmt.Errorf("empty command")
+	}
+
+	spec.dir = getStringArg(args, "cwd", "")
+
+	if rawEnv, ok := args["env"]; ok && rawEnv != nil {
+		overlay, ok := rawEnv.(map[string]interface{})
+		if !ok {
+			return spec, fmt.Errorf("env must be an object of string values")
+		}
+		env, err := overlayEnv(os.Environ(), overlay)
+		if err != nil {
+			return spec, err
+		}
+		spec.env = env
+	}
+
+	if rawStdin, ok := args["stdin"]; ok && rawStdin != nil {
+		stdin, ok := rawStdin.(string)
+		if !ok {
+			return spec, fmt.Errorf("stdin must be a string")
+		}
+		spec.stdin = &stdin
+	}
+
+	return spec, nil
+}
+
+// overlayEnv накладывает overlay на base: строка задаёт переменную, null удаляет
+func overlayEnv(base []string, overlay map[string]interface{}) ([]string, error) {
+	keys := make([]string, 0, len(overlay))
+	for key, value := range overlay {
+		if key == "" || strings.ContainsAny(key, "=\x00") {
+			return nil, fmt.Errorf("invalid env variable name %q", key)
+		}
+		if _, ok := value.(string); !ok && value != nil {
+			return nil, fmt.Errorf("env value for %s must be a string or null", key)
+		}
+		keys = append(keys, key)
+	}
+	sort.Strings(keys)
+
+	env := make([]string, 0, len(base)+len(keys))
+	for _, kv := range base {
+		key, _, _ := strings.Cut(kv, "=")
+		if _, ok := overlay[key]; !ok {
+			env = append(env, kv)
+		}
+	}
+	for _, key := range keys {
+		if value, ok := overlay[key].(string); ok {
+			env = append(env, key+"="+value)
+		}
+	}
+	return env, nil
+}
+
+func (spec processSpec) apply(cmd *exec.Cmd) {
+	setOwnProcessGroup(cmd)
+	cmd.Dir = spec.dir
+	cmd.Env = spec.env
+	if spec.stdin != nil {
+		cmd.Stdin = strings.NewReader(*spec.stdin)
+	}
+}
+
+func processRunHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	spec, err := parseProcessSpec(args)
+	if err != nil {
+		return nil, err
+	}
+	command := spec.display
+
+	// Get optional background parameter (default: true for non-blocking execution)
+	background := true
+	if bg, ok := args["background"]; ok {
+		if bgBool, ok := bg.(bool); ok {
+			background = bgBool
+		}
+	}
+
+	if background {
+		// Start process in background (non-blocking) - suitable for GUI apps.
+		// Не привязан к ctx запроса: процесс переживает вызов tool.
+		// Вывод и код завершения доступны через process_output/process_status
+		cmd := exec.Command(spec.argv[0], spec.argv[1:]...)
+		spec.apply(cmd)
+		proc, err := startManagedProcess(cmd, command, getIntArg(args, "max_output_bytes", defaultBackgroundOutputBytes))
+		if err != nil {
+			return nil, fmt.Errorf("failed to start command: %w", err)
+		}
+
+		return mcp.NewToolResultText(jsonResponse(processStartedResponse{
+			Status:  "started",
+			Pid:     proc.pid,
+			Command: command,
+			Message: "Process started in background",
+		})), nil
+	}
+
+	maxOutputBytes := getIntArg(args, "max_output_bytes", defaultMaxOutputBytes)
+	timeoutMs := getIntArg(args, "timeout_ms", 0)
+	stream := getBoolArg(args, "stream", false)
+
+	runCtx := ctx
+	if timeoutMs > 0 {
+		var cancel context.CancelFunc
+		runCtx, cancel = context.WithTimeout(ctx, time.Duration(timeoutMs)*time.Millisecond)
+		defer cancel()
+	}
+
+	// Run process and wait for completion (blocking) - suitable for CLI tools.
+	// При отмене запроса или таймауте убивается вся группа процесса; WaitDelay
+	// не даёт зависнуть на pipe, унаследованном процессами вне группы
+	cmd := exec.CommandContext(runCtx, spec.argv[0], spec.argv[1:]...)
+	cmd.WaitDelay = time.Second
+	spec.apply(cmd)
+	killGroupOnCancel(cmd)
+
+	// stdout и stderr — один и тот же writer, поэтому exec использует один
+	// pipe и порядок вывода сохраняется, как у CombinedOutput
+	output := newOutputRing(maxOutputBytes)
+	var out io.Writer = output
+	var streamer *progressStreamer
+	if stream {
+		if streamer = newProgressStreamer(ctx, request); streamer != nil {
+			out = io.MultiWriter(output, streamer)
+		}
+	}
+	cmd.Stdout = out
+	cmd.Stderr = out
+
+	err = cmd.Run()
+	droppedNotifications := 0
+	if streamer != nil {
+		droppedNotifications = streamer.close()
+	}
+
+	if ctxErr := ctx.Err(); ctxErr != nil {
+		return nil, fmt.Errorf("command cancelled: %w, output: %s", ctxErr, output.String())
+	}
+	if runCtx.Err() == context.DeadlineExceeded {
+		return nil, fmt.Errorf("command timed out after %dms, output: %s", timeoutMs, output.String())
+	}
+	if err != nil {
+		return nil, fmt.Errorf("failed to run command: %w, output: %s", err, output.String())
+	}
+
+	dropped := output.Dropped()
+	return mcp.NewToolResultText(jsonResponse(processCompletedResponse{
+		Status:               "completed",
+		Output:               output.String(),
+		Truncated:            dropped > 0,
+		DroppedBytes:         dropped,
+		DroppedNotifications: droppedNotifications,
+	})), nil
+}
+
+// ==================== MANAGED PROCESSES ====================
+
+// Фоновые процессы process_run: stdout/stderr пишутся в кольцевые буферы,
+// goroutine ждёт завершения процесса (зомби не копятся) и запоминает код
+// выхода. Записи завершившихся процессов хранятся до вытеснения более новыми.
+
+const (
+	// defaultBackgroundOutputBytes — размер буфера каждого потока фонового процесса
+	defaultBackgroundOutputBytes = 256 << 10
+	// maxExitedManagedProcesses — сколько завершившихся процессов помнит реестр
+	maxExitedManagedProcesses = 128
+	// outputDrainTimeout — сколько после выхода процесса ждать дочитывания
+	// pipe; как WaitDelay у process_run без background
+	outputDrainTimeout = time.Second
+)
+
+type managedProcess struct {
+	pid     int
+	command string
+	started time.Time
+	stdout  *outputRing
+	stderr  *outputRing
+	done    chan struct{}
+
+	// Заполняются до close(done)
+	exited   time.Time
+	exitCode int
+	state    string
+}
+
+type processRegistry struct {
+	mu    sync.Mutex
+	procs map[int]*managedProcess
+}
+
+var managedProcesses = &processRegistry{procs: make(map[int]*managedProcess)}
+
+func (r *processRegistry) add(p *managedProcess) {
+	r.mu.Lock()
+	defer r.mu.Unlock()
+
+	r.procs[p.pid] = p
+
+	// Вытесняем самые давно завершившиеся процессы сверх лимита
+	var exited []*managedProcess
+	for _, proc := range r.procs {
+		if proc.isExited() {
+			exited = append(exited, proc)
+		}
+	}
+	if len(exited) <= maxExitedManagedProcesses {
+		return
+	}
+	sort.Slice(exited, func(i, j int) bool { return exited[i].exited.Before(exited[j].exited) })
+	for _, proc := range exited[:len(exited)-maxExitedManagedProcesses] {
+		delete(r.procs, proc.pid)
+	}
+}
+
+func (r *processRegistry) get(pid int) (*managedProcess, error) {
+	r.mu.Lock()
+	defer r.mu.Unlock()
+
+	p, ok := r.procs[pid]
+	if !ok {
+		return nil, fmt.Errorf("process %d was not started by process_run in background", pid)
+	}
+	return p, nil
+}
+
+func (r *processRegistry) list() []*managedProcess {
+	r.mu.Lock()
+	defer r.mu.Unlock()
+
+	procs := make([]*managedProcess, 0, len(r.procs))
+	for _, p := range r.procs {
+		procs = append(procs, p)
+	}
+	sort.Slice(procs, func(i, j int) bool { return procs[i].started.Before(procs[j].started) })
+	return procs
+}
+
+// startManagedProcess запускает cmd с выводом в кольцевые буферы и
+// регистрирует его. stdout/stderr — собственные pipe: cmd.Wait не ждёт
+// закрытия pipe внуками процесса, поэтому процесс забирается сразу при выходе
+func startManagedProcess(cmd *exec.Cmd, command string, maxOutputBytes int) (*managedProcess, error) {
+	stdoutR, stdoutW, err := os.Pipe()
+	if err != nil {
+		return nil, err
+	}
+	stderrR, stderrW, err := os.Pipe()
+	if err != nil {
+		stdoutR.Close()
+		stdoutW.Close()
+		return nil, err
+	}
+
+	cmd.Stdout = stdoutW
+	cmd.Stderr = stderrW
+	err = cmd.Start()
+	// Пишущие концы остаются только у дочернего процесса
+	stdoutW.Close()
+	stderrW.Close()
+	if err != nil {
+		stdoutR.Close()
+		stderrR.Close()
+		return nil, err
+	}
+
+	p := &managedProcess{
+		pid:     cmd.Process.Pid,
+		command: command,
+		started: time.Now(),
+		stdout:  newOutputRing(maxOutputBytes),
+		stderr:  newOutputRing(maxOutputBytes),
+		done:    make(chan struct{}),
+	}
+	var copiers sync.WaitGroup
+	copiers.Add(2)
+	go copyProcessOutput(&copiers, p.stdout, stdoutR)
+	go copyProcessOutput(&copiers, p.stderr, stderrR)
+	go func() {
+		_ = cmd.Wait()
+		// done закрывается после того, как вывод дочитан из pipe. Внуки
+		// могут держать пишущий конец открытым, поэтому ожидание ограничено;
+		// их дальнейший вывод продолжает попадать в буферы
+		drained := make(chan struct{})
+		go func() {
+			copiers.Wait()
+			close(drained)
+		}()
+		timer := time.NewTimer(outputDrainTimeout)
+		select {
+		case <-drained:
+		case <-timer.C:
+		}
+		timer.Stop()
+
+		p.exited = time.Now()
+		p.exitCode = -1
+		if cmd.ProcessState != nil {
+			p.exitCode = cmd.ProcessState.ExitCode()
+			p.state = cmd.ProcessState.String()
+		}
+		close(p.done)
+	}()
+
+	managedProcesses.add(p)
+	processIndex.invalidate()
+	return p, nil
+}
+
+func copyProcessOutput(wg *sync.WaitGroup, dst *outputRing, src *os.File) {
+	defer wg.Done()
+	_, _ = io.Copy(dst, src)
+	src.Close()
+}
+
+func (p *managedProcess) isExited() bool {
+	select {
+	case <-p.done:
+		return true
+	default:
+		return false
+	}
+}
+
+func (p *managedProcess) status() managedProcessStatus {
+	status := managedProcessStatus{
+		Pid:         p.pid,
+		Command:     p.command,
+		Running:     !p.isExited(),
+		StartedAt:   p.started.Format(time.RFC3339Nano),
+		StdoutBytes: p.stdout.Total(),
+		StderrBytes: p.stderr.Total(),
+	}
+	if !status.Running {
+		exitCode := p.exitCode
+		status.ExitCode = &exitCode
+		status.State = p.state
+		status.ExitedAt = p.exited.Format(time.RFC3339Nano)
+	}
+	return status
+}
+
+func processStatusHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	if _, ok := args["pid"]; ok {
+		pid, err := getRequiredIntArg(args, "pid")
+		if err != nil {
+			return nil, err
+		}
+		proc, err := managedProcesses.get(pid)
+		if err != nil {
+			return nil, err
+		}
+		return mcp.NewToolResultText(jsonResponse(proc.status())), nil
+	}
+
+	procs := managedProcesses.list()
+	statuses := make([]managedProcessStatus, len(procs))
+	for i, proc := range procs {
+		statuses[i] = proc.status()
+	}
+
+	return mcp.NewToolResultText(jsonResponse(managedProcessListResponse{
+		Processes: statuses,
+		Count:     len(statuses),
+	})), nil
+}
+
+func processOutputHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	pid, err := getRequiredIntArg(args, "pid")
+	if err != nil {
+		return nil, err
+	}
+	stream := getStringArg(args, "stream", "stdout")
+	offset := int64(getIntArg(args, "offset", 0))
+
+	proc, err := managedProcesses.get(pid)
+	if err != nil {
+		return nil, err
+	}
+
+	var ring *outputRing
+	switch stream {
+	case "stdout":
+		ring = proc.stdout
+	case "stderr":
+		ring = proc.stderr
+	default:
+		return nil, fmt.Errorf("invalid stream %q: expected stdout or stderr", stream)
+	}
+
+	// Статус берём до чтения: done закрывается после дочитывания pipe,
+	// поэтому у завершившегося процесса вывод полный
+	running := !proc.isExited()
+	data, start := ring.Since(offset)
+	if start > offset {
+		trimmed := trimPartialRuneHead(data)
+		start += int64(len(data) - len(trimmed))
+		data = trimmed
+	}
+	if running {
+		// Незавершённый символ вернётся целиком при следующем чтении
+		data = trimPartialRuneTail(data)
+	}
+
+	var dropped int64
+	if start > offset {
+		dropped = start - offset
+	}
+
+	return mcp.NewToolResultText(jsonResponse(processOutputResponse{
+		Pid:          pid,
+		Stream:       stream,
+		Output:       string(data),
+		Offset:       start,
+		NextOffset:   start + int64(len(data)),
+		DroppedBytes: dropped,
+		Running:      running,
+	})), nil
+}
+
+func processWaitHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	pid, err := getRequiredIntArg(args, "pid")
+	if err != nil {
+		return nil, err
+	}
+	timeoutMs := getIntArg(args, "timeout_ms", 0)
+
+	proc, err := managedProcesses.get(pid)
+	if err != nil {
+		return nil, err
+	}
+
+	var timeout <-chan time.Time
+	if timeoutMs > 0 {
+		timer := time.NewTimer(time.Duration(timeoutMs) * time.Millisecond)
+		defer timer.Stop()
+		timeout = timer.C
+	}
+
+	// По таймауту возвращается статус с running=true, а не ошибка
+	select {
+	case <-proc.done:
+	case <-timeout:
+	case <-ctx.Done():
+		return nil, fmt.Errorf("wait cancelled: %w", ctx.Err())
+	}
+
+	return mcp.NewToolResultText(jsonResponse(proc.status())), nil
+}
+
+// ==================== PROCESS STATS ====================
+
+// process_stats снимает /proc/<pid>/stat, statm и io дважды с интервалом и
+// считает CPU%, RSS и скорости ввода-вывода. process_watch добавляет PID в
+// фоновый сэмплер: тогда process_stats сразу отдаёт последний замер и
+// историю, не ожидая интервала.
+
+const (
+	defaultStatsIntervalMs = 500
+	defaultWatchIntervalMs = 1000
+	minWatchIntervalMs     = 100
+	// maxWatchHistory — сколько последних замеров хранится для каждого PID
+	maxWatchHistory = 300
+)
+
+// procSample — мгновенный снимок счётчиков процесса
+type procSample struct {
+	at         time.Time
+	cpu        time.Duration
+	rss        int64
+	vms        int64
+	threads    int
+	io         bool // /proc/<pid>/io прочитан (нужны права ptrace на процесс)
+	readBytes  uint64
+	writeBytes uint64
+	readChars  uint64
+	writeChars uint64
+}
+
+func sampleProcess(pid int) (procSample, error) {
+	st, err := readProcStat(pid)
+	if err != nil {
+		return procSample{}, err
+	}
+	if st.state == "Z" {
+		return procSample{}, fmt.Errorf("process %d has exited (zombie)", pid)
+	}
+	sample := procSample{at: time.Now(), cpu: st.cpuTime(), threads: st.numThreads}
+
+	procDir := "/proc/" + strconv.Itoa(pid)
+	pageSize := int64(os.Getpagesize())
+	if statm, err := os.ReadFile(procDir + "/statm"); err == nil {
+		if fields := strings.Fields(string(statm)); len(fields) >= 2 {
+			size, _ := strconv.ParseInt(fields[0], 10, 64)
+			resident, _ := strconv.ParseInt(fields[1], 10, 64)
+			sample.vms = size * pageSize
+			sample.rss = resident * pageSize
+		}
+	}
+
+	if data, err := os.ReadFile(procDir + "/io"); err == nil {
+		sample.io = true
+		for _, line := range strings.Split(string(data), "\n") {
+			key, value, ok := strings.Cut(line, ": ")
+			if !ok {
+				continue
+			}
+			n, _ := strconv.ParseUint(strings.TrimSpace(value), 10, 64)
+			switch key {
+			case "read_bytes":
+				sample.readBytes = n
+			case "write_bytes":
+				sample.writeBytes = n
+			case "rchar":
+				sample.readChars = n
+			case "wchar":
+				sample.writeChars = n
+			}
+		}
+	}
+	return sample, nil
+}
+
+// counterRate — скорость изменения счётчика в секунду
+func counterRate(prev, cur uint64, seconds float64) *float64 {
+	rate := 0.0
+	if cur > prev && seconds > 0 {
+		rate = math.Round(float64(cur-prev)/seconds*100) / 100
+	}
+	return &rate
+}
+
+// processStatsBetween считает показатели между двумя снимками
+func processStatsBetween(pid int, prev, cur procSample) processStatsEntry {
+	elapsed := cur.at.Sub(prev.at)
+	entry := processStatsEntry{
+		Pid:        pid,
+		RSS:        cur.rss,
+		VMS:        cur.vms,
+		Threads:    cur.threads,
+		IntervalMs: durationMs(elapsed),
+		SampledAt:  cur.at.Format(time.RFC3339Nano),
+	}
+	if elapsed > 0 {
+		// Может быть больше 100% у многопоточных процессов
+		entry.CPUPercent = math.Round(float64(cur.cpu-prev.cpu)/float64(elapsed)*10000) / 100
+	}
+	if prev.io && cur.io {
+		seconds := elapsed.Seconds()
+		entry.ReadBytesPerSec = counterRate(prev.readBytes, cur.readBytes, seconds)
+		entry.WriteBytesPerSec = counterRate(prev.writeBytes, cur.writeBytes, seconds)
+		entry.ReadCharsPerSec = counterRate(prev.readChars, cur.readChars, seconds)
+		entry.WriteCharsPerSec = counterRate(prev.writeChars, cur.writeChars, seconds)
+	}
+	return entry
+}
+
+// watchedProcess — состояние PID в фоновом сэмплере
+type watchedProcess struct {
+	last    procSample
+	history []processStatsEntry
+}
+
+type processWatcher struct {
+	mu       sync.Mutex
+	procs    map[int]*watchedProcess
+	interval time.Duration
+	running  bool
+}
+
+var processStatsWatcher = &processWatcher{
+	procs:    make(map[int]*watchedProcess),
+	interval: defaultWatchIntervalMs * time.Millisecond,
+}
+
+// watch добавляет PID в сэмплер; первый замер служит базой для скоростей
+func (w *processWatcher) watch(pids []int, interval time.Duration) error {
+	baselines := make(map[int]procSample, len(pids))
+	for _, pid := range pids {
+		sample, err := sampleProcess(pid)
+		if err != nil {
+			return fmt.Errorf("failed to sample process %d: %w", pid, err)
+		}
+		baselines[pid] = sample
+	}
+
+	w.mu.Lock()
+	defer w.mu.Unlock()
+
+	w.interval = interval
+	for pid, sample := range baselines {
+		if _, ok := w.procs[pid]; !ok {
+			w.procs[pid] = &watchedProcess{last: sample}
+		}
+	}
+	if !w.running && len(w.procs) > 0 {
+		w.running = true
+		go w.run()
+	}
+	return nil
+}
+
+// unwatch убирает PID из сэмплера (все, если pids пуст)
+func (w *processWatcher) unwatch(pids []int) {
+	w.mu.Lock()
+	defer w.mu.Unlock()
+
+	if len(pids) == 0 {
+		w.procs = make(map[int]*watchedProcess)
+		return
+	}
+	for _, pid := range pids {
+		delete(w.procs, pid)
+	}
+}
+
+// run — цикл сэмплера; завершается, когда наблюдать больше нечего
+func (w *processWatcher) run() {
+	for {
+		w.mu.Lock()
+		interval := w.interval
+		w.mu.Unlock()
+
+		time.Sleep(interval)
+
+		w.mu.Lock()
+		if len(w.procs) == 0 {
+			w.running = false
+			w.mu.Unlock()
+			return
+		}
+		for pid, proc := range w.procs {
+			sample, err := sampleProcess(pid)
+			if err != nil {
+				// Процесс завершился — перестаём наблюдать
+				delete(w.procs, pid)
+				continue
+			}
+			entry := processStatsBetween(pid, proc.last, sample)
+			proc.last = sample
+			if len(proc.history) >= maxWatchHistory {
+				proc.history = append(proc.history[:0], proc.history[1:]...)
+			}
+			proc.history = append(proc.history, entry)
+		}
+		w.mu.Unlock()
+	}
+}
+
+// latest возвращает последний замер и (опционально) историю PID из сэмплера
+func (w *processWatcher) latest(pid int, withHistory bool) (processStatsEntry, bool) {
+	w.mu.Lock()
+	defer w.mu.Unlock()
+
+	proc, ok := w.procs[pid]
+	if !ok || len(proc.history) == 0 {
+		return processStatsEntry{}, false
+	}
+	entry := proc.history[len(proc.history)-1]
+	entry.Watched = true
+	if withHistory {
+		entry.History = append([]processStatsEntry(nil), proc.history...)
+	}
+	return entry, true
+}
+
+func (w *processWatcher) watchedPIDs() []int {
+	w.mu.Lock()
+	defer w.mu.Unlock()
+
+	pids := make([]int, 0, len(w.procs))
+	for pid := range w.procs {
+		pids = append(pids, pid)
+	}
+	sort.Ints(pids)
+	return pids
+}
+
+// statsPIDs читает pid или pids из аргументов
+func statsPIDs(args map[string]interface{}) ([]int, error) {
+	pids, err := getIntArrayArg(args, "pids")
+	if err != nil {
+		return nil, err
+	}
+	if _, ok := args["pid"]; ok {
+		pid, err := getRequiredIntArg(args, "pid")
+		if err != nil {
+			return nil, err
+		}
+		pids = append(pids, pid)
+	}
+	return pids, nil
+}
+
+func processStatsHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	if runtime.GOOS != "linux" {
+		return nil, fmt.Errorf("process_stats is only supported on Linux")
+	}
+	args := getArgs(request)
+
+	pids, err := statsPIDs(args)
+	if err != nil {
+		return nil, err
+	}
+	if len(pids) == 0 {
+		return nil, fmt.Errorf("missing required parameter: pid or pids")
+	}
+	_, explicitInterval := args["interval_ms"]
+	intervalMs := getIntArg(args, "interval_ms", defaultStatsIntervalMs)
+	withHistory := getBoolArg(args, "history", false)
+
+	entries := make([]processStatsEntry, len(pids))
+	pending := make(map[int]procSample)
+	for i, pid := range pids {
+		// Наблюдаемые PID отдаются из сэмплера без ожидания
+		if !explicitInterval {
+			if entry, ok := processStatsWatcher.latest(pid, withHistory); ok {
+				entries[i] = entry
+				continue
+			}
+		}
+		sample, err := sampleProcess(pid)
+		if err != nil {
+			entries[i] = processStatsEntry{Pid: pid, Error: fmt.Sprintf("failed to sample process: %v", err)}
+			continue
+		}
+		pending[i] = sample
+	}
+
+	if len(pending) > 0 {
+		if err := sleepContext(ctx, time.Duration(intervalMs)*time.Millisecond); err != nil {
+			return nil, fmt.Errorf("sampling cancelled: %w", err)
+		}
+		for i, prev := range pending {
+			pid := pids[i]
+			cur, err := sampleProcess(pid)
+			if err != nil {
+				entries[i] = processStatsEntry{Pid: pid, Error: fmt.Sprintf("process exited during sampling: %v", err)}
+				continue
+			}
+			entries[i] = processStatsBetween(pid, prev, cur)
+		}
+	}
+
+	for i := range entries {
+		if entries[i].Error == "" {
+			entries[i].Name, _ = processName(entries[i].Pid)
+		}
+	}
+
+	return mcp.NewToolResultText(jsonResponse(processStatsResponse{
+		Processes: entries,
+		Count:     len(entries),
+	})), nil
+}
+
+func processWatchHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	if runtime.GOOS != "linux" {
+		return nil, fmt.Errorf("process_watch is only supported on Linux")
+	}
+	args := getArgs(request)
+
+	pids, err := statsPIDs(args)
+	if err != nil {
+		return nil, err
+	}
+
+	if getBoolArg(args, "stop", false) {
+		processStatsWatcher.unwatch(pids)
+	} else {
+		if len(pids) == 0 {
+			return nil, fmt.Errorf("missing required parameter: pid or pids")
+		}
+		intervalMs := getIntArg(args, "interval_ms", defaultWatchIntervalMs)
+		if intervalMs < minWatchIntervalMs {
+			intervalMs = minWatchIntervalMs
+		}
+		if err := processStatsWatcher.watch(pids, time.Duration(intervalMs)*time.Millisecond); err != nil {
+			return nil, err
+		}
+	}
+
+	processStatsWatcher.mu.Lock()
+	intervalMs := int(processStatsWatcher.interval / time.Millisecond)
+	processStatsWatcher.mu.Unlock()
+
+	watched := processStatsWatcher.watchedPIDs()
+	return mcp.NewToolResultText(jsonResponse(processWatchResponse{
+		Watched:    watched,
+		Count:      len(watched),
+		IntervalMs: intervalMs,
+	})), nil
+}
+
+// ==================== PROCESS EVENTS ====================
+
+// process_wait_for блокируется до завершения PID или появления процесса с
+// подходящим именем. На Linux используются pidfd и proc connector
+// (process_wait_linux.go); если они недоступны (старое ядро, нет
+// CAP_NET_ADMIN, другая ОС), индекс процессов опрашивается с коротким
+// интервалом.
+
+const (
+	defaultWaitForTimeoutMs = 30000
+	processPollInterval     = 50 * time.Millisecond
+	// procEventsRescanInterval — страховочный полный пересмотр при работе
+	// через proc connector (события могут не доходить, например, в контейнере)
+	procEventsRescanInterval = time.Second
+)
+
+var (
+	errProcWaitUnsupported = errors.New("process events are not supported")
+	errProcEventsLost      = errors.New("process events were lost")
+)
+
+// pidAlive сообщает, работает ли процесс (зомби считается завершённым)
+func pidAlive(pid int) bool {
+	if runtime.GOOS == "linux" {
+		st, err := readProcStat(pid)
+		return err == nil && st.state != "Z"
+	}
+	exists, err := robotgo.PidExists(pid)
+	return err == nil && exists
+}
+
+func waitProcessExit(ctx context.Context, pid int) (processWaitForResponse, error) {
+	response := processWaitForResponse{Status: "exited", Pid: pid, Method: "pidfd"}
+
+	err := waitPIDExitPidfd(ctx, pid)
+	if !errors.Is(err, errProcWaitUnsupported) {
+		return response, err
+	}
+
+	response.Method = "poll"
+	for pidAlive(pid) {
+		if err := sleepContext(ctx, processPollInterval); err != nil {
+			return response, err
+		}
+	}
+	return response, nil
+}
+
+// findNewestProcess возвращает процесс с наибольшим PID, имя которого подходит
+func findNewestProcess(match func(string) bool) (processRecord, bool, error) {
+	processIndex.invalidate()
+	records, err := listProcesses()
+	if err != nil {
+		return processRecord{}, false, err
+	}
+	for i := len(records) - 1; i >= 0; i-- {
+		if match(records[i].name) {
+			return records[i], true, nil
+		}
+	}
+	return processRecord{}, false, nil
+}
+
+func waitProcessStart(ctx context.Context, match func(string) bool) (processWaitForResponse, error) {
+	response := processWaitForResponse{Status: "found", Method: "netlink"}
+
+	// Подписка до первой проверки, чтобы не пропустить процесс между ними
+	events, err := subscribeProcExecEvents()
+	if err != nil {
+		events = nil
+		response.Method = "poll"
+	} else {
+		defer events.close()
+	}
+
+	found := func(record processRecord) (processWaitForResponse, error) {
+		response.Pid = record.pid
+		response.Name = record.name
+		return response, nil
+	}
+
+	record, ok, err := findNewestProcess(match)
+	if err != nil {
+		return response, err
+	}
+	if ok {
+		response.AlreadyRunning = true
+		return found(record)
+	}
+
+	lastScan := time.Now()
+	for {
+		if events == nil {
+			if err := sleepContext(ctx, processPollInterval); err != nil {
+				return response, err
+			}
+		} else {
+			pids, err := events.next(ctx)
+			if err != nil && !errors.Is(err, errProcEventsLost) {
+				return response, err
+			}
+			for _, pid := range pids {
+				if name, _, err := readProcIdentity("/proc", pid); err == nil && match(name) {
+					return found(processRecord{pid: pid, name: name})
+				}
+			}
+			if err == nil && time.Since(lastScan) < procEventsRescanInterval {
+				continue
+			}
+		}
+
+		record, ok, err := findNewestProcess(match)
+		if err != nil {
+			return response, err
+		}
+		if ok {
+			return found(record)
+		}
+		lastScan = time.Now()
+	}
+}
+
+func processWaitForHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+	args := getArgs(request)
+
+	_, hasPID := args["pid"]
+	name := getStringArg(args, "name", "")
+	namePattern := getStringArg(args, "name_pattern", "")
+	if hasPID == (name != "" || namePattern != "") || (name != "" && namePattern != "") {
+		return nil, fmt.Errorf("pass exactly one of pid, name or name_pattern")
+	}
+
+	timeoutMs := getIntArg(args, "timeout_ms", defaultWaitForTimeoutMs)
+	waitCtx := ctx
+	if timeoutMs > 0 {
+		var cancel context.CancelFunc
+		waitCtx, cancel = context.WithTimeout(ctx, time.Duration(timeoutMs)*time.Millisecond)
+		defer cancel()
+	}
+
+	start := time.Now()
+	var response processWaitForResponse
+	var err error
+	if hasPID {
+		pid, pidErr := getRequiredIntArg(args, "pid")
+		if pidErr != nil {
+			return nil, pidErr
+		}
+		response, err = waitProcessExit(waitCtx, pid)
+	} else {
+		var match func(string) bool
+		if namePattern != "" {
+			match, err = compileNamePattern(namePattern, getStringArg(args, "pattern_type", "glob"))
+			if err != nil {
+				return nil, err
+			}
+		} else {
+			// Как process_find_by_name: подстрока без учёта регистра
+			needle := strings.ToLower(name)
+			match = func(processName string) bool {
+				return strings.Contains(strings.ToLower(processName), needle)
+			}
+		}
+		response, err = waitProcessStart(waitCtx, match)
+	}
+
+	if err != nil {
+		if ctx.Err() != nil {
+			return nil, fmt.Errorf("wait cancelled: %w", ctx.Err())
+		}
+		if !errors.Is(err, context.DeadlineExceeded) {
+			return nil, fmt.Errorf("failed to wait for process: %w", err)
+		}
+		// По таймауту — статус, а не ошибка (как process_wait)
+		response.Status = "timeout"
+		response.Name = ""
+		response.AlreadyRunning = false
+		if !hasPID {
+			response.Pid = 0
+		}
+	}
+	response.ElapsedMs = durationMs(time.Since(start))
+
+	return mcp.NewToolResultText(jsonResponse(response)), nil
 }
 
-func windowGetTitleHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+// ==================== ACCESSIBILITY ====================
+
+// Дерево доступности AT-SPI через D-Bus (godbus, без libatspi). Узлы
+// кэшируются; события AT-SPI (ChildrenChanged, PropertyChange,
+// StateChanged, BoundsChanged, события окон) помечают узлы устаревшими, и
+// повторный обход перечитывает только их. Свойства всех узлов одного
+// уровня запрашиваются асинхронными вызовами сразу, поэтому обход стоит
+// порядка глубины дерева round-trip'ов, а не числа узлов.
+
+const (
+	atspiRegistryBus = "org.a11y.atspi.Registry"
+	atspiRootPath    = dbus.ObjectPath("/org/a11y/atspi/accessible/root")
+	atspiAccessible  = "org.a11y.atspi.Accessible"
+	atspiComponent   = "org.a11y.atspi.Component"
+	atspiCoordScreen = uint32(0)
+
+	// atspiCallTimeout — срок ответа на пачку вызовов: зависшее приложение
+	// не должно держать обход. Не ответивший узел считается отсутствующим
+	atspiCallTimeout = 500 * time.Millisecond
+	// atspiFetchBatch — узлов в пачке с общим сроком (по пять вызовов на узел)
+	atspiFetchBatch = 64
+	// atspiConnectTimeout — подключение, подписка и регистрация событий
+	atspiConnectTimeout = 2 * time.Second
+
+	defaultUITreeDepth    = 8
+	defaultUITreeMaxNodes = 2000
+	// ui_find ищет глубже: ответ содержит только совпадения
+	defaultUIFindDepth      = 32
+	defaultUIFindMaxNodes   = 10000
+	defaultUIFindMaxResults = 20
+	// defaultUIFindTimeoutMs — бюджет поиска; по его истечении ui_find
+	// возвращает совпадения из уже просмотренной части дерева
+	defaultUIFindTimeoutMs = 5000
+	// atspiCacheLimit — при превышении кэш сбрасывается целиком: узлы
+	// закрытых окон и удалённых элементов иначе копились бы
+	atspiCacheLimit = 50000
+)
 
-	pid := getIntArg(args, "pid", -1)
+// atspiStateNames — AtspiStateType по номеру бита
+var atspiStateNames = []string{
+	"invalid", "active", "armed", "busy", "checked", "collapsed", "defunct",
+	"editable", "enabled", "expandable", "expanded", "focusable", "focused",
+	"has_tooltip", "horizontal", "iconified", "modal", "multi_line",
+	"multiselectable", "opaque", "pressed", "resizable", "selectable",
+	"selected", "sensitive", "showing", "single_line", "stale", "transient",
+	"vertical", "visible", "manages_descendants", "indeterminate", "required",
+	"truncated", "animated", "invalid_entry", "supports_autocompletion",
+	"selectable_text", "is_default", "visited", "checkable", "has_popup",
+	"read_only",
+}
 
-	var title string
-	if pid >= 0 {
-		title = robotgo.GetTitle(pid)
-	} else {
-		title = robotgo.GetTitle()
-	}
+// atspiEvents — события, о которых приложения сообщают реестру, только
+// если на них кто-то подписан
+var atspiEvents = []string{
+	"object:children-changed", "object:property-change", "object:state-changed",
+	"object:bounds-changed", "window:",
+}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"title": title,
-	})), nil
+// atspiRef — объект AT-SPI: имя на шине и путь. Строковый вид "bus/path"
+// однозначен: имена на шине не содержат '/'
+type atspiRef struct {
+	bus  string
+	path dbus.ObjectPath
 }
 
-func windowGetBoundsHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+func (r atspiRef) id() string {
+	return r.bus + string(r.path)
+}
 
-	pid, err := getRequiredIntArg(args, "pid")
-	if err != nil {
-		return nil, err
+func parseAtspiRef(id string) (atspiRef, error) {
+	i := strings.IndexByte(id, '/')
+	if i <= 0 {
+		return atspiRef{}, fmt.Errorf("invalid node id %q", id)
 	}
+	return atspiRef{bus: id[:i], path: dbus.ObjectPath(id[i:])}, nil
+}
 
-	x, y, w, h := robotgo.GetBounds(pid)
+// atspiNode — прочитанное состояние элемента. После записи в кэш не
+// меняется, кроме invalidated (под atspiClient.mu)
+type atspiNode struct {
+	role        string
+	name        string
+	description string
+	states      []string
+	bounds      *boundsResponse // nil — элемент без интерфейса Component
+	children    []atspiRef
+	fetched     uint64 // номер события, после которого узел прочитан
+	invalidated uint64 // номер последнего события для узла
+}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"x":      x,
-		"y":      y,
-		"width":  w,
-		"height": h,
-	})), nil
+func (n *atspiNode) hasState(state string) bool {
+	for _, s := range n.states {
+		if s == state {
+			return true
+		}
+	}
+	return false
 }
 
-func windowSetActiveHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+type atspiClient struct {
+	startOnce sync.Once
+	startErr  error
+	conn      *dbus.Conn
 
-	pid, err := getRequiredIntArg(args, "pid")
-	if err != nil {
-		return nil, err
-	}
+	mu    sync.Mutex
+	nodes map[atspiRef]*atspiNode
+	pids  map[string]int // имя приложения на шине → PID
+	seq   uint64         // счётчик событий
+}
 
-	err = robotgo.ActivePid(pid)
-	if err != nil {
-		return nil, fmt.Errorf("failed to activate window: %w", err)
-	}
+var accessibility = &atspiClient{}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Window with PID %d activated", pid),
-	})), nil
+func (a *atspiClient) start() error {
+	a.startOnce.Do(func() { a.startErr = a.connect() })
+	return a.startErr
 }
 
-func windowMoveHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+func (a *atspiClient) connect() error {
+	ctx, cancel := context.WithTimeout(context.Background(), atspiConnectTimeout)
+	defer cancel()
 
-	pid, err := getRequiredIntArg(args, "pid")
-	if err != nil {
-		return nil, err
+	address := os.Getenv("AT_SPI_BUS_ADDRESS")
+	if address == "" {
+		session, err := dbus.SessionBus()
+		if err != nil {
+			return fmt.Errorf("accessibility bus is not available: %w", err)
+		}
+		if err := session.Object("org.a11y.Bus", "/org/a11y/bus").CallWithContext(ctx, "org.a11y.Bus.GetAddress", 0).Store(&address); err != nil {
+			return fmt.Errorf("accessibility bus is not available: %w", err)
+		}
 	}
-	x, err := getRequiredIntArg(args, "x")
+	conn, err := dbus.Connect(address)
 	if err != nil {
-		return nil, err
+		return fmt.Errorf("failed to connect to accessibility bus: %w", err)
 	}
-	y, err := getRequiredIntArg(args, "y")
-	if err != nil {
-		return nil, err
+	a.conn = conn
+	a.nodes = make(map[atspiRef]*atspiNode)
+	a.pids = make(map[string]int)
+
+	for _, iface := range []string{"org.a11y.atspi.Event.Object", "org.a11y.atspi.Event.Window"} {
+		if err := conn.AddMatchSignalContext(ctx, dbus.WithMatchInterface(iface)); err != nil {
+			conn.Close()
+			return fmt.Errorf("failed to subscribe to accessibility events: %w", err)
+		}
+	}
+	registry := conn.Object(atspiRegistryBus, "/org/a11y/atspi/registry")
+	for _, event := range atspiEvents {
+		// at-spi2-core 2.34+ принимает ещё список свойств и имя приложения
+		if registry.CallWithContext(ctx, atspiRegistryBus+".RegisterEvent", 0, event, []string{}, "").Err != nil {
+			registry.CallWithContext(ctx, atspiRegistryBus+".RegisterEvent", 0, event)
+		}
 	}
 
-	robotgo.MoveWindow(pid, x, y)
-
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Window moved to (%d, %d)", x, y),
-	})), nil
+	signals := make(chan *dbus.Signal, 256)
+	conn.Signal(signals)
+	go a.watch(signals)
+	return nil
 }
 
-func windowResizeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
-
-	pid, err := getRequiredIntArg(args, "pid")
-	if err != nil {
-		return nil, err
-	}
-	width, err := getRequiredIntArg(args, "width")
-	if err != nil {
-		return nil, err
+// watch помечает устаревшими узлы, для которых пришли события
+func (a *atspiClient) watch(signals <-chan *dbus.Signal) {
+	for sig := range signals {
+		ref := atspiRef{bus: sig.Sender, path: sig.Path}
+		a.mu.Lock()
+		a.seq++
+		if strings.HasPrefix(sig.Name, "org.a11y.atspi.Event.Window.") || strings.HasSuffix(sig.Name, ".BoundsChanged") {
+			// Перемещение окна меняет экранные координаты всех потомков
+			a.invalidateTreeLocked(ref)
+		} else if n, ok := a.nodes[ref]; ok {
+			n.invalidated = a.seq
+		}
+		a.mu.Unlock()
 	}
-	height, err := getRequiredIntArg(args, "height")
-	if err != nil {
-		return nil, err
+}
+
+func (a *atspiClient) invalidateTreeLocked(root atspiRef) {
+	queue := []atspiRef{root}
+	for len(queue) > 0 {
+		n, ok := a.nodes[queue[0]]
+		queue = queue[1:]
+		if !ok || n.invalidated == a.seq {
+			continue
+		}
+		n.invalidated = a.seq
+		queue = append(queue, n.children...)
 	}
+}
 
-	robotgo.ResizeWindow(pid, width, height)
+func (a *atspiClient) invalidate(ref atspiRef) {
+	a.mu.Lock()
+	a.seq++
+	if n, ok := a.nodes[ref]; ok {
+		n.invalidated = a.seq
+	}
+	a.mu.Unlock()
+}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Window resized to %dx%d", width, height),
-	})), nil
+// fetch читает узлы пачками по atspiFetchBatch: пять асинхронных вызовов
+// на узел, ожидание — после отправки всей пачки, не дольше
+// atspiCallTimeout. nil — объект исчез или не ответил (timedOut[i])
+func (a *atspiClient) fetch(ctx context.Context, refs []atspiRef) (nodes []*atspiNode, timedOut []bool) {
+	nodes = make([]*atspiNode, len(refs))
+	timedOut = make([]bool, len(refs))
+	for start := 0; start < len(refs); start += atspiFetchBatch {
+		end := min(start+atspiFetchBatch, len(refs))
+		a.fetchBatch(ctx, refs[start:end], nodes[start:end], timedOut[start:end])
+	}
+	return nodes, timedOut
 }
 
-func windowMinimizeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+func (a *atspiClient) fetchBatch(ctx context.Context, refs []atspiRef, nodes []*atspiNode, timedOut []bool) {
+	a.mu.Lock()
+	seq := a.seq
+	a.mu.Unlock()
 
-	pid, err := getRequiredIntArg(args, "pid")
-	if err != nil {
-		return nil, err
-	}
+	// При истечении срока godbus завершает вызов с ошибкой контекста
+	callCtx, cancel := context.WithTimeout(ctx, atspiCallTimeout)
+	defer cancel()
 
-	robotgo.MinWindow(pid)
+	type pending struct {
+		props, role, state, children, extents *dbus.Call
+	}
+	calls := make([]pending, len(refs))
+	for i, ref := range refs {
+		obj := a.conn.Object(ref.bus, ref.path)
+		calls[i] = pending{
+			props:    obj.GoWithContext(callCtx, "org.freedesktop.DBus.Properties.GetAll", 0, nil, atspiAccessible),
+			role:     obj.GoWithContext(callCtx, atspiAccessible+".GetRoleName", 0, nil),
+			state:    obj.GoWithContext(callCtx, atspiAccessible+".GetState", 0, nil),
+			children: obj.GoWithContext(callCtx, atspiAccessible+".GetChildren", 0, nil),
+			extents:  obj.GoWithContext(callCtx, atspiComponent+".GetExtents", 0, nil, atspiCoordScreen),
+		}
+	}
+	wait := func(call *dbus.Call) *dbus.Call {
+		<-call.Done
+		return call
+	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": "Window minimized",
-	})), nil
-}
+	for i, p := range calls {
+		n := &atspiNode{fetched: seq}
+		roleErr := wait(p.role).Store(&n.role)
 
-func windowMaximizeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+		var props map[string]dbus.Variant
+		if wait(p.props).Store(&props) == nil {
+			n.name, _ = props["Name"].Value().(string)
+			n.description, _ = props["Description"].Value().(string)
+		}
+		var bits []uint32
+		if wait(p.state).Store(&bits) == nil {
+			n.states = atspiStates(bits)
+		}
+		var children []struct {
+			Bus  string
+			Path dbus.ObjectPath
+		}
+		if wait(p.children).Store(&children) == nil {
+			n.children = make([]atspiRef, 0, len(children))
+			for _, c := range children {
+				n.children = append(n.children, atspiRef{bus: c.Bus, path: c.Path})
+			}
+		}
+		var extents struct{ X, Y, Width, Height int32 }
+		if wait(p.extents).Store(&extents) == nil {
+			n.bounds = &boundsResponse{X: int(extents.X), Y: int(extents.Y), Width: int(extents.Width), Height: int(extents.Height)}
+		}
 
-	pid, err := getRequiredIntArg(args, "pid")
-	if err != nil {
-		return nil, err
+		switch {
+		case roleErr == nil:
+			nodes[i] = n
+		case callCtx.Err() != nil:
+			timedOut[i] = true
+		}
 	}
+}
 
-	robotgo.MaxWindow(pid)
-
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": "Window maximized",
-	})), nil
+func atspiStates(bits []uint32) []string {
+	var states []string
+	for word, value := range bits {
+		for bit := 0; bit < 32; bit++ {
+			index := word*32 + bit
+			if value&(1<<bit) != 0 && index < len(atspiStateNames) {
+				states = append(states, atspiStateNames[index])
+			}
+		}
+	}
+	return states
 }
 
-func windowCloseHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+// nodesFor возвращает узлы из кэша, перечитывая отсутствующие и
+// устаревшие. fetched — сколько узлов прочитано по D-Bus, timedOut —
+// сколько не ответило за atspiCallTimeout (вместо них nil)
+func (a *atspiClient) nodesFor(ctx context.Context, refs []atspiRef) (nodes []*atspiNode, fetched, timedOut int) {
+	result := make([]*atspiNode, len(refs))
+	var missing []int
+	a.mu.Lock()
+	for i, ref := range refs {
+		if n, ok := a.nodes[ref]; ok && n.invalidated <= n.fetched {
+			result[i] = n
+		} else {
+			missing = append(missing, i)
+		}
+	}
+	a.mu.Unlock()
+	if len(missing) == 0 {
+		return result, 0, 0
+	}
 
-	pid := getIntArg(args, "pid", -1)
+	toFetch := make([]atspiRef, len(missing))
+	for j, i := range missing {
+		toFetch[j] = refs[i]
+	}
+	read, late := a.fetch(ctx, toFetch)
 
-	if pid >= 0 {
-		robotgo.CloseWindow(pid)
-	} else {
-		robotgo.CloseWindow()
+	a.mu.Lock()
+	defer a.mu.Unlock()
+	if len(a.nodes)+len(missing) > atspiCacheLimit {
+		a.nodes = make(map[atspiRef]*atspiNode)
+	}
+	for j, i := range missing {
+		n := read[j]
+		if late[j] {
+			// Прежняя (устаревшая) запись остаётся до следующей попытки
+			timedOut++
+			continue
+		}
+		if n == nil {
+			delete(a.nodes, refs[i])
+			continue
+		}
+		// Событие во время чтения оставит узел устаревшим
+		if old, ok := a.nodes[refs[i]]; ok {
+			n.invalidated = old.invalidated
+		}
+		a.nodes[refs[i]] = n
+		result[i] = n
 	}
+	return result, len(missing) - timedOut, timedOut
+}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": "Window closed",
-	})), nil
+func (a *atspiClient) busPID(ctx context.Context, bus string) int {
+	a.mu.Lock()
+	pid, ok := a.pids[bus]
+	a.mu.Unlock()
+	if ok {
+		return pid
+	}
+	ctx, cancel := context.WithTimeout(ctx, atspiCallTimeout)
+	defer cancel()
+	var value uint32
+	if err := a.conn.BusObject().CallWithContext(ctx, "org.freedesktop.DBus.GetConnectionUnixProcessID", 0, bus).Store(&value); err != nil {
+		return 0
+	}
+	a.mu.Lock()
+	a.pids[bus] = int(value)
+	a.mu.Unlock()
+	return int(value)
 }
 
-// ==================== PROCESS HANDLERS ====================
+// windowRoot выбирает корень дерева: node, окно по handle или pid, иначе
+// активное окно. Окно приложения ищется по заголовку из индекса окон,
+// затем по состоянию active
+func (a *atspiClient) windowRoot(ctx context.Context, args map[string]interface{}) (atspiRef, error) {
+	if id := getStringArg(args, "node", ""); id != "" {
+		return parseAtspiRef(id)
+	}
 
-func processListHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	processes, err := robotgo.Process()
+	target, ok, err := resolveWindow(args)
 	if err != nil {
-		return nil, fmt.Errorf("failed to get process list: %w", err)
+		return atspiRef{}, err
+	}
+	var title string
+	if ok && target.xid != 0 {
+		if e, found := windowIndex.lookup(target.xid); found {
+			target.pid, title = e.pid, e.title
+		}
+	} else if !ok {
+		e, found := winEntry{}, false
+		if windowIndex.available() {
+			e, found = windowIndex.activeWindow()
+		}
+		if !found {
+			return atspiRef{}, fmt.Errorf("missing required parameter: pid, handle or node")
+		}
+		target.pid, title = e.pid, e.title
+	}
+	if target.pid <= 0 {
+		return atspiRef{}, fmt.Errorf("window %s has no PID", target)
 	}
 
-	processList := make([]map[string]interface{}, 0, len(processes))
-	for _, p := range processes {
-		processList = append(processList, map[string]interface{}{
-			"pid":  p.Pid,
-			"name": p.Name,
-		})
+	// Список приложений перечитывается всегда: регистрация новых
+	// приложений не обязана сопровождаться событием
+	desktop := atspiRef{bus: atspiRegistryBus, path: atspiRootPath}
+	a.invalidate(desktop)
+	roots, _, _ := a.nodesFor(ctx, []atspiRef{desktop})
+	if roots[0] == nil {
+		return atspiRef{}, fmt.Errorf("accessibility registry is not responding")
+	}
+	for _, app := range roots[0].children {
+		if a.busPID(ctx, app.bus) != target.pid {
+			continue
+		}
+		windows, _, _ := a.nodesFor(ctx, []atspiRef{app})
+		if windows[0] == nil || len(windows[0].children) == 0 {
+			return app, nil
+		}
+		frames, _, _ := a.nodesFor(ctx, windows[0].children)
+		best := -1
+		for i, frame := range frames {
+			if frame == nil {
+				continue
+			}
+			if title != "" && frame.name == title {
+				return windows[0].children[i], nil
+			}
+			if best < 0 || frame.hasState("active") && !frames[best].hasState("active") {
+				best = i
+			}
+		}
+		if best >= 0 {
+			return windows[0].children[best], nil
+		}
+		return app, nil
 	}
+	return atspiRef{}, fmt.Errorf("no accessible application with PID %d", target.pid)
+}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"processes": processList,
-		"count":     len(processList),
-	})), nil
+func uiNodeFrom(ref atspiRef, n *atspiNode) *uiNode {
+	return &uiNode{
+		ID:          ref.id(),
+		Role:        n.role,
+		Name:        n.name,
+		Description: n.description,
+		States:      n.states,
+		Bounds:      n.bounds,
+		ChildCount:  len(n.children),
+	}
 }
 
-func processFindByNameHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+// atspiVisit — узел, достигнутый обходом; parent — индекс родителя в
+// результате traverse (-1 у корня)
+type atspiVisit struct {
+	ref    atspiRef
+	node   *atspiNode
+	parent int
+}
 
-	name, err := getRequiredStringArg(args, "name")
-	if err != nil {
-		return nil, err
-	}
+type atspiTraversal struct {
+	visits    []atspiVisit
+	fetched   int
+	timedOut  int // узлы, не ответившие за atspiCallTimeout, пропущены с поддеревьями
+	truncated bool
+}
 
-	pids, err := robotgo.FindIds(name)
-	if err != nil {
-		return nil, fmt.Errorf("failed to find processes: %w", err)
+// traverse обходит дерево в ширину, уровень за уровнем: узлы уровня
+// читаются одной пачкой асинхронных вызовов, неизменившиеся — из кэша
+func (a *atspiClient) traverse(ctx context.Context, root atspiRef, depth, maxNodes int, showingOnly bool) (atspiTraversal, error) {
+	var t atspiTraversal
+	nodes, fetched, timedOut := a.nodesFor(ctx, []atspiRef{root})
+	t.fetched += fetched
+	if err := ctx.Err(); err != nil {
+		return t, err
+	}
+	if timedOut > 0 {
+		return t, fmt.Errorf("accessible object %s did not respond within %v", root.id(), atspiCallTimeout)
 	}
+	if nodes[0] == nil {
+		return t, fmt.Errorf("accessible object %s not found", root.id())
+	}
+	t.visits = append(t.visits, atspiVisit{ref: root, node: nodes[0], parent: -1})
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"pids":  pids,
-		"count": len(pids),
-	})), nil
-}
+	levelStart := 0
+	for d := 0; d < depth && levelStart < len(t.visits); d++ {
+		if err := ctx.Err(); err != nil {
+			return t, err
+		}
+		levelEnd := len(t.visits)
+		var refs []atspiRef
+		var parents []int
+		for i := levelStart; i < levelEnd; i++ {
+			for _, child := range t.visits[i].node.children {
+				if levelEnd+len(refs) >= maxNodes {
+					t.truncated = true
+					break
+				}
+				refs = append(refs, child)
+				parents = append(parents, i)
+			}
+		}
 
-func processGetNameHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+		children, fetched, timedOut := a.nodesFor(ctx, refs)
+		t.fetched += fetched
+		t.timedOut += timedOut
+		for j, n := range children {
+			if n == nil || showingOnly && !n.hasState("showing") {
+				continue
+			}
+			t.visits = append(t.visits, atspiVisit{ref: refs[j], node: n, parent: parents[j]})
+		}
+		levelStart = levelEnd
+	}
+	return t, nil
+}
 
-	pid, err := getRequiredIntArg(args, "pid")
-	if err != nil {
-		return nil, err
+// atspiTarget — общие параметры ui_tree и ui_find: корень и пределы обхода
+func atspiTarget(ctx context.Context, args map[string]interface{}, defaultDepth, defaultMaxNodes int, defaultShowingOnly bool) (atspiTraversal, error) {
+	depth := getIntArg(args, "depth", defaultDepth)
+	maxNodes := getIntArg(args, "max_nodes", defaultMaxNodes)
+	if depth < 0 || maxNodes <= 0 {
+		return atspiTraversal{}, fmt.Errorf("depth must be >= 0 and max_nodes > 0")
 	}
 
-	name, err := robotgo.FindName(pid)
+	if err := accessibility.start(); err != nil {
+		return atspiTraversal{}, err
+	}
+	root, err := accessibility.windowRoot(ctx, args)
 	if err != nil {
-		return nil, fmt.Errorf("failed to get process name: %w", err)
+		return atspiTraversal{}, err
 	}
-
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"name": name,
-	})), nil
+	return accessibility.traverse(ctx, root, depth, maxNodes, getBoolArg(args, "showing_only", defaultShowingOnly))
 }
 
-func processExistsHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+func uiTreeHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
 	args := getArgs(request)
 
-	pid, err := getRequiredIntArg(args, "pid")
+	start := time.Now()
+	t, err := atspiTarget(ctx, args, defaultUITreeDepth, defaultUITreeMaxNodes, false)
 	if err != nil {
 		return nil, err
 	}
 
-	exists, err := robotgo.PidExists(pid)
-	if err != nil {
-		return nil, fmt.Errorf("failed to check process: %w", err)
+	nodes := make([]*uiNode, len(t.visits))
+	for i, v := range t.visits {
+		nodes[i] = uiNodeFrom(v.ref, v.node)
+		if v.parent >= 0 {
+			parent := nodes[v.parent]
+			parent.Children = append(parent.Children, nodes[i])
+		}
+	}
+	response := uiTreeResponse{
+		Root:      nodes[0],
+		NodeCount: len(nodes),
+		Fetched:   t.fetched,
+		TimedOut:  t.timedOut,
+		Truncated: t.truncated,
+		ElapsedMs: durationMs(time.Since(start)),
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"exists": exists,
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(response)), nil
 }
 
-func processKillHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
-	args := getArgs(request)
+// uiFilter — условия ui_find; все заданные должны выполняться
+type uiFilter struct {
+	role   string         // роль AT-SPI, без учёта регистра
+	name   string         // подстрока имени, без учёта регистра
+	re     *regexp.Regexp // регулярное выражение для имени
+	states []string       // обязательные состояния
+}
 
-	pid, err := getRequiredIntArg(args, "pid")
-	if err != nil {
-		return nil, err
+func parseUIFilter(args map[string]interface{}) (uiFilter, error) {
+	filter := uiFilter{
+		role: strings.ToLower(getStringArg(args, "role", "")),
+		name: strings.ToLower(getStringArg(args, "name", "")),
 	}
-
-	err = robotgo.Kill(pid)
-	if err != nil {
-		return nil, fmt.Errorf("failed to kill process: %w", err)
+	if pattern := getStringArg(args, "name_pattern", ""); pattern != "" {
+		re, err := regexp.Compile(pattern)
+		if err != nil {
+			return filter, fmt.Errorf("invalid name_pattern %q: %w", pattern, err)
+		}
+		filter.re = re
 	}
+	for _, state := range strings.Split(getStringArg(args, "states", ""), ",") {
+		if state = strings.TrimSpace(state); state != "" {
+			filter.states = append(filter.states, strings.ToLower(state))
+		}
+	}
+	if filter.role == "" && filter.name == "" && filter.re == nil {
+		return filter, fmt.Errorf("missing required parameter: role, name or name_pattern")
+	}
+	return filter, nil
+}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Process %d killed", pid),
-	})), nil
+func (f uiFilter) match(n *atspiNode) bool {
+	if f.role != "" && strings.ToLower(n.role) != f.role {
+		return false
+	}
+	if f.name != "" && !strings.Contains(strings.ToLower(n.name), f.name) {
+		return false
+	}
+	if f.re != nil && !f.re.MatchString(n.name) {
+		return false
+	}
+	for _, state := range f.states {
+		if !n.hasState(state) {
+			return false
+		}
+	}
+	return true
 }
 
-func processRunHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+func uiFindHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
 	args := getArgs(request)
 
-	command, err := getRequiredStringArg(args, "command")
+	filter, err := parseUIFilter(args)
 	if err != nil {
 		return nil, err
 	}
-
-	// Get optional background parameter (default: true for non-blocking execution)
-	background := true
-	if bg, ok := args["background"]; ok {
-		if bgBool, ok := bg.(bool); ok {
-			background = bgBool
-		}
+	maxResults := getIntArg(args, "max_results", defaultUIFindMaxResults)
+	if maxResults <= 0 {
+		return nil, fmt.Errorf("max_results must be > 0")
 	}
-
-	// Parse command into parts
-	parts := strings.Fields(command)
-	if len(parts) == 0 {
-		return nil, fmt.Errorf("empty command")
+	searchCtx := ctx
+	if timeoutMs := getIntArg(args, "timeout_ms", defaultUIFindTimeoutMs); timeoutMs > 0 {
+		var cancel context.CancelFunc
+		searchCtx, cancel = context.WithTimeout(ctx, time.Duration(timeoutMs)*time.Millisecond)
+		defer cancel()
 	}
 
-	cmdName := parts[0]
-	cmdArgs := []string{}
-	if len(parts) > 1 {
-		cmdArgs = parts[1:]
+	start := time.Now()
+	t, err := atspiTarget(searchCtx, args, defaultUIFindDepth, defaultUIFindMaxNodes, true)
+	partial := false
+	if err != nil {
+		// Истёк бюджет поиска, а не запрос: отдаём то, что успели просмотреть
+		if ctx.Err() != nil || searchCtx.Err() == nil || len(t.visits) == 0 {
+			return nil, err
+		}
+		partial = true
 	}
 
-	cmd := exec.Command(cmdName, cmdArgs...)
-
-	if background {
-		// Start process in background (non-blocking) - suitable for GUI apps
-		err := cmd.Start()
-		if err != nil {
-			return nil, fmt.Errorf("failed to start command: %w", err)
+	// Элементы без экранных координат не годятся для mouse_click_at
+	elements := []uiElement{}
+	for _, v := range t.visits {
+		b := v.node.bounds
+		if b == nil || b.Width <= 0 || b.Height <= 0 || !filter.match(v.node) {
+			continue
 		}
-
-		pid := 0
-		if cmd.Process != nil {
-			pid = cmd.Process.Pid
+		if len(elements) == maxResults {
+			t.truncated = true
+			break
 		}
-
-		return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-			"status":  "started",
-			"pid":     pid,
-			"command": command,
-			"message": "Process started in background",
-		})), nil
+		elements = append(elements, uiElement{
+			ID:     v.ref.id(),
+			Role:   v.node.role,
+			Name:   v.node.name,
+			States: v.node.states,
+			Bounds: b,
+			X:      b.X + b.Width/2,
+			Y:      b.Y + b.Height/2,
+		})
 	}
 
-	// Run process and wait for completion (blocking) - suitable for CLI tools
-	output, err := cmd.CombinedOutput()
-	if err != nil {
-		return nil, fmt.Errorf("failed to run command: %w, output: %s", err, string(output))
+	response := uiFindResponse{
+		Elements:  elements,
+		Count:     len(elements),
+		Searched:  len(t.visits),
+		Fetched:   t.fetched,
+		TimedOut:  t.timedOut,
+		Partial:   partial,
+		Truncated: t.truncated,
+		ElapsedMs: durationMs(time.Since(start)),
 	}
-
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status": "completed",
-		"output": string(output),
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(response)), nil
 }
 
 // ==================== SYSTEM HANDLERS ====================
@@ -1136,11 +6211,11 @@ func systemGetInfoHandler(ctx context.Context, request mcp.CallToolRequest) (*mc
 	mainDisplayId := robotgo.GetMainId()
 	displaysCount := robotgo.DisplaysNum()
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"version":         version,
-		"is_64bit":        is64Bit,
-		"main_display_id": mainDisplayId,
-		"displays_count":  displaysCount,
+	return mcp.NewToolResultText(jsonResponse(systemInfoResponse{
+		Version:       version,
+		Is64Bit:       is64Bit,
+		MainDisplayID: mainDisplayId,
+		DisplaysCount: displaysCount,
 	})), nil
 }
 
@@ -1152,11 +6227,13 @@ func utilSleepHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.Ca
 		return nil, err
 	}
 
-	robotgo.MilliSleep(milliseconds)
+	if err := sleepContext(ctx, time.Duration(milliseconds)*time.Millisecond); err != nil {
+		return nil, fmt.Errorf("sleep cancelled: %w", err)
+	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"status":  "success",
-		"message": fmt.Sprintf("Slept for %d milliseconds", milliseconds),
+	return mcp.NewToolResultText(jsonResponse(statusResponse{
+		Status:  "success",
+		Message: fmt.Sprintf("Slept for %d milliseconds", milliseconds),
 	})), nil
 }
 
@@ -1182,9 +6259,7 @@ func alertShowHandler(ctx context.Context, request mcp.CallToolRequest) (*mcp.Ca
 		clickedDefault = robotgo.Alert(title, message, defaultBtn)
 	}
 
-	return mcp.NewToolResultText(jsonResponse(map[string]interface{}{
-		"clicked_default": clickedDefault,
-	})), nil
+	return mcp.NewToolResultText(jsonResponse(alertResponse{ClickedDefault: clickedDefault})), nil
 }
 
 // ==================== TOOL REGISTRATION ====================
@@ -1400,25 +6475,29 @@ func registerWindowTools(mcpServer *server.MCPServer) {
 	// window_get_title
 	mcpServer.AddTool(mcp.NewTool("window_get_title",
 		mcp.WithDescription("Get window title"),
-		mcp.WithNumber("pid", mcp.Description("Process ID (optional, uses active window if not specified)")),
+		mcp.WithNumber("pid", mcp.Description("Process ID (optional, uses active window if neither pid nor handle is specified)")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list or the xid field of window_get_active; alternative to pid")),
 	), withDisplayCheck(windowGetTitleHandler))
 
 	// window_get_bounds
 	mcpServer.AddTool(mcp.NewTool("window_get_bounds",
 		mcp.WithDescription("Get window bounds (x, y, width, height)"),
-		mcp.WithNumber("pid", mcp.Required(), mcp.Description("Process ID")),
+		mcp.WithNumber("pid", mcp.Description("Process ID (or pass handle)")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list or the xid field of window_get_active; alternative to pid")),
 	), withDisplayCheck(windowGetBoundsHandler))
 
 	// window_set_active
 	mcpServer.AddTool(mcp.NewTool("window_set_active",
-		mcp.WithDescription("Activate window by PID"),
-		mcp.WithNumber("pid", mcp.Required(), mcp.Description("Process ID")),
+		mcp.WithDescription("Activate window by PID or handle"),
+		mcp.WithNumber("pid", mcp.Description("Process ID (or pass handle)")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list or the xid field of window_get_active; alternative to pid")),
 	), withDisplayCheck(windowSetActiveHandler))
 
 	// window_move
 	mcpServer.AddTool(mcp.NewTool("window_move",
 		mcp.WithDescription("Move window to position"),
-		mcp.WithNumber("pid", mcp.Required(), mcp.Description("Process ID")),
+		mcp.WithNumber("pid", mcp.Description("Process ID (or pass handle)")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list or the xid field of window_get_active; alternative to pid")),
 		mcp.WithNumber("x", mcp.Required(), mcp.Description("X coordinate")),
 		mcp.WithNumber("y", mcp.Required(), mcp.Description("Y coordinate")),
 	), withDisplayCheck(windowMoveHandler))
@@ -1426,7 +6505,8 @@ func registerWindowTools(mcpServer *server.MCPServer) {
 	// window_resize
 	mcpServer.AddTool(mcp.NewTool("window_resize",
 		mcp.WithDescription("Resize window"),
-		mcp.WithNumber("pid", mcp.Required(), mcp.Description("Process ID")),
+		mcp.WithNumber("pid", mcp.Description("Process ID (or pass handle)")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list or the xid field of window_get_active; alternative to pid")),
 		mcp.WithNumber("width", mcp.Required(), mcp.Description("New width")),
 		mcp.WithNumber("height", mcp.Required(), mcp.Description("New height")),
 	), withDisplayCheck(windowResizeHandler))
@@ -1434,26 +6514,79 @@ func registerWindowTools(mcpServer *server.MCPServer) {
 	// window_minimize
 	mcpServer.AddTool(mcp.NewTool("window_minimize",
 		mcp.WithDescription("Minimize window"),
-		mcp.WithNumber("pid", mcp.Required(), mcp.Description("Process ID")),
+		mcp.WithNumber("pid", mcp.Description("Process ID (or pass handle)")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list or the xid field of window_get_active; alternative to pid")),
 	), withDisplayCheck(windowMinimizeHandler))
 
 	// window_maximize
 	mcpServer.AddTool(mcp.NewTool("window_maximize",
 		mcp.WithDescription("Maximize window"),
-		mcp.WithNumber("pid", mcp.Required(), mcp.Description("Process ID")),
+		mcp.WithNumber("pid", mcp.Description("Process ID (or pass handle)")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list or the xid field of window_get_active; alternative to pid")),
 	), withDisplayCheck(windowMaximizeHandler))
 
 	// window_close
 	mcpServer.AddTool(mcp.NewTool("window_close",
 		mcp.WithDescription("Close window"),
-		mcp.WithNumber("pid", mcp.Description("Process ID (optional, closes active window if not specified)")),
+		mcp.WithNumber("pid", mcp.Description("Process ID (optional, closes active window if neither pid nor handle is specified)")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list or the xid field of window_get_active; alternative to pid")),
 	), withDisplayCheck(windowCloseHandler))
+
+	// window_list
+	mcpServer.AddTool(mcp.NewTool("window_list",
+		mcp.WithDescription("List top-level windows (top of the stacking order first) with handle (XID), pid, title, class, bounds, visibility and desktop. Requires X11"),
+		mcp.WithString("title_pattern", mcp.Description("Only windows whose title matches this regular expression")),
+		mcp.WithString("class", mcp.Description("Only windows with this WM_CLASS class or instance (case insensitive)")),
+		mcp.WithNumber("pid", mcp.Description("Only windows of this process")),
+		mcp.WithBoolean("visible_only", mcp.Description("Skip unmapped and minimized windows (default: false)")),
+	), withDisplayCheck(windowListHandler))
+
+	// window_wait_for
+	mcpServer.AddTool(mcp.NewTool("window_wait_for",
+		mcp.WithDescription("Block until a window matching title_pattern/class/pid exists, becomes active, or stops moving and resizing. Driven by X events; returns status timeout instead of an error when the deadline passes. Requires X11"),
+		mcp.WithString("condition", mcp.Description("exists (default), active or settled")),
+		mcp.WithString("title_pattern", mcp.Description("Window title regular expression")),
+		mcp.WithString("class", mcp.Description("WM_CLASS class or instance (case insensitive)")),
+		mcp.WithNumber("pid", mcp.Description("Process ID that owns the window")),
+		mcp.WithBoolean("visible_only", mcp.Description("Ignore unmapped and minimized windows (default: false)")),
+		mcp.WithNumber("settle_ms", mcp.Description("For settled: how long the bounds must stay unchanged (default: 200)")),
+		mcp.WithNumber("x", mcp.Description("For settled: expected window x after a move; settled is reported only once it is reached")),
+		mcp.WithNumber("y", mcp.Description("For settled: expected window y")),
+		mcp.WithNumber("width", mcp.Description("For settled: expected window width after a resize")),
+		mcp.WithNumber("height", mcp.Description("For settled: expected window height")),
+		mcp.WithNumber("tolerance", mcp.Description("For settled: allowed difference from the expected bounds in pixels (default: 0)")),
+		mcp.WithNumber("timeout_ms", mcp.Description("Give up after this many milliseconds (default: 10000, 0 = no timeout)")),
+	), withDisplayCheck(windowWaitForHandler))
+
+	// window_capture
+	mcpServer.AddTool(mcp.NewTool("window_capture",
+		mcp.WithDescription("Capture one window (returns MCP ImageContent plus the capture's screen position as JSON). By default the client area without WM decorations; with offscreen=true the content is read via XComposite, so overlapping windows do not hide it"),
+		mcp.WithNumber("pid", mcp.Description("Process ID (or pass handle)")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list or the xid field of window_get_active; alternative to pid")),
+		mcp.WithBoolean("include_frame", mcp.Description("Include WM decorations (default: false)")),
+		mcp.WithBoolean("offscreen", mcp.Description("Read the window's off-screen pixmap via XComposite, even when it is partially covered (X11, default: false)")),
+	), withDisplayCheck(windowCaptureHandler))
+
+	// window_arrange
+	mcpServer.AddTool(mcp.NewTool("window_arrange",
+		mcp.WithDescription("Move, resize and change the state of several windows in one X batch, then return their final geometries once they stop changing. Requires X11"),
+		mcp.WithArray("windows", mcp.Required(), mcp.Description("Entries {pid|handle, x, y, width, height, state}; x/y and width/height are optional pairs, state is normal, maximized, minimized or fullscreen"),
+			mcp.Items(map[string]interface{}{"type": "object"})),
+		mcp.WithNumber("settle_ms", mcp.Description("How long geometries must stay unchanged, within 50 px of the requested ones, before returning (default: 200)")),
+		mcp.WithNumber("timeout_ms", mcp.Description("Maximum time to wait for the windows to settle (default: 2000)")),
+	), withDisplayCheck(windowArrangeHandler))
 }
 
 func registerProcessTools(mcpServer *server.MCPServer) {
 	// process_list
 	mcpServer.AddTool(mcp.NewTool("process_list",
-		mcp.WithDescription("List all running processes"),
+		mcp.WithDescription("List running processes, optionally filtered by name and user and paginated. Follow next_offset to get the next page"),
+		mcp.WithString("name_pattern", mcp.Description("Only processes whose name matches this pattern")),
+		mcp.WithString("pattern_type", mcp.Description("How name_pattern is matched: glob (case insensitive, default) or regex")),
+		mcp.WithString("user", mcp.Description("Only processes of this user (name or numeric UID, Linux only)")),
+		mcp.WithNumber("offset", mcp.Description("Number of matching processes to skip (default: 0)")),
+		mcp.WithNumber("limit", mcp.Description("Maximum number of processes to return (default: all)")),
+		mcp.WithArray("fields", mcp.Description("Fields to return: pid, name, user, cmdline, cpu (lifetime average %), rss (bytes), start_time. Default: pid, name"), mcp.Items(map[string]interface{}{"type": "string"})),
 	), withDisplayCheck(processListHandler))
 
 	// process_find_by_name
@@ -1476,16 +6609,109 @@ func registerProcessTools(mcpServer *server.MCPServer) {
 
 	// process_kill
 	mcpServer.AddTool(mcp.NewTool("process_kill",
-		mcp.WithDescription("Kill process by PID"),
-		mcp.WithNumber("pid", mcp.Required(), mcp.Description("Process ID")),
+		mcp.WithDescription("Send a signal to processes selected by pid, pids or name_pattern, optionally with their process groups or descendant trees. With a soft signal and force_after_ms, processes still alive after the deadline get SIGKILL"),
+		mcp.WithNumber("pid", mcp.Description("Process ID")),
+		mcp.WithArray("pids", mcp.Description("Process IDs (alternative or addition to pid)"), mcp.Items(map[string]interface{}{"type": "number"})),
+		mcp.WithString("name_pattern", mcp.Description("Signal every process whose name matches this pattern")),
+		mcp.WithString("pattern_type", mcp.Description("How name_pattern is matched: glob (case insensitive, default) or regex")),
+		mcp.WithString("signal", mcp.Description("TERM, KILL or INT (default: KILL)")),
+		mcp.WithNumber("force_after_ms", mcp.Description("For TERM/INT: wait up to this many milliseconds, then SIGKILL survivors (default: 0 = no escalation)")),
+		mcp.WithBoolean("group", mcp.Description("Also signal every process in the targets' process groups (Linux)")),
+		mcp.WithBoolean("tree", mcp.Description("Also signal all descendants of the targets (Linux)")),
 	), withDisplayCheck(processKillHandler))
 
 	// process_run
 	mcpServer.AddTool(mcp.NewTool("process_run",
-		mcp.WithDescription("Run shell command. By default runs in background (non-blocking) which is suitable for GUI apps. Set background=false to wait for command completion."),
-		mcp.WithString("command", mcp.Required(), mcp.Description("Command to run")),
+		mcp.WithDescription("Run command (no shell: command is split on whitespace, argv is passed as is). By default runs in background (non-blocking) which is suitable for GUI apps. Set background=false to wait for command completion."),
+		mcp.WithString("command", mcp.Description("Command to run, split on whitespace (use argv for arguments with spaces or quotes)")),
+		mcp.WithArray("argv", mcp.Description("Program and arguments, passed without splitting or shell expansion (alternative to command)"), mcp.Items(map[string]interface{}{"type": "string"})),
+		mcp.WithString("cwd", mcp.Description("Working directory (default: server working directory)")),
+		mcp.WithObject("env", mcp.Description("Environment overlay on top of the server environment: string values set variables, null removes them")),
+		mcp.WithString("stdin", mcp.Description("Data written to the process stdin (default: empty stdin)")),
 		mcp.WithBoolean("background", mcp.Description("Run in background without waiting (default: true). Set to false for CLI commands where you need the output.")),
+		mcp.WithNumber("max_output_bytes", mcp.Description("Keep at most this many bytes of output, dropping the oldest (default: 1048576 in foreground; 262144 per stream in background, see process_output)")),
+		mcp.WithNumber("timeout_ms", mcp.Description("Foreground only: kill the command after this many milliseconds (default: no timeout)")),
+		mcp.WithBoolean("stream", mcp.Description("Foreground only: stream output chunks as notifications/progress messages (requires a progressToken in the request _meta). Chunks may be dropped when the client falls behind (counted in dropped_notifications); the final output is authoritative")),
 	), withDisplayCheck(processRunHandler))
+
+	// process_stats
+	mcpServer.AddTool(mcp.NewTool("process_stats",
+		mcp.WithDescription("Sample CPU %, RSS/VMS memory, thread count and I/O rates of processes over an interval (Linux). Processes added with process_watch are answered immediately from the background sampler"),
+		mcp.WithNumber("pid", mcp.Description("Process ID")),
+		mcp.WithArray("pids", mcp.Description("Process IDs (alternative or addition to pid)"), mcp.Items(map[string]interface{}{"type": "number"})),
+		mcp.WithNumber("interval_ms", mcp.Description("Sampling interval in ms (default: 500). When set, watched processes are sampled afresh too")),
+		mcp.WithBoolean("history", mcp.Description("Include the background sampler history for watched processes (default: false)")),
+	), withDisplayCheck(processStatsHandler))
+
+	// process_watch
+	mcpServer.AddTool(mcp.NewTool("process_watch",
+		mcp.WithDescription("Start or stop background resource sampling of processes for process_stats (Linux). Exited processes are dropped automatically"),
+		mcp.WithNumber("pid", mcp.Description("Process ID")),
+		mcp.WithArray("pids", mcp.Description("Process IDs (alternative or addition to pid)"), mcp.Items(map[string]interface{}{"type": "number"})),
+		mcp.WithNumber("interval_ms", mcp.Description("Sampling interval in ms for all watched processes (default: 1000, min: 100)")),
+		mcp.WithBoolean("stop", mcp.Description("Stop watching the given processes, or all of them when none are given (default: false)")),
+	), withDisplayCheck(processWatchHandler))
+
+	// process_wait_for
+	mcpServer.AddTool(mcp.NewTool("process_wait_for",
+		mcp.WithDescription("Block until a process exits (pid) or a process with a matching name appears (name or name_pattern). Event driven on Linux (pidfd, proc connector), polling elsewhere. Returns status exited, found or timeout"),
+		mcp.WithNumber("pid", mcp.Description("Wait for this process to exit")),
+		mcp.WithString("name", mcp.Description("Wait for a process whose name contains this string (case insensitive)")),
+		mcp.WithString("name_pattern", mcp.Description("Wait for a process whose name matches this pattern")),
+		mcp.WithString("pattern_type", mcp.Description("How name_pattern is matched: glob (case insensitive, default) or regex")),
+		mcp.WithNumber("timeout_ms", mcp.Description("Give up after this many milliseconds (default: 30000, 0 = no timeout)")),
+	), withDisplayCheck(processWaitForHandler))
+
+	// process_status
+	mcpServer.AddTool(mcp.NewTool("process_status",
+		mcp.WithDescription("Get status and exit code of processes started by process_run in background. Without pid lists all of them"),
+		mcp.WithNumber("pid", mcp.Description("Process ID (optional)")),
+	), withDisplayCheck(processStatusHandler))
+
+	// process_output
+	mcpServer.AddTool(mcp.NewTool("process_output",
+		mcp.WithDescription("Read captured stdout/stderr of a process started by process_run in background. Pass next_offset from the previous call as offset to read only new output"),
+		mcp.WithNumber("pid", mcp.Required(), mcp.Description("Process ID")),
+		mcp.WithString("stream", mcp.Description("Output stream: stdout or stderr (default: stdout)")),
+		mcp.WithNumber("offset", mcp.Description("Byte offset to read from (default: 0)")),
+	), withDisplayCheck(processOutputHandler))
+
+	// process_wait
+	mcpServer.AddTool(mcp.NewTool("process_wait",
+		mcp.WithDescription("Wait for a process started by process_run in background to exit and return its status"),
+		mcp.WithNumber("pid", mcp.Required(), mcp.Description("Process ID")),
+		mcp.WithNumber("timeout_ms", mcp.Description("Give up after this many milliseconds and return the current status (default: wait until exit)")),
+	), withDisplayCheck(processWaitHandler))
+}
+
+func registerAccessibilityTools(mcpServer *server.MCPServer) {
+	// ui_tree
+	mcpServer.AddTool(mcp.NewTool("ui_tree",
+		mcp.WithDescription("Accessibility tree (AT-SPI) of a window: roles, names, states and screen bounds. Nodes are cached and refreshed from AT-SPI events, so repeated calls only re-read what changed. Target: node, handle, pid or the active window"),
+		mcp.WithNumber("pid", mcp.Description("Process ID of the application")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list; selects the application window with the same title")),
+		mcp.WithString("node", mcp.Description("Node id from a previous ui_tree call: return only this subtree")),
+		mcp.WithNumber("depth", mcp.Description("Maximum depth below the root (default: 8)")),
+		mcp.WithNumber("max_nodes", mcp.Description("Maximum number of nodes in the response (default: 2000)")),
+		mcp.WithBoolean("showing_only", mcp.Description("Skip elements without the showing state (default: false)")),
+	), withDisplayCheck(uiTreeHandler))
+
+	// ui_find
+	mcpServer.AddTool(mcp.NewTool("ui_find",
+		mcp.WithDescription("Find accessibility (AT-SPI) elements of a window by role, name or name regex. Uses the ui_tree node cache, so repeated searches only re-read changed nodes. Returns element centres ready for mouse_click_at"),
+		mcp.WithString("role", mcp.Description("AT-SPI role, case-insensitive (e.g. 'push button', 'text', 'menu item')")),
+		mcp.WithString("name", mcp.Description("Case-insensitive substring of the element name")),
+		mcp.WithString("name_pattern", mcp.Description("Regular expression for the element name")),
+		mcp.WithString("states", mcp.Description("Comma-separated states the element must have (e.g. 'enabled,focusable')")),
+		mcp.WithNumber("pid", mcp.Description("Process ID of the application")),
+		mcp.WithNumber("handle", mcp.Description("Window handle (XID) from window_list")),
+		mcp.WithString("node", mcp.Description("Node id from ui_tree/ui_find: search only this subtree")),
+		mcp.WithNumber("depth", mcp.Description("Maximum search depth (default: 32)")),
+		mcp.WithNumber("max_nodes", mcp.Description("Maximum number of nodes to search (default: 10000)")),
+		mcp.WithNumber("max_results", mcp.Description("Maximum number of elements returned (default: 20)")),
+		mcp.WithNumber("timeout_ms", mcp.Description("Search budget; when it runs out, matches from the part already searched are returned with partial=true (default: 5000, 0 = no limit)")),
+		mcp.WithBoolean("showing_only", mcp.Description("Search only elements with the showing state (default: true)")),
+	), withDisplayCheck(uiFindHandler))
 }
 
 func registerSystemTools(mcpServer *server.MCPServer) {
@@ -1510,15 +6736,73 @@ func registerSystemTools(mcpServer *server.MCPServer) {
 	), withDisplayCheck(alertShowHandler))
 }
 
+// ==================== DEBUG ENDPOINTS ====================
+
+// serveDebug запускает pprof, runtime/trace и дампы горутин на отдельном адресе.
+//
+//	/debug/pprof/                      — индекс профилей
+//	/debug/pprof/profile?seconds=30    — CPU профиль
+//	/debug/pprof/heap                  — heap профиль
+//	/debug/pprof/trace?seconds=5       — runtime/trace
+//	/debug/pprof/goroutine?debug=2     — полный дамп стеков горутин
+//	/metrics                           — метрики tools (и для stdio транспорта)
+func serveDebug(addr string) {
+	if host, _, err := net.SplitHostPort(addr); err == nil {
+		if ip := net.ParseIP(host); host != "localhost" && (ip == nil || !ip.IsLoopback()) {
+			log.Printf("WARNING: debug endpoints are exposed on non-loopback address %s", addr)
+		}
+	}
+
+	mux := http.NewServeMux()
+	mux.HandleFunc("/debug/pprof/", pprof.Index)
+	mux.HandleFunc("/debug/pprof/cmdline", pprof.Cmdline)
+	mux.HandleFunc("/debug/pprof/profile", pprof.Profile)
+	mux.HandleFunc("/debug/pprof/symbol", pprof.Symbol)
+	mux.HandleFunc("/debug/pprof/trace", pprof.Trace)
+	mux.HandleFunc("/metrics", metricsHandler)
+
+	log.Printf("Debug endpoints listening on http://%s/debug/pprof/", addr)
+	if err := http.ListenAndServe(addr, mux); err != nil {
+		log.Printf("Debug server stopped: %v", err)
+	}
+}
+
 func main() {
 	// Parse command line arguments
 	transport := flag.String("t", "sse", "Transport type: 'sse' or 'stdio'")
 	host := flag.String("h", "0.0.0.0", "Host for SSE server")
 	port := flag.Int("p", 8080, "Port for SSE server")
+	flag.BoolVar(&prettyJSON, "pretty", false, "Pretty-print (indent) JSON in tool responses")
+	debugAddr := flag.String("debug-addr", "", "Address for pprof/trace debug endpoints, e.g. 127.0.0.1:6060 (disabled if empty)")
+	flag.BoolVar(&timingEnabled, "timing", false, "Attach _meta.timing (server timings) to every tool result")
+	traceFile := flag.String("trace-file", "", "Write tool call spans as OTLP/JSON lines to this file (disabled if empty)")
+	traceOTLP := flag.String("trace-otlp", "", "Export tool call spans to an OTLP/HTTP JSON endpoint, e.g. http://127.0.0.1:4318/v1/traces")
 	flag.Parse()
 
+	if *traceFile != "" || *traceOTLP != "" {
+		exporter, err := newSpanExporter(*traceFile, *traceOTLP)
+		if err != nil {
+			log.Fatalf("Failed to initialize tracing: %v", err)
+		}
+		tracer = exporter
+	}
+
+	if *debugAddr != "" {
+		go serveDebug(*debugAddr)
+	}
+
+	hooks := &server.Hooks{}
+	hooks.AddBeforeCallTool(annotateToolRequest)
+
 	// Create MCP server
-	mcpServer := server.NewMCPServer(ServerName, ServerVersion)
+	mcpServer := server.NewMCPServer(ServerName, ServerVersion,
+		server.WithToolHandlerMiddleware(withMetrics),
+		server.WithToolHandlerMiddleware(withTracing),
+		server.WithToolHandlerMiddleware(withTiming),
+		server.WithToolHandlerMiddleware(withCancellation),
+		server.WithHooks(hooks),
+	)
+	mcpServer.AddNotificationHandler("notifications/cancelled", handleCancelledNotification)
 
 	// Register all tools
 	registerMouseTools(mcpServer)
@@ -1526,6 +6810,7 @@ func main() {
 	registerScreenTools(mcpServer)
 	registerWindowTools(mcpServer)
 	registerProcessTools(mcpServer)
+	registerAccessibilityTools(mcpServer)
 	registerSystemTools(mcpServer)
 
 	log.Printf("Starting %s v%s", ServerName, ServerVersion)
@@ -1537,7 +6822,11 @@ func main() {
 		addr := fmt.Sprintf("%s:%d", *host, *port)
 		log.Printf("SSE server listening on %s", addr)
 		sseServer := server.NewSSEServer(mcpServer)
-		if err := sseServer.Start(addr); err != nil {
+		mux := http.NewServeMux()
+		mux.HandleFunc("/metrics", metricsHandler)
+		mux.Handle("/", sseServer)
+		log.Printf("Metrics available at http://%s/metrics", addr)
+		if err := http.ListenAndServe(addr, mux); err != nil {
 			log.Fatalf("Failed to start SSE server: %v", err)
 		}
 	case "stdio":
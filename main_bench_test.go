@@ -0,0 +1,454 @@
+package main
+
+import (
+	"bytes"
+	"context"
+	"encoding/base64"
+	"encoding/json"
+	"image"
+	"image/color"
+	"image/png"
+	"runtime"
+	"testing"
+	"time"
+
+	"github.com/mark3labs/mcp-go/mcp"
+	"github.com/mark3labs/mcp-go/server"
+)
+
+// Бенчмарки запускаются через `make bench` (go test -bench . -benchmem -run '^$').
+// Бенчмарки полного пути handler'ов требуют X11 дисплей (например, Xvfb):
+//
+//	xvfb-run -a make bench
+//
+// Без DISPLAY они пропускаются (b.Skip), остальные работают без дисплея.
+
+// benchArgs — типичный набор аргументов, как его декодирует mcp-go из JSON
+func benchArgs() map[string]interface{} {
+	return map[string]interface{}{
+		"x":          float64(640),
+		"y":          float64(480),
+		"button":     "left",
+		"double":     false,
+		"low":        1.5,
+		"display_id": float64(0),
+		"modifiers":  []interface{}{"ctrl", "shift"},
+	}
+}
+
+func benchRequest(name string, args map[string]interface{}) mcp.CallToolRequest {
+	request := mcp.CallToolRequest{}
+	request.Params.Name = name
+	request.Params.Arguments = args
+	return request
+}
+
+// ==================== ARGUMENT PARSING ====================
+
+func BenchmarkGetArgs(b *testing.B) {
+	request := benchRequest("mouse_move", benchArgs())
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = getArgs(request)
+	}
+}
+
+func BenchmarkGetIntArg(b *testing.B) {
+	args := benchArgs()
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = getIntArg(args, "x", -1)
+	}
+}
+
+func BenchmarkGetRequiredIntArg(b *testing.B) {
+	args := benchArgs()
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_, _ = getRequiredIntArg(args, "y")
+	}
+}
+
+func BenchmarkGetRequiredIntArgMissing(b *testing.B) {
+	args := benchArgs()
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_, _ = getRequiredIntArg(args, "missing")
+	}
+}
+
+func BenchmarkGetStringArg(b *testing.B) {
+	args := benchArgs()
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = getStringArg(args, "button", "left")
+	}
+}
+
+func BenchmarkGetBoolArg(b *testing.B) {
+	args := benchArgs()
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = getBoolArg(args, "double", false)
+	}
+}
+
+func BenchmarkGetFloatArg(b *testing.B) {
+	args := benchArgs()
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = getFloatArg(args, "low", 1.0)
+	}
+}
+
+func BenchmarkGetStringArrayArg(b *testing.B) {
+	args := benchArgs()
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = getStringArrayArg(args, "modifiers")
+	}
+}
+
+// ==================== JSON RESPONSE ====================
+
+// legacyJSONResponse — прежняя реализация (map + MarshalIndent) для сравнения
+func legacyJSONResponse(data interface{}) string {
+	jsonBytes, err := json.MarshalIndent(data, "", "  ")
+	if err != nil {
+		return ""
+	}
+	return string(jsonBytes)
+}
+
+func BenchmarkJSONResponsePositionLegacyMap(b *testing.B) {
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = legacyJSONResponse(map[string]interface{}{
+			"x": i,
+			"y": i,
+		})
+	}
+}
+
+func BenchmarkJSONResponsePositionMap(b *testing.B) {
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = jsonResponse(map[string]interface{}{
+			"x": i,
+			"y": i,
+		})
+	}
+}
+
+func BenchmarkJSONResponsePositionStruct(b *testing.B) {
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = jsonResponse(positionResponse{X: i, Y: i})
+	}
+}
+
+func BenchmarkJSONResponseColorMap(b *testing.B) {
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = jsonResponse(map[string]interface{}{
+			"color": "ffffff",
+		})
+	}
+}
+
+func BenchmarkJSONResponseColorStruct(b *testing.B) {
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		_ = jsonResponse(colorResponse{Color: "ffffff"})
+	}
+}
+
+func benchProcessList(n int) []processInfo {
+	list := make([]processInfo, n)
+	for i := range list {
+		list[i] = processInfo{Pid: i + 1, Name: "process-name"}
+	}
+	return list
+}
+
+func BenchmarkJSONResponseProcessListMap(b *testing.B) {
+	list := benchProcessList(5000)
+	maps := make([]map[string]interface{}, len(list))
+	for i, p := range list {
+		maps[i] = map[string]interface{}{"pid": p.Pid, "name": p.Name}
+	}
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		_ = jsonResponse(map[string]interface{}{
+			"processes": maps,
+			"count":     len(maps),
+		})
+	}
+}
+
+func BenchmarkJSONResponseProcessListStruct(b *testing.B) {
+	list := benchProcessList(5000)
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		_ = jsonResponse(processListResponse{Processes: list, Count: len(list)})
+	}
+}
+
+// ==================== IMAGE ENCODING ====================
+
+// benchImage — синтетический «скриншот» с градиентом и прямоугольниками,
+// чтобы PNG не сжимался до вырожденного размера как однотонная картинка
+func benchImage(width, height int) *image.RGBA {
+	img := image.NewRGBA(image.Rect(0, 0, width, height))
+	for y := 0; y < height; y++ {
+		for x := 0; x < width; x++ {
+			c := color.RGBA{R: uint8(x), G: uint8(y), B: 0x80, A: 0xff}
+			if (x/64+y/48)%5 == 0 {
+				c = color.RGBA{R: 0xf0, G: 0xf0, B: 0xf0, A: 0xff}
+			}
+			img.SetRGBA(x, y, c)
+		}
+	}
+	return img
+}
+
+func benchmarkEncodePNGBase64(b *testing.B, width, height int) {
+	img := benchImage(width, height)
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		if _, err := encodePNGBase64(context.Background(), img); err != nil {
+			b.Fatal(err)
+		}
+	}
+}
+
+func BenchmarkEncodePNGBase64Region400x300(b *testing.B) {
+	benchmarkEncodePNGBase64(b, 400, 300)
+}
+
+func BenchmarkEncodePNGBase64FullHD(b *testing.B) {
+	benchmarkEncodePNGBase64(b, 1920, 1080)
+}
+
+func BenchmarkPNGEncodeFullHD(b *testing.B) {
+	img := benchImage(1920, 1080)
+	var buf bytes.Buffer
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		buf.Reset()
+		if err := png.Encode(&buf, img); err != nil {
+			b.Fatal(err)
+		}
+	}
+	b.ReportMetric(float64(buf.Len()), "png-bytes")
+}
+
+func BenchmarkBase64FullHD(b *testing.B) {
+	var buf bytes.Buffer
+	if err := png.Encode(&buf, benchImage(1920, 1080)); err != nil {
+		b.Fatal(err)
+	}
+	data := buf.Bytes()
+	b.SetBytes(int64(len(data)))
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		_ = base64.StdEncoding.EncodeToString(data)
+	}
+}
+
+// ==================== HANDLERS (X11) ====================
+
+func requireDisplay(b *testing.B) {
+	b.Helper()
+	if err := checkDisplayAvailable(); err != nil {
+		b.Skipf("X11 display is not available: %v", err)
+	}
+}
+
+func benchmarkHandler(b *testing.B, name string, handler server.ToolHandlerFunc, args map[string]interface{}) {
+	requireDisplay(b)
+	ctx := context.Background()
+	request := benchRequest(name, args)
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		if _, err := handler(ctx, request); err != nil {
+			b.Fatal(err)
+		}
+	}
+}
+
+// Покрыты handler'ы без разрушительных побочных эффектов: ввод текста,
+// закрытие окон, kill и alert в бенчмарках не вызываются.
+
+func BenchmarkHandlerMouseGetPosition(b *testing.B) {
+	benchmarkHandler(b, "mouse_get_position", mouseGetPositionHandler, nil)
+}
+
+func BenchmarkHandlerMouseMove(b *testing.B) {
+	benchmarkHandler(b, "mouse_move", mouseMoveHandler, map[string]interface{}{
+		"x": float64(100), "y": float64(100),
+	})
+}
+
+func BenchmarkHandlerScreenGetSize(b *testing.B) {
+	benchmarkHandler(b, "screen_get_size", screenGetSizeHandler, nil)
+}
+
+func BenchmarkHandlerScreenGetDisplaysNum(b *testing.B) {
+	benchmarkHandler(b, "screen_get_displays_num", screenGetDisplaysNumHandler, nil)
+}
+
+func BenchmarkHandlerScreenGetDisplayBounds(b *testing.B) {
+	benchmarkHandler(b, "screen_get_display_bounds", screenGetDisplayBoundsHandler, map[string]interface{}{
+		"display_id": float64(0),
+	})
+}
+
+func BenchmarkHandlerScreenGetPixelColor(b *testing.B) {
+	benchmarkHandler(b, "screen_get_pixel_color", screenGetPixelColorHandler, map[string]interface{}{
+		"x": float64(10), "y": float64(10),
+	})
+}
+
+func BenchmarkHandlerScreenGetMouseColor(b *testing.B) {
+	benchmarkHandler(b, "screen_get_mouse_color", screenGetMouseColorHandler, nil)
+}
+
+func BenchmarkHandlerScreenCaptureFull(b *testing.B) {
+	benchmarkHandler(b, "screen_capture", screenCaptureHandler, nil)
+}
+
+func BenchmarkHandlerScreenCaptureRegion(b *testing.B) {
+	benchmarkHandler(b, "screen_capture", screenCaptureHandler, map[string]interface{}{
+		"x": float64(0), "y": float64(0), "width": float64(400), "height": float64(300),
+	})
+}
+
+func BenchmarkHandlerScreenCaptureAnnotated(b *testing.B) {
+	benchmarkHandler(b, "screen_capture", screenCaptureHandler, map[string]interface{}{
+		"show_cursor": true, "show_grid": true, "show_rulers": true,
+	})
+}
+
+func BenchmarkHandlerScreenCaptureSave(b *testing.B) {
+	benchmarkHandler(b, "screen_capture_save", screenCaptureSaveHandler, map[string]interface{}{
+		"path": b.TempDir() + "/bench.png",
+	})
+}
+
+func BenchmarkHandlerClipboardWriteRead(b *testing.B) {
+	requireDisplay(b)
+	ctx := context.Background()
+	write := benchRequest("clipboard_write", map[string]interface{}{"text": "benchmark"})
+	read := benchRequest("clipboard_read", nil)
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		if _, err := clipboardWriteHandler(ctx, write); err != nil {
+			b.Fatal(err)
+		}
+		if _, err := clipboardReadHandler(ctx, read); err != nil {
+			b.Fatal(err)
+		}
+	}
+}
+
+func BenchmarkHandlerWindowGetActive(b *testing.B) {
+	benchmarkHandler(b, "window_get_active", windowGetActiveHandler, nil)
+}
+
+func BenchmarkHandlerWindowGetTitle(b *testing.B) {
+	benchmarkHandler(b, "window_get_title", windowGetTitleHandler, nil)
+}
+
+func BenchmarkHandlerProcessList(b *testing.B) {
+	benchmarkHandler(b, "process_list", processListHandler, nil)
+}
+
+func BenchmarkHandlerProcessFindByName(b *testing.B) {
+	benchmarkHandler(b, "process_find_by_name", processFindByNameHandler, map[string]interface{}{
+		"name": "go",
+	})
+}
+
+func BenchmarkHandlerProcessGetName(b *testing.B) {
+	benchmarkHandler(b, "process_get_name", processGetNameHandler, map[string]interface{}{
+		"pid": float64(1),
+	})
+}
+
+func BenchmarkHandlerProcessExists(b *testing.B) {
+	benchmarkHandler(b, "process_exists", processExistsHandler, map[string]interface{}{
+		"pid": float64(1),
+	})
+}
+
+func BenchmarkHandlerProcessRunForeground(b *testing.B) {
+	benchmarkHandler(b, "process_run", processRunHandler, map[string]interface{}{
+		"command": "true", "background": false,
+	})
+}
+
+func BenchmarkHandlerSystemGetInfo(b *testing.B) {
+	benchmarkHandler(b, "system_get_info", systemGetInfoHandler, nil)
+}
+
+func BenchmarkHandlerUtilSleepZero(b *testing.B) {
+	benchmarkHandler(b, "util_sleep", utilSleepHandler, map[string]interface{}{
+		"milliseconds": float64(0),
+	})
+}
+
+// ==================== PROCESS INDEX ====================
+
+func requireProcfs(b *testing.B) {
+	b.Helper()
+	if runtime.GOOS != "linux" {
+		b.Skip("process index reads /proc (Linux only)")
+	}
+}
+
+// Полный снимок /proc — стоимость первого вызова
+func BenchmarkProcessIndexColdFind(b *testing.B) {
+	requireProcfs(b)
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		if _, err := newProcIndex("/proc").findIDs("go"); err != nil {
+			b.Fatal(err)
+		}
+	}
+}
+
+// Инкрементальное обновление (только diff PID) на каждом вызове
+func BenchmarkProcessIndexIncrementalFind(b *testing.B) {
+	requireProcfs(b)
+	ix := newProcIndex("/proc")
+	b.ReportAllocs()
+	for i := 0; i < b.N; i++ {
+		ix.refreshed = time.Time{}
+		if _, err := ix.findIDs("go"); err != nil {
+			b.Fatal(err)
+		}
+	}
+}
+
+// ==================== MIDDLEWARE ====================
+
+func BenchmarkWithMetricsOverhead(b *testing.B) {
+	handler := withMetrics(func(ctx context.Context, request mcp.CallToolRequest) (*mcp.CallToolResult, error) {
+		return mcp.NewToolResultText(jsonResponse(positionResponse{X: 1, Y: 2})), nil
+	})
+	ctx := context.Background()
+	request := benchRequest("mouse_get_position", nil)
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		_, _ = handler(ctx, request)
+	}
+}
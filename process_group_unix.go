@@ -0,0 +1,39 @@
+//go:build !windows
+
+package main
+
+import (
+	"errors"
+	"os"
+	"os/exec"
+	"syscall"
+)
+
+// Дочерние процессы process_run получают собственную группу процессов.
+// Иначе они делят группу с сервером и запустившим его клиентом, и
+// process_kill с group=true задел бы их.
+
+func setOwnProcessGroup(cmd *exec.Cmd) {
+	if cmd.SysProcAttr == nil {
+		cmd.SysProcAttr = &syscall.SysProcAttr{}
+	}
+	cmd.SysProcAttr.Setpgid = true
+}
+
+// killGroupOnCancel заставляет exec.CommandContext при отмене убивать всю
+// группу процесса: иначе SIGKILL получит только прямой потомок, а
+// запущенные им процессы (sh -c 'cmd &') останутся. Требует
+// setOwnProcessGroup, иначе PID не является ID группы
+func killGroupOnCancel(cmd *exec.Cmd) {
+	cmd.Cancel = func() error {
+		err := syscall.Kill(-cmd.Process.Pid, syscall.SIGKILL)
+		if errors.Is(err, syscall.ESRCH) {
+			return os.ErrProcessDone
+		}
+		return err
+	}
+}
+
+func serverProcessGroup() int {
+	return syscall.Getpgrp()
+}
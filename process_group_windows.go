@@ -0,0 +1,20 @@
+//go:build windows
+
+package main
+
+import "os/exec"
+
+// В Windows нет групп процессов POSIX; group в process_kill не поддерживается.
+
+func setOwnProcessGroup(cmd *exec.Cmd) {}
+
+// killGroupOnCancel: без групп отмена убивает только сам процесс
+func killGroupOnCancel(cmd *exec.Cmd) {
+	cmd.Cancel = func() error {
+		return cmd.Process.Kill()
+	}
+}
+
+func serverProcessGroup() int {
+	return -1
+}
@@ -0,0 +1,152 @@
+//go:build linux
+
+package main
+
+import (
+	"context"
+	"encoding/binary"
+	"errors"
+	"os"
+	"time"
+
+	"golang.org/x/sys/unix"
+)
+
+// Ожидание событий процессов средствами ядра Linux: pidfd (завершение
+// процесса, ядро 5.3+) и proc connector (exec новых программ; подписка
+// требует CAP_NET_ADMIN). Если механизм недоступен, возвращается
+// errProcWaitUnsupported и handler переходит на опрос индекса процессов.
+
+// Константы proc connector (linux/connector.h, linux/cn_proc.h)
+const (
+	cnIdxProc         = 0x1
+	cnValProc         = 0x1
+	procCnMcastListen = 0x1
+
+	procEventExec = 0x00000002
+	procEventComm = 0x00000200
+
+	nlmsgHdrLen     = 16
+	cnMsgHdrLen     = 20
+	procEventHdr    = 16 // what, cpu, timestamp_ns
+	procEventsBuf   = 64 << 10
+	waitPollSliceMs = 100 // мс между проверками отмены ctx
+)
+
+// waitPIDExitPidfd ждёт завершения pid через pidfd_open + poll. Событие
+// приходит в момент выхода процесса, без интервала опроса.
+func waitPIDExitPidfd(ctx context.Context, pid int) error {
+	fd, err := unix.PidfdOpen(pid, 0)
+	if err != nil {
+		if errors.Is(err, unix.ESRCH) {
+			return nil // уже завершился
+		}
+		if errors.Is(err, unix.ENOSYS) || errors.Is(err, unix.EPERM) {
+			return errProcWaitUnsupported
+		}
+		return err
+	}
+	defer unix.Close(fd)
+
+	fds := []unix.PollFd{{Fd: int32(fd), Events: unix.POLLIN}}
+	for {
+		if err := ctx.Err(); err != nil {
+			return err
+		}
+		n, err := unix.Poll(fds, waitPollSliceMs)
+		if err != nil {
+			if errors.Is(err, unix.EINTR) {
+				continue
+			}
+			return err
+		}
+		if n > 0 {
+			return nil
+		}
+	}
+}
+
+// procExecEvents — подписка на события exec/comm через proc connector
+type procExecEvents struct {
+	fd  int
+	buf []byte
+}
+
+// subscribeProcExecEvents подписывается на proc connector. Без
+// CAP_NET_ADMIN bind возвращает EPERM — тогда errProcWaitUnsupported.
+func subscribeProcExecEvents() (*procExecEvents, error) {
+	fd, err := unix.Socket(unix.AF_NETLINK, unix.SOCK_DGRAM|unix.SOCK_CLOEXEC, unix.NETLINK_CONNECTOR)
+	if err != nil {
+		return nil, errProcWaitUnsupported
+	}
+	if err := unix.Bind(fd, &unix.SockaddrNetlink{Family: unix.AF_NETLINK, Groups: cnIdxProc}); err != nil {
+		unix.Close(fd)
+		return nil, errProcWaitUnsupported
+	}
+	tv := unix.NsecToTimeval(int64(waitPollSliceMs * time.Millisecond))
+	if err := unix.SetsockoptTimeval(fd, unix.SOL_SOCKET, unix.SO_RCVTIMEO, &tv); err != nil {
+		unix.Close(fd)
+		return nil, err
+	}
+
+	// nlmsghdr + cn_msg + PROC_CN_MCAST_LISTEN
+	msg := make([]byte, nlmsgHdrLen+cnMsgHdrLen+4)
+	ne := binary.NativeEndian
+	ne.PutUint32(msg[0:], uint32(len(msg)))
+	ne.PutUint16(msg[4:], unix.NLMSG_DONE)
+	ne.PutUint32(msg[12:], uint32(os.Getpid()))
+	ne.PutUint32(msg[16:], cnIdxProc)
+	ne.PutUint32(msg[20:], cnValProc)
+	ne.PutUint16(msg[32:], 4)
+	ne.PutUint32(msg[36:], procCnMcastListen)
+	if err := unix.Sendto(fd, msg, 0, &unix.SockaddrNetlink{Family: unix.AF_NETLINK}); err != nil {
+		unix.Close(fd)
+		return nil, errProcWaitUnsupported
+	}
+
+	return &procExecEvents{fd: fd, buf: make([]byte, procEventsBuf)}, nil
+}
+
+// next возвращает PID процессов, выполнивших exec или сменивших имя. Пустой
+// результат без ошибки — прошёл интервал без событий; errProcEventsLost —
+// буфер сокета переполнился и события потеряны (нужен полный пересмотр).
+func (e *procExecEvents) next(ctx context.Context) ([]int, error) {
+	if err := ctx.Err(); err != nil {
+		return nil, err
+	}
+
+	n, _, err := unix.Recvfrom(e.fd, e.buf, 0)
+	if err != nil {
+		switch {
+		case errors.Is(err, unix.EAGAIN), errors.Is(err, unix.EWOULDBLOCK), errors.Is(err, unix.EINTR):
+			return nil, nil
+		case errors.Is(err, unix.ENOBUFS):
+			return nil, errProcEventsLost
+		}
+		return nil, err
+	}
+
+	ne := binary.NativeEndian
+	var pids []int
+	for off := 0; off+nlmsgHdrLen <= n; {
+		msgLen := int(ne.Uint32(e.buf[off:]))
+		if msgLen < nlmsgHdrLen || off+msgLen > n {
+			break
+		}
+		msg := e.buf[off : off+msgLen]
+		event := nlmsgHdrLen + cnMsgHdrLen
+		// exec_proc_event и comm_proc_event: process_pid, process_tgid
+		if len(msg) >= event+procEventHdr+8 {
+			switch ne.Uint32(msg[event:]) {
+			case procEventExec, procEventComm:
+				pids = append(pids, int(ne.Uint32(msg[event+procEventHdr+4:])))
+			}
+		}
+		off += (msgLen + 3) &^ 3
+	}
+	return pids, nil
+}
+
+func (e *procExecEvents) close() {
+	unix.Close(e.fd)
+}
@@ -0,0 +1,24 @@
+//go:build !linux
+
+package main
+
+import "context"
+
+// Вне Linux нет pidfd и proc connector: process_wait_for опрашивает
+// список процессов.
+
+func waitPIDExitPidfd(ctx context.Context, pid int) error {
+	return errProcWaitUnsupported
+}
+
+type procExecEvents struct{}
+
+func subscribeProcExecEvents() (*procExecEvents, error) {
+	return nil, errProcWaitUnsupported
+}
+
+func (e *procExecEvents) next(ctx context.Context) ([]int, error) {
+	return nil, errProcWaitUnsupported
+}
+
+func (e *procExecEvents) close() {}
@@ -25,6 +25,12 @@ class ToolResult:
     content: Any
     error: Optional[str] = None
     raw_response: Optional[dict] = None
+    meta: Optional[dict] = None
+
+    @property
+    def timing(self) -> Optional[dict]:
+        """Блок _meta.timing (сервер запущен с -timing или он запрошен в вызове)"""
+        return (self.meta or {}).get("timing")
 
 
 class MCPClient:
@@ -37,17 +43,28 @@ class MCPClient:
             print(result.content)
     """
 
-    def __init__(self, server_path: str, timeout: float = 30.0):
+    def __init__(
+        self,
+        server_path: str,
+        timeout: float = 30.0,
+        extra_args: Optional[list] = None,
+    ):
         """
         Args:
             server_path: Путь к исполняемому файлу MCP сервера
             timeout: Таймаут для операций в секундах
+            extra_args: Дополнительные флаги командной строки сервера
         """
         self.server_path = server_path
         self.timeout = timeout
+        self.extra_args = list(extra_args or [])
         self.process: Optional[subprocess.Popen] = None
         self._request_id = 0
-        self._response_queue: queue.Queue = queue.Queue()
+        # Ответы маршрутизируются по id, поэтому call_tool можно вызывать
+        # из нескольких потоков одновременно
+        self._pending: dict = {}
+        self._notifications: queue.Queue = queue.Queue()
+        self._write_lock = threading.Lock()
         self._reader_thread: Optional[threading.Thread] = None
         self._running = False
         self._lock = threading.Lock()
@@ -72,7 +89,7 @@ class MCPClient:
 
         # Запускаем сервер
         self.process = subprocess.Popen(
-            [self.server_path, "-t", "stdio"],
+            [self.server_path, "-t", "stdio", *self.extra_args],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -144,32 +161,107 @@ class MCPClient:
         # Сериализуем запрос (line-based JSON-RPC)
         body = json.dumps(request) + "\n"
 
-        # Отправляем
-        try:
-            self.process.stdin.write(body.encode("utf-8"))
-            self.process.stdin.flush()
-        except BrokenPipeError:
-            raise RuntimeError("MCP server connection closed")
+        response_queue: queue.Queue = queue.Queue(maxsize=1)
+        with self._lock:
+            self._pending[request_id] = response_queue
 
-        # Ждём ответ
         try:
-            response = self._response_queue.get(timeout=self.timeout)
-            return response
-        except queue.Empty:
-            raise TimeoutError(f"Timeout waiting for response to {method}")
+            # Отправляем
+            try:
+                with self._write_lock:
+                    self.process.stdin.write(body.encode("utf-8"))
+                    self.process.stdin.flush()
+            except BrokenPipeError:
+                raise RuntimeError("MCP server connection closed")
+
+            # Ждём ответ
+            try:
+                return response_queue.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError(f"Timeout waiting for response to {method}")
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
 
     def _read_responses(self):
         """Фоновый поток для чтения ответов от сервера"""
         while self._running and self.process and self.process.poll() is None:
             try:
-                response = self._read_message()
-                if response:
-                    self._response_queue.put(response)
+                message = self._read_message()
+                if message:
+                    self._dispatch_message(message)
             except Exception as e:
                 if self._running:
                     # Продолжаем при ошибках
                     pass
 
+    def _dispatch_message(self, message: dict):
+        """Отдать ответ ожидающему запросу или сохранить notification"""
+        if "id" in message and "method" not in message:
+            with self._lock:
+                response_queue = self._pending.get(message["id"])
+            if response_queue is not None:
+                response_queue.put(message)
+        elif "method" in message:
+            self._notifications.put(message)
+
+    def get_notifications(self, method: Optional[str] = None) -> list:
+        """
+        Забрать накопленные notifications от сервера.
+
+        Args:
+            method: Вернуть только notifications с этим методом (остальные остаются)
+
+        Returns:
+            Список JSON-RPC notifications
+        """
+        taken, kept = [], []
+        while True:
+            try:
+                message = self._notifications.get_nowait()
+            except queue.Empty:
+                break
+            if method is None or message.get("method") == method:
+                taken.append(message)
+            else:
+                kept.append(message)
+        for message in kept:
+            self._notifications.put(message)
+        return taken
+
+    @property
+    def last_request_id(self) -> int:
+        """ID последнего отправленного запроса"""
+        with self._lock:
+            return self._request_id
+
+    def send_notification(self, method: str, params: Optional[dict] = None):
+        """
+        Отправить JSON-RPC notification (без ответа).
+
+        Args:
+            method: Название метода
+            params: Параметры notification
+        """
+        if not self.process or self.process.poll() is not None:
+            raise RuntimeError("MCP server is not running")
+
+        notification = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            notification["params"] = params
+
+        body = json.dumps(notification) + "\n"
+        with self._write_lock:
+            self.process.stdin.write(body.encode("utf-8"))
+            self.process.stdin.flush()
+
+    def cancel_request(self, request_id: int, reason: Optional[str] = None):
+        """Отменить выполняющийся запрос (notifications/cancelled)"""
+        params = {"requestId": request_id}
+        if reason is not None:
+            params["reason"] = reason
+        self.send_notification("notifications/cancelled", params)
+
     def _read_message(self) -> Optional[dict]:
         """Прочитать одно JSON-RPC сообщение (line-based)"""
         if not self.process or not self.process.stdout:
@@ -208,10 +300,7 @@ class MCPClient:
             raise RuntimeError(f"Failed to initialize MCP: {response['error']}")
 
         # Отправляем notifications/initialized
-        notification = {"jsonrpc": "2.0", "method": "notifications/initialized"}
-        body = json.dumps(notification) + "\n"
-        self.process.stdin.write(body.encode("utf-8"))
-        self.process.stdin.flush()
+        self.send_notification("notifications/initialized")
 
         self._initialized = True
 
@@ -231,20 +320,27 @@ class MCPClient:
 
         return response.get("result", {}).get("tools", [])
 
-    def call_tool(self, name: str, arguments: Optional[dict] = None) -> ToolResult:
+    def call_tool(
+        self,
+        name: str,
+        arguments: Optional[dict] = None,
+        meta: Optional[dict] = None,
+    ) -> ToolResult:
         """
         Вызвать MCP tool.
 
         Args:
             name: Название tool
             arguments: Аргументы для tool
+            meta: Поле _meta запроса (например, {"timing": True})
 
         Returns:
             ToolResult с результатом вызова
         """
-        response = self._send_request(
-            "tools/call", {"name": name, "arguments": arguments or {}}
-        )
+        params = {"name": name, "arguments": arguments or {}}
+        if meta is not None:
+            params["_meta"] = meta
+        response = self._send_request("tools/call", params)
 
         if "error" in response:
             return ToolResult(
@@ -255,6 +351,20 @@ class MCPClient:
             )
 
         result = response.get("result", {})
+        result_meta = result.get("_meta")
+
+        # structuredContent уже содержит распарсенный объект — повторный
+        # json.loads текстового дубликата не нужен
+        structured = result.get("structuredContent")
+        if structured is not None:
+            return ToolResult(
+                success=True,
+                content=structured,
+                error=None,
+                raw_response=response,
+                meta=result_meta,
+            )
+
         content = result.get("content", [])
 
         # Парсим content
@@ -284,7 +394,11 @@ class MCPClient:
         )
 
         return ToolResult(
-            success=True, content=final_content, error=None, raw_response=response
+            success=True,
+            content=final_content,
+            error=None,
+            raw_response=response,
+            meta=result_meta,
         )
 
     def call_tool_raw(self, name: str, arguments: Optional[dict] = None) -> dict:
@@ -0,0 +1,244 @@
+"""
+E2E тесты для accessibility MCP tools (AT-SPI).
+
+Tools:
+- ui_tree: Дерево доступности окна (роли, имена, состояния, координаты)
+- ui_find: Поиск элементов по роли/имени с координатами центра
+
+Tkinter не поддерживает AT-SPI, поэтому тестовое окно — GTK 3 (PyGObject).
+Тесты пропускаются, если нет PyGObject или шины доступности.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from .mcp_client import MCPClient
+
+
+GTK_WINDOW_TITLE = "MCP A11y Test Window"
+GTK_BUTTON_LABEL = "MCP A11y Button"
+
+GTK_WINDOW_SCRIPT = f"""
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk
+
+window = Gtk.Window(title={GTK_WINDOW_TITLE!r})
+window.set_default_size(400, 300)
+window.move(200, 200)
+box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+box.pack_start(Gtk.Button(label={GTK_BUTTON_LABEL!r}), False, False, 0)
+box.pack_start(Gtk.Entry(), False, False, 0)
+window.add(box)
+window.connect("destroy", Gtk.main_quit)
+window.show_all()
+Gtk.main()
+"""
+
+
+def walk(node: dict):
+    """Все узлы поддерева в порядке обхода"""
+    yield node
+    for child in node.get("children", []):
+        yield from walk(child)
+
+
+@pytest.fixture(scope="module")
+def gtk_window():
+    """GTK окно с кнопкой и полем ввода в отдельном процессе"""
+    try:
+        import gi  # noqa: F401
+    except ImportError:
+        pytest.skip("PyGObject is not installed")
+
+    env = dict(os.environ)
+    env.pop("NO_AT_BRIDGE", None)
+    proc = subprocess.Popen([sys.executable, "-c", GTK_WINDOW_SCRIPT], env=env)
+    time.sleep(1.0)
+    if proc.poll() is not None:
+        pytest.skip("GTK window failed to start")
+
+    yield proc
+
+    proc.terminate()
+    proc.wait(timeout=5)
+
+
+def ui_tree(mcp_client: MCPClient, args: dict, tool: str = "ui_tree"):
+    """ui_tree/ui_find с пропуском теста, если AT-SPI недоступен"""
+    deadline = time.time() + 5.0
+    while True:
+        result = mcp_client.call_tool(tool, args)
+        if result.success:
+            return result
+        error = str(result.error)
+        if "accessibility bus" in error or "registry" in error:
+            pytest.skip(f"AT-SPI is not available: {error}")
+        # Приложение регистрируется в реестре не сразу после старта
+        if "no accessible application" not in error or time.time() > deadline:
+            return result
+        time.sleep(0.2)
+
+
+class TestUITree:
+    """Тесты для ui_tree tool"""
+
+    @pytest.mark.gui
+    def test_ui_tree_by_pid(self, mcp_client: MCPClient, gtk_window):
+        """ui_tree по pid возвращает окно с кнопкой и координатами"""
+        result = ui_tree(mcp_client, {"pid": gtk_window.pid})
+
+        assert result.success, f"ui_tree failed: {result.error}"
+        root = result.content["root"]
+        assert root["name"] == GTK_WINDOW_TITLE
+        assert result.content["node_count"] == len(list(walk(root)))
+
+        buttons = [
+            n for n in walk(root)
+            if n["role"] == "push button" and n.get("name") == GTK_BUTTON_LABEL
+        ]
+        assert buttons, "Button not found in accessibility tree"
+        bounds = buttons[0]["bounds"]
+        assert bounds["width"] > 0 and bounds["height"] > 0
+        assert "showing" in buttons[0]["states"]
+
+    @pytest.mark.gui
+    def test_ui_tree_depth_limit(self, mcp_client: MCPClient, gtk_window):
+        """depth=0 возвращает только корень с числом детей"""
+        result = ui_tree(mcp_client, {"pid": gtk_window.pid, "depth": 0})
+
+        assert result.success, f"ui_tree failed: {result.error}"
+        root = result.content["root"]
+        assert "children" not in root
+        assert root["child_count"] > 0
+        assert result.content["node_count"] == 1
+
+    @pytest.mark.gui
+    def test_ui_tree_max_nodes(self, mcp_client: MCPClient, gtk_window):
+        """max_nodes ограничивает ответ и выставляет truncated"""
+        result = ui_tree(mcp_client, {"pid": gtk_window.pid, "max_nodes": 2})
+
+        assert result.success, f"ui_tree failed: {result.error}"
+        assert result.content["node_count"] <= 2
+        assert result.content.get("truncated") is True
+
+    @pytest.mark.gui
+    def test_ui_tree_subtree(self, mcp_client: MCPClient, gtk_window):
+        """node возвращает поддерево элемента из предыдущего ответа"""
+        full = ui_tree(mcp_client, {"pid": gtk_window.pid})
+        assert full.success, f"ui_tree failed: {full.error}"
+        child = full.content["root"]["children"][0]
+
+        result = ui_tree(mcp_client, {"node": child["id"]})
+
+        assert result.success, f"ui_tree failed: {result.error}"
+        assert result.content["root"]["id"] == child["id"]
+        assert result.content["root"]["role"] == child["role"]
+
+    @pytest.mark.gui
+    def test_ui_tree_cached(self, mcp_client: MCPClient, gtk_window):
+        """Повторный обход без изменений берёт узлы из кэша"""
+        first = ui_tree(mcp_client, {"pid": gtk_window.pid})
+        assert first.success, f"ui_tree failed: {first.error}"
+
+        second = ui_tree(mcp_client, {"pid": gtk_window.pid})
+
+        assert second.success, f"ui_tree failed: {second.error}"
+        assert second.content["node_count"] == first.content["node_count"]
+        assert second.content["fetched"] < second.content["node_count"]
+
+    def test_ui_tree_invalid_node(self, mcp_client: MCPClient):
+        """Некорректный id узла возвращает ошибку"""
+        result = mcp_client.call_tool("ui_tree", {"node": "not-a-node"})
+
+        assert not result.success
+
+
+class TestUIFind:
+    """Тесты для ui_find tool"""
+
+    @pytest.mark.gui
+    def test_ui_find_by_role_and_name(self, mcp_client: MCPClient, gtk_window):
+        """ui_find находит кнопку и возвращает её центр"""
+        result = ui_tree(
+            mcp_client,
+            {"pid": gtk_window.pid, "role": "push button", "name": "a11y button"},
+            tool="ui_find",
+        )
+
+        assert result.success, f"ui_find failed: {result.error}"
+        assert result.content["count"] == 1
+        element = result.content["elements"][0]
+        assert element["name"] == GTK_BUTTON_LABEL
+        bounds = element["bounds"]
+        assert element["x"] == bounds["x"] + bounds["width"] // 2
+        assert element["y"] == bounds["y"] + bounds["height"] // 2
+
+    @pytest.mark.gui
+    def test_ui_find_name_pattern(self, mcp_client: MCPClient, gtk_window):
+        """name_pattern сопоставляет имя регулярным выражением"""
+        result = ui_tree(
+            mcp_client,
+            {"pid": gtk_window.pid, "name_pattern": "^MCP A11y B"},
+            tool="ui_find",
+        )
+
+        assert result.success, f"ui_find failed: {result.error}"
+        assert [e["role"] for e in result.content["elements"]] == ["push button"]
+
+    @pytest.mark.gui
+    def test_ui_find_click(self, mcp_client: MCPClient, gtk_window):
+        """Координаты ui_find годятся для mouse_click_at: поле ввода получает фокус"""
+        found = ui_tree(
+            mcp_client, {"pid": gtk_window.pid, "role": "text"}, tool="ui_find"
+        )
+        assert found.success, f"ui_find failed: {found.error}"
+        assert found.content["elements"], "Entry not found"
+        entry = found.content["elements"][0]
+
+        click = mcp_client.call_tool(
+            "mouse_click_at", {"x": entry["x"], "y": entry["y"]}
+        )
+        assert click.success, f"mouse_click_at failed: {click.error}"
+
+        deadline = time.time() + 3.0
+        while time.time() < deadline:
+            focused = ui_tree(
+                mcp_client,
+                {"node": entry["id"], "role": "text", "states": "focused"},
+                tool="ui_find",
+            )
+            if focused.success and focused.content["count"] == 1:
+                break
+            time.sleep(0.1)
+        else:
+            pytest.fail("Entry did not get focus after click")
+
+    @pytest.mark.gui
+    def test_ui_find_cached(self, mcp_client: MCPClient, gtk_window):
+        """Повторный поиск без изменений берёт узлы из кэша"""
+        args = {"pid": gtk_window.pid, "role": "push button"}
+        first = ui_tree(mcp_client, args, tool="ui_find")
+        assert first.success, f"ui_find failed: {first.error}"
+
+        second = ui_tree(mcp_client, args, tool="ui_find")
+
+        assert second.success, f"ui_find failed: {second.error}"
+        assert second.content["elements"] == first.content["elements"]
+        assert second.content["fetched"] < second.content["searched"]
+
+    def test_ui_find_requires_filter(self, mcp_client: MCPClient):
+        """Без role/name/name_pattern ui_find возвращает ошибку"""
+        result = mcp_client.call_tool("ui_find", {"pid": 1})
+
+        assert not result.success
+
+    def test_ui_find_invalid_pattern(self, mcp_client: MCPClient):
+        """Некорректное регулярное выражение возвращает ошибку"""
+        result = mcp_client.call_tool("ui_find", {"name_pattern": "[unclosed"})
+
+        assert not result.success
@@ -8,11 +8,16 @@ Tools:
 - process_exists: Проверить существование процесса
 - process_kill: Убить процесс
 - process_run: Запустить команду
+- process_status / process_output / process_wait: фоновые процессы process_run
+- process_stats / process_watch: потребление ресурсов процессами
+- process_wait_for: ожидание завершения или появления процесса
 """
 
 import pytest
 import os
+import shutil
 import time
+import threading
 import subprocess
 
 from .mcp_client import MCPClient
@@ -69,6 +74,93 @@ class TestProcessList:
         assert len(python_processes) > 0, "Should find at least one python process"
 
 
+class TestProcessListFilters:
+    """Тесты для фильтров, пагинации и fields в process_list"""
+
+    def test_process_list_glob_pattern(self, mcp_client: MCPClient):
+        """name_pattern (glob) оставляет только подходящие процессы"""
+        result = mcp_client.call_tool("process_list", {"name_pattern": "python*"})
+
+        assert result.success, f"process_list failed: {result.error}"
+        names = [p["name"].lower() for p in result.content["processes"]]
+        assert names, "Should find at least one python process"
+        assert all(name.startswith("python") for name in names)
+
+    def test_process_list_regex_pattern(self, mcp_client: MCPClient):
+        """pattern_type=regex использует регулярные выражения"""
+        result = mcp_client.call_tool(
+            "process_list", {"name_pattern": "^pyth?on", "pattern_type": "regex"}
+        )
+
+        assert result.success, f"process_list failed: {result.error}"
+        assert result.content["count"] > 0
+
+    def test_process_list_invalid_regex_fails(self, mcp_client: MCPClient):
+        """Некорректный regex возвращает ошибку"""
+        result = mcp_client.call_tool(
+            "process_list", {"name_pattern": "(", "pattern_type": "regex"}
+        )
+
+        assert not result.success
+
+    def test_process_list_pagination(self, mcp_client: MCPClient):
+        """limit/offset возвращают страницы без пропусков и повторов"""
+        full = mcp_client.call_tool("process_list")
+        all_pids = [p["pid"] for p in full.content["processes"]]
+
+        pids, offset = [], 0
+        while True:
+            page = mcp_client.call_tool(
+                "process_list", {"limit": 5, "offset": offset}
+            ).content
+            assert page["count"] <= 5
+            pids.extend(p["pid"] for p in page["processes"])
+            if "next_offset" not in page:
+                break
+            offset = page["next_offset"]
+
+        # Процессы могут появляться и завершаться между вызовами
+        common = set(all_pids) & set(pids)
+        assert len(pids) == len(set(pids)), "Pages should not overlap"
+        assert len(common) >= len(all_pids) * 0.9
+
+    def test_process_list_user_filter(self, mcp_client: MCPClient):
+        """user оставляет только процессы указанного пользователя"""
+        uid = os.getuid()
+        result = mcp_client.call_tool(
+            "process_list", {"user": str(uid), "fields": ["pid", "user"]}
+        )
+
+        assert result.success, f"process_list failed: {result.error}"
+        pids = [p["pid"] for p in result.content["processes"]]
+        assert os.getpid() in pids
+
+    def test_process_list_selected_fields(self, mcp_client: MCPClient):
+        """fields задаёт набор полей в ответе"""
+        result = mcp_client.call_tool(
+            "process_list",
+            {
+                "name_pattern": "python*",
+                "limit": 1,
+                "fields": ["cmdline", "cpu", "rss", "start_time"],
+            },
+        )
+
+        assert result.success, f"process_list failed: {result.error}"
+        process = result.content["processes"][0]
+        assert "name" not in process
+        assert "python" in process["cmdline"]
+        assert process["rss"] > 0
+        assert process["cpu"] >= 0
+        assert "start_time" in process
+
+    def test_process_list_unknown_field_fails(self, mcp_client: MCPClient):
+        """Неизвестное поле в fields возвращает ошибку"""
+        result = mcp_client.call_tool("process_list", {"fields": ["bogus"]})
+
+        assert not result.success
+
+
 class TestProcessFindByName:
     """Тесты для process_find_by_name tool"""
 
@@ -108,6 +200,26 @@ class TestProcessFindByName:
         pids = result.content.get("pids") or []
         assert len(pids) == 0, "PIDs list should be empty"
 
+    def test_process_find_by_name_sees_new_and_exited_processes(
+        self, mcp_client: MCPClient
+    ):
+        """Индекс процессов сразу видит запущенный и завершённый процесс"""
+        mcp_client.call_tool("process_find_by_name", {"name": "sleep"})
+
+        started = mcp_client.call_tool(
+            "process_run", {"command": "sleep 30", "background": True}
+        )
+        pid = started.content["pid"]
+
+        found = mcp_client.call_tool("process_find_by_name", {"name": "sleep"})
+        assert pid in (found.content["pids"] or [])
+
+        mcp_client.call_tool("process_kill", {"pid": pid})
+        mcp_client.call_tool("process_wait", {"pid": pid, "timeout_ms": 5000})
+
+        found = mcp_client.call_tool("process_find_by_name", {"name": "sleep"})
+        assert pid not in (found.content["pids"] or [])
+
     def test_process_find_by_name_requires_name_parameter(self, mcp_client: MCPClient):
         """process_find_by_name требует параметр name"""
         result = mcp_client.call_tool("process_find_by_name", {})
@@ -213,6 +325,123 @@ class TestProcessRun:
         assert result.success
         assert "/" in result.content["output"], "pwd should return a path"
 
+    def test_process_run_truncates_output_to_max_bytes(self, mcp_client: MCPClient):
+        """process_run с max_output_bytes возвращает только хвост вывода"""
+        result = mcp_client.call_tool(
+            "process_run",
+            {"command": "seq 1 100000", "background": False, "max_output_bytes": 64},
+        )
+
+        assert result.success, f"process_run failed: {result.error}"
+        content = result.content
+        assert len(content["output"]) <= 64
+        assert content["output"].endswith("100000\n")
+        assert content["truncated"] is True
+        assert content["dropped_bytes"] > 0
+
+    def test_process_run_timeout_kills_command(self, mcp_client: MCPClient):
+        """process_run с timeout_ms завершает зависшую команду"""
+        start = time.time()
+        result = mcp_client.call_tool(
+            "process_run",
+            {"command": "sleep 30", "background": False, "timeout_ms": 200},
+        )
+        elapsed = time.time() - start
+
+        assert not result.success
+        assert "timed out" in str(result.error)
+        assert elapsed < 5, f"Timeout was not applied: {elapsed:.1f}s"
+
+    def test_process_run_timeout_kills_process_group(
+        self, mcp_client: MCPClient, tmp_path
+    ):
+        """По таймауту убиваются и процессы, запущенные командой"""
+        binary = tmp_path / "mcpgroupsleep"
+        shutil.copy(shutil.which("sleep"), binary)
+        result = mcp_client.call_tool(
+            "process_run",
+            {
+                "argv": ["sh", "-c", f"{binary} 30 & wait"],
+                "background": False,
+                "timeout_ms": 300,
+            },
+        )
+
+        assert not result.success
+        assert "timed out" in str(result.error)
+        time.sleep(0.2)
+        left = subprocess.run(
+            ["pgrep", "-x", "mcpgroupsleep"], capture_output=True, text=True
+        )
+        if left.stdout:
+            subprocess.run(["pkill", "-x", "mcpgroupsleep"])
+        assert left.stdout == "", f"Child survived the timeout: {left.stdout}"
+
+    def test_process_run_stream_sends_progress(self, mcp_client: MCPClient):
+        """process_run со stream=true присылает вывод в notifications/progress"""
+        mcp_client.get_notifications("notifications/progress")
+        result = mcp_client.call_tool(
+            "process_run",
+            {"command": "seq 1 5000", "background": False, "stream": True},
+            meta={"progressToken": "stream-test"},
+        )
+        assert result.success, f"process_run failed: {result.error}"
+
+        streamed = ""
+        deadline = time.time() + 3.0
+        while time.time() < deadline and not streamed.endswith("5000\n"):
+            for message in mcp_client.get_notifications("notifications/progress"):
+                params = message["params"]
+                assert params["progressToken"] == "stream-test"
+                streamed += params["message"]
+            time.sleep(0.05)
+
+        assert streamed == result.content["output"]
+
+    def test_process_run_argv_keeps_arguments_with_spaces(self, mcp_client: MCPClient):
+        """process_run с argv передаёт аргументы без разбиения по пробелам"""
+        result = mcp_client.call_tool(
+            "process_run",
+            {"argv": ["echo", "hello   world", "'quoted'"], "background": False},
+        )
+
+        assert result.success, f"process_run failed: {result.error}"
+        assert result.content["output"] == "hello   world 'quoted'\n"
+
+    def test_process_run_cwd_env_and_stdin(self, mcp_client: MCPClient):
+        """process_run применяет cwd, env и stdin"""
+        result = mcp_client.call_tool(
+            "process_run",
+            {
+                "argv": ["sh", "-c", 'echo "$MCP_TEST_VAR:$(pwd)"; cat'],
+                "cwd": "/tmp",
+                "env": {"MCP_TEST_VAR": "from env"},
+                "stdin": "from stdin",
+                "background": False,
+            },
+        )
+
+        assert result.success, f"process_run failed: {result.error}"
+        assert result.content["output"] == "from env:/tmp\nfrom stdin"
+
+    def test_process_run_env_null_unsets_variable(self, mcp_client: MCPClient):
+        """null в env удаляет переменную окружения"""
+        result = mcp_client.call_tool(
+            "process_run",
+            {"argv": ["env"], "env": {"HOME": None}, "background": False},
+        )
+
+        assert result.success, f"process_run failed: {result.error}"
+        assert "HOME=" not in result.content["output"]
+
+    def test_process_run_rejects_command_and_argv(self, mcp_client: MCPClient):
+        """process_run не принимает command и argv одновременно"""
+        result = mcp_client.call_tool(
+            "process_run", {"command": "echo a", "argv": ["echo", "b"]}
+        )
+
+        assert not result.success
+
     def test_process_run_background_returns_pid(self, mcp_client: MCPClient):
         """process_run в background режиме возвращает PID"""
         result = mcp_client.call_tool(
@@ -316,6 +545,364 @@ class TestProcessKill:
         # Поведение может варьироваться в зависимости от реализации
         # Некоторые системы могут вернуть успех, некоторые - ошибку
 
+    def test_process_kill_multiple_pids(self, mcp_client: MCPClient):
+        """process_kill принимает список PID"""
+        procs = [subprocess.Popen(["sleep", "30"]) for _ in range(3)]
+        try:
+            result = mcp_client.call_tool(
+                "process_kill", {"pids": [p.pid for p in procs], "signal": "TERM"}
+            )
+
+            assert result.success, f"process_kill failed: {result.error}"
+            assert sorted(result.content["signaled"]) == sorted(p.pid for p in procs)
+            for proc in procs:
+                assert proc.wait(timeout=5) == -15
+        finally:
+            for proc in procs:
+                proc.kill()
+
+    def test_process_kill_tree_escalates_to_kill(self, mcp_client: MCPClient):
+        """tree=true завершает потомков, force_after_ms добивает игнорирующих TERM"""
+        proc = subprocess.Popen(
+            ["sh", "-c", "trap '' TERM; sleep 30 & sleep 30 & while :; do sleep 1; done"],
+            start_new_session=True,
+        )
+        try:
+            time.sleep(0.2)
+            result = mcp_client.call_tool(
+                "process_kill",
+                {
+                    "pid": proc.pid,
+                    "tree": True,
+                    "signal": "TERM",
+                    "force_after_ms": 300,
+                },
+            )
+
+            assert result.success, f"process_kill failed: {result.error}"
+            assert len(result.content["signaled"]) >= 3
+            assert proc.pid in result.content["escalated"]
+            assert proc.wait(timeout=5) == -9
+        finally:
+            proc.kill()
+
+    def test_process_kill_group_of_process_run_child(self, mcp_client: MCPClient):
+        """group=true для потомка process_run завершает только его группу, не сервер"""
+        run = mcp_client.call_tool(
+            "process_run",
+            {"argv": ["sh", "-c", "sleep 30 & sleep 30 & wait"], "background": True},
+        )
+        assert run.success, f"process_run failed: {run.error}"
+        pid = run.content["pid"]
+        time.sleep(0.2)
+        assert os.getpgid(pid) == pid, "process_run child must lead its own group"
+
+        result = mcp_client.call_tool(
+            "process_kill", {"pid": pid, "group": True, "signal": "TERM"}
+        )
+
+        assert result.success, f"process_kill failed: {result.error}"
+        assert len(result.content["signaled"]) == 3
+        waited = mcp_client.call_tool("process_wait", {"pid": pid, "timeout_ms": 5000})
+        assert waited.success and waited.content["running"] is False
+        # Сервер и клиент живы
+        assert mcp_client.call_tool("system_get_info").success
+
+    def test_process_kill_by_name_pattern(self, mcp_client: MCPClient, tmp_path):
+        """process_kill по name_pattern завершает все совпавшие процессы"""
+        binary = tmp_path / "mcpkillme"
+        shutil.copy(shutil.which("sleep"), binary)
+        procs = [subprocess.Popen([str(binary), "30"]) for _ in range(2)]
+        try:
+            result = mcp_client.call_tool(
+                "process_kill", {"name_pattern": "mcpkillme"}
+            )
+
+            assert result.success, f"process_kill failed: {result.error}"
+            assert sorted(result.content["signaled"]) == sorted(p.pid for p in procs)
+        finally:
+            for proc in procs:
+                proc.kill()
+                proc.wait()
+
+    def test_process_kill_rejects_unknown_signal(self, mcp_client: MCPClient):
+        """Поддерживаются только TERM, KILL и INT"""
+        result = mcp_client.call_tool("process_kill", {"pid": 1, "signal": "HUP"})
+
+        assert not result.success
+
+
+class TestManagedProcesses:
+    """Тесты для process_status, process_output и process_wait"""
+
+    def _start(self, mcp_client: MCPClient, command: str) -> int:
+        result = mcp_client.call_tool(
+            "process_run", {"command": command, "background": True}
+        )
+        assert result.success, f"process_run failed: {result.error}"
+        return result.content["pid"]
+
+    def test_process_wait_returns_exit_code(self, mcp_client: MCPClient):
+        """process_wait дожидается выхода и возвращает код завершения"""
+        pid = self._start(mcp_client, "false")
+
+        result = mcp_client.call_tool("process_wait", {"pid": pid, "timeout_ms": 5000})
+
+        assert result.success, f"process_wait failed: {result.error}"
+        assert result.content["running"] is False
+        assert result.content["exit_code"] == 1
+
+    def test_process_wait_timeout_returns_running(self, mcp_client: MCPClient):
+        """process_wait по таймауту возвращает running=true"""
+        pid = self._start(mcp_client, "sleep 10")
+        try:
+            result = mcp_client.call_tool(
+                "process_wait", {"pid": pid, "timeout_ms": 100}
+            )
+            assert result.success
+            assert result.content["running"] is True
+            assert "exit_code" not in result.content
+        finally:
+            mcp_client.call_tool("process_kill", {"pid": pid})
+
+    def test_process_output_captures_stdout_and_stderr(self, mcp_client: MCPClient):
+        """process_output возвращает вывод фонового процесса по потокам"""
+        pid = self._start(mcp_client, "ls / /nonexistent_dir_12345")
+        mcp_client.call_tool("process_wait", {"pid": pid, "timeout_ms": 5000})
+
+        stdout = mcp_client.call_tool("process_output", {"pid": pid})
+        stderr = mcp_client.call_tool(
+            "process_output", {"pid": pid, "stream": "stderr"}
+        )
+
+        assert stdout.success and stderr.success
+        assert "tmp" in stdout.content["output"]
+        assert "nonexistent_dir_12345" in stderr.content["output"]
+        assert stdout.content["next_offset"] == len(
+            stdout.content["output"].encode("utf-8")
+        )
+
+    def test_process_output_offset_returns_only_new_output(
+        self, mcp_client: MCPClient
+    ):
+        """process_output с offset=next_offset не повторяет прочитанное"""
+        pid = self._start(mcp_client, "echo first")
+        mcp_client.call_tool("process_wait", {"pid": pid, "timeout_ms": 5000})
+
+        first = mcp_client.call_tool("process_output", {"pid": pid})
+        again = mcp_client.call_tool(
+            "process_output", {"pid": pid, "offset": first.content["next_offset"]}
+        )
+
+        assert first.content["output"] == "first\n"
+        assert again.content["output"] == ""
+        assert again.content["next_offset"] == first.content["next_offset"]
+
+    def test_process_output_complete_after_exit(self, mcp_client: MCPClient):
+        """После process_wait вывод полон, даже если процесс выдал его перед выходом"""
+        for _ in range(5):
+            result = mcp_client.call_tool(
+                "process_run",
+                {
+                    "argv": ["sh", "-c", "head -c 200000 /dev/zero | tr '\\0' x; echo END"],
+                    "background": True,
+                },
+            )
+            assert result.success, f"process_run failed: {result.error}"
+            pid = result.content["pid"]
+
+            waited = mcp_client.call_tool(
+                "process_wait", {"pid": pid, "timeout_ms": 5000}
+            )
+            assert waited.content["running"] is False
+            assert waited.content["stdout_bytes"] == 200004
+
+            output = mcp_client.call_tool(
+                "process_output", {"pid": pid, "offset": 200000}
+            )
+            assert output.content["output"] == "END\n"
+
+    def test_process_status_lists_background_processes(self, mcp_client: MCPClient):
+        """process_status без pid перечисляет фоновые процессы"""
+        pid = self._start(mcp_client, "true")
+        mcp_client.call_tool("process_wait", {"pid": pid, "timeout_ms": 5000})
+
+        result = mcp_client.call_tool("process_status")
+
+        assert result.success
+        pids = [p["pid"] for p in result.content["processes"]]
+        assert pid in pids
+
+    def test_background_process_is_reaped(self, mcp_client: MCPClient):
+        """Завершившийся фоновый процесс не остаётся зомби"""
+        pid = self._start(mcp_client, "true")
+        mcp_client.call_tool("process_wait", {"pid": pid, "timeout_ms": 5000})
+
+        assert not os.path.exists(f"/proc/{pid}"), "Process left a zombie entry"
+
+    def test_process_output_unknown_pid_fails(self, mcp_client: MCPClient):
+        """process_output для процесса не из process_run возвращает ошибку"""
+        result = mcp_client.call_tool("process_output", {"pid": 1})
+
+        assert not result.success
+
+
+class TestProcessStats:
+    """Тесты для process_stats и process_watch"""
+
+    @pytest.fixture
+    def busy_pid(self, mcp_client: MCPClient):
+        """Процесс, занимающий одно ядро CPU"""
+        result = mcp_client.call_tool(
+            "process_run",
+            {"argv": ["sh", "-c", "while :; do :; done"], "background": True},
+        )
+        pid = result.content["pid"]
+        yield pid
+        mcp_client.call_tool("process_watch", {"pid": pid, "stop": True})
+        mcp_client.call_tool("process_kill", {"pid": pid})
+
+    def test_process_stats_reports_cpu_and_memory(
+        self, mcp_client: MCPClient, busy_pid: int
+    ):
+        """process_stats показывает загрузку CPU и память процесса"""
+        result = mcp_client.call_tool(
+            "process_stats", {"pid": busy_pid, "interval_ms": 300}
+        )
+
+        assert result.success, f"process_stats failed: {result.error}"
+        stats = result.content["processes"][0]
+        assert stats["pid"] == busy_pid
+        assert stats["cpu_percent"] > 50
+        assert stats["rss"] > 0
+        assert stats["threads"] >= 1
+        assert stats["interval_ms"] >= 300
+
+    def test_process_stats_multiple_pids(self, mcp_client: MCPClient, current_pid):
+        """process_stats принимает несколько PID и сообщает об ошибке по каждому"""
+        result = mcp_client.call_tool(
+            "process_stats", {"pids": [current_pid, 999999999], "interval_ms": 100}
+        )
+
+        assert result.success, f"process_stats failed: {result.error}"
+        by_pid = {p["pid"]: p for p in result.content["processes"]}
+        assert "error" not in by_pid[current_pid]
+        assert "error" in by_pid[999999999]
+
+    def test_process_watch_serves_latest_sample(
+        self, mcp_client: MCPClient, busy_pid: int
+    ):
+        """Для наблюдаемого PID process_stats сразу отдаёт замер сэмплера"""
+        watch = mcp_client.call_tool(
+            "process_watch", {"pid": busy_pid, "interval_ms": 100}
+        )
+        assert watch.success, f"process_watch failed: {watch.error}"
+        assert busy_pid in watch.content["watched"]
+
+        time.sleep(0.5)
+        start = time.time()
+        result = mcp_client.call_tool(
+            "process_stats", {"pid": busy_pid, "history": True}
+        )
+        elapsed = time.time() - start
+
+        assert result.success
+        stats = result.content["processes"][0]
+        assert stats["watched"] is True
+        assert len(stats["history"]) >= 2
+        assert elapsed < 0.4, "Watched process should not wait for an interval"
+
+    def test_process_stats_requires_pid(self, mcp_client: MCPClient):
+        """process_stats требует pid или pids"""
+        result = mcp_client.call_tool("process_stats", {})
+
+        assert not result.success
+
+
+class TestProcessWaitFor:
+    """Тесты для process_wait_for"""
+
+    @pytest.fixture
+    def sleep_copy(self, tmp_path):
+        """Копия sleep с уникальным именем процесса"""
+        path = tmp_path / "mcpwaitfor"
+        shutil.copy(shutil.which("sleep"), path)
+        return str(path)
+
+    def test_wait_for_pid_exit(self, mcp_client: MCPClient):
+        """process_wait_for возвращается сразу после выхода процесса"""
+        run = mcp_client.call_tool(
+            "process_run", {"command": "sleep 0.5", "background": True}
+        )
+        pid = run.content["pid"]
+
+        start = time.time()
+        result = mcp_client.call_tool(
+            "process_wait_for", {"pid": pid, "timeout_ms": 5000}
+        )
+        elapsed = time.time() - start
+
+        assert result.success, f"process_wait_for failed: {result.error}"
+        assert result.content["status"] == "exited"
+        assert result.content["pid"] == pid
+        assert elapsed < 2
+
+    def test_wait_for_name_start(self, mcp_client: MCPClient, sleep_copy: str):
+        """process_wait_for находит процесс, запущенный во время ожидания"""
+        procs = []
+        timer = threading.Timer(
+            0.3, lambda: procs.append(subprocess.Popen([sleep_copy, "5"]))
+        )
+        timer.start()
+        try:
+            result = mcp_client.call_tool(
+                "process_wait_for", {"name": "mcpwaitfor", "timeout_ms": 5000}
+            )
+            timer.join()
+
+            assert result.success, f"process_wait_for failed: {result.error}"
+            assert result.content["status"] == "found"
+            assert result.content["pid"] == procs[0].pid
+            assert not result.content.get("already_running", False)
+        finally:
+            timer.cancel()
+            for proc in procs:
+                proc.kill()
+                proc.wait()
+
+    def test_wait_for_already_running(self, mcp_client: MCPClient, sleep_copy: str):
+        """Уже работающий процесс возвращается с already_running=true"""
+        proc = subprocess.Popen([sleep_copy, "5"])
+        try:
+            result = mcp_client.call_tool(
+                "process_wait_for",
+                {"name_pattern": "mcpwait*", "timeout_ms": 2000},
+            )
+
+            assert result.success, f"process_wait_for failed: {result.error}"
+            assert result.content["pid"] == proc.pid
+            assert result.content["already_running"] is True
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def test_wait_for_timeout(self, mcp_client: MCPClient):
+        """По таймауту возвращается status=timeout, а не ошибка"""
+        result = mcp_client.call_tool(
+            "process_wait_for",
+            {"name": "no_such_process_12345", "timeout_ms": 200},
+        )
+
+        assert result.success, f"process_wait_for failed: {result.error}"
+        assert result.content["status"] == "timeout"
+
+    def test_wait_for_requires_single_target(self, mcp_client: MCPClient):
+        """Нужен ровно один из pid, name, name_pattern"""
+        assert not mcp_client.call_tool("process_wait_for", {}).success
+        assert not mcp_client.call_tool(
+            "process_wait_for", {"pid": 1, "name": "sleep"}
+        ).success
+
 
 class TestProcessIntegration:
     """Интеграционные тесты для process tools"""
@@ -5,10 +5,19 @@ Tools:
 - system_get_info: Получить информацию о системе
 - util_sleep: Пауза на заданное время
 - alert_show: (пропускаем - требует интерактивности)
+
+Также: компактный JSON ответов, /metrics SSE транспорта, -debug-addr, -trace-file.
 """
 
+import json
 import pytest
+import socket
+import subprocess
+import threading
 import time
+import urllib.error
+import urllib.parse
+import urllib.request
 
 from .mcp_client import MCPClient
 
@@ -115,6 +124,27 @@ class TestUtilSleep:
         assert elapsed >= 450, f"Sleep was too short: {elapsed}ms"
         assert elapsed < 1000, f"Sleep was too long: {elapsed}ms"
 
+    def test_util_sleep_cancelled_by_notification(self, mcp_client: MCPClient):
+        """notifications/cancelled прерывает util_sleep без ожидания до конца"""
+        results = []
+        start = time.time()
+        caller = threading.Thread(
+            target=lambda: results.append(
+                mcp_client.call_tool("util_sleep", {"milliseconds": 10000})
+            )
+        )
+        caller.start()
+        time.sleep(0.3)
+
+        mcp_client.cancel_request(mcp_client.last_request_id, "test")
+        caller.join(timeout=5)
+        elapsed = time.time() - start
+
+        assert not caller.is_alive(), "util_sleep was not cancelled"
+        assert elapsed < 5, f"Cancellation took too long: {elapsed:.1f}s"
+        assert not results[0].success
+        assert "cancel" in str(results[0].error).lower()
+
 
 class TestMCPServerBasics:
     """Базовые тесты MCP сервера"""
@@ -158,3 +188,219 @@ class TestMCPServerBasics:
 
         # Ожидаем ошибку
         assert not result.success or "error" in str(result.raw_response).lower()
+
+    def test_json_response_is_compact_by_default(self, mcp_client: MCPClient):
+        """Текст JSON ответа компактный (без отступов) без флага -pretty"""
+        response = mcp_client.call_tool_raw("util_sleep", {"milliseconds": 0})
+
+        text = response["result"]["content"][0]["text"]
+        assert "\n" not in text, f"Response should be compact JSON: {text!r}"
+
+
+def metric_value(body: str, series: str) -> float:
+    """Значение серии Prometheus (0, если серии ещё нет)"""
+    for line in body.splitlines():
+        if line.startswith(series + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def sse_post(url: str, message: dict):
+    """POST JSON-RPC сообщения в сессию SSE (ответ приходит в поток /sse)"""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(message).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=5.0) as response:
+        assert response.status in (200, 202)
+
+
+class TestMetricsEndpoint:
+    """Тесты для /metrics SSE транспорта"""
+
+    def test_metrics_endpoint_exposes_tool_metrics(self, server_path: str):
+        """После вызова tool по SSE /metrics показывает его счётчик и гистограмму"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        base = f"http://127.0.0.1:{port}"
+
+        def scrape() -> str:
+            with urllib.request.urlopen(f"{base}/metrics", timeout=1.0) as response:
+                assert response.status == 200
+                assert "text/plain" in response.headers["Content-Type"]
+                return response.read().decode()
+
+        process = subprocess.Popen(
+            [server_path, "-t", "sse", "-h", "127.0.0.1", "-p", str(port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            before = None
+            deadline = time.time() + 5.0
+            while time.time() < deadline:
+                try:
+                    before = scrape()
+                    break
+                except (urllib.error.URLError, ConnectionError):
+                    time.sleep(0.1)
+            assert before is not None, "Metrics endpoint did not respond"
+            assert "# TYPE mcp_tool_calls_total counter" in before
+            assert "# TYPE mcp_tool_duration_seconds histogram" in before
+
+            calls = 'mcp_tool_calls_total{tool="util_sleep"}'
+            count = 'mcp_tool_duration_seconds_count{tool="util_sleep"}'
+            count_before = metric_value(before, count)
+
+            # Сессия SSE: первое событие потока — адрес для POST сообщений
+            with urllib.request.urlopen(f"{base}/sse", timeout=5.0) as stream:
+                endpoint = None
+                for raw in stream:
+                    line = raw.decode().strip()
+                    if line.startswith("data:"):
+                        endpoint = urllib.parse.urljoin(base, line[5:].strip())
+                        break
+                assert endpoint, "SSE stream did not announce the message endpoint"
+
+                sse_post(endpoint, {
+                    "jsonrpc": "2.0", "id": 1, "method": "initialize",
+                    "params": {
+                        "protocolVersion": "2024-11-05",
+                        "capabilities": {},
+                        "clientInfo": {"name": "metrics-test", "version": "1.0"},
+                    },
+                })
+                sse_post(endpoint, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+                sse_post(endpoint, {
+                    "jsonrpc": "2.0", "id": 2, "method": "tools/call",
+                    "params": {"name": "util_sleep", "arguments": {"milliseconds": 0}},
+                })
+
+                after = before
+                deadline = time.time() + 5.0
+                while time.time() < deadline and metric_value(after, calls) < 1:
+                    time.sleep(0.1)
+                    after = scrape()
+
+            assert metric_value(after, calls) >= 1, after
+            assert metric_value(after, count) > count_before, after
+        finally:
+            process.terminate()
+            process.wait(timeout=5)
+
+
+class TestDebugEndpoints:
+    """Тесты для флага -debug-addr (pprof, trace, дамп горутин)"""
+
+    def test_debug_addr_serves_pprof(self, server_path: str):
+        """С -debug-addr сервер отдаёт pprof индекс и дамп горутин"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        process = subprocess.Popen(
+            [server_path, "-t", "stdio", "-debug-addr", f"127.0.0.1:{port}"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            index = None
+            deadline = time.time() + 5.0
+            while time.time() < deadline:
+                try:
+                    with urllib.request.urlopen(
+                        f"http://127.0.0.1:{port}/debug/pprof/", timeout=1.0
+                    ) as response:
+                        index = response.read().decode()
+                        break
+                except (urllib.error.URLError, ConnectionError):
+                    time.sleep(0.1)
+
+            assert index is not None, "Debug endpoint did not respond"
+            assert "goroutine" in index
+
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{port}/debug/pprof/goroutine?debug=2", timeout=2.0
+            ) as response:
+                assert "goroutine" in response.read().decode()
+        finally:
+            process.stdin.close()
+            process.terminate()
+            process.wait(timeout=5)
+
+
+class TestTracing:
+    """Тесты для флага -trace-file (спаны вызовов tools)"""
+
+    def test_trace_file_records_tool_spans(self, server_path: str, tmp_path):
+        """С -trace-file каждый вызов tool записывается корневым спаном"""
+        trace_path = tmp_path / "spans.jsonl"
+
+        client = MCPClient(server_path, extra_args=["-trace-file", str(trace_path)])
+        client.start()
+        try:
+            result = client.call_tool("util_sleep", {"milliseconds": 0})
+            assert result.success
+
+            spans = []
+            deadline = time.time() + 5.0
+            while time.time() < deadline and not spans:
+                if trace_path.exists():
+                    spans = [
+                        json.loads(line)
+                        for line in trace_path.read_text().splitlines()
+                        if line.strip()
+                    ]
+                time.sleep(0.1)
+        finally:
+            client.stop()
+
+        names = [span["name"] for span in spans]
+        assert "tools/call util_sleep" in names, f"Root span not found: {names}"
+
+        root = spans[names.index("tools/call util_sleep")]
+        assert len(root["traceId"]) == 32
+        assert len(root["spanId"]) == 16
+        assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+
+
+class TestRequestTiming:
+    """Тесты для _meta.timing в результатах tools"""
+
+    def test_timing_absent_by_default(self, mcp_client: MCPClient):
+        """Без -timing и без запроса _meta.timing не добавляется"""
+        result = mcp_client.call_tool("util_sleep", {"milliseconds": 0})
+        assert result.success
+        assert result.timing is None
+
+    def test_timing_requested_per_call(self, mcp_client: MCPClient):
+        """_meta: {"timing": true} в запросе включает timing для одного вызова"""
+        result = mcp_client.call_tool(
+            "util_sleep", {"milliseconds": 50}, meta={"timing": True}
+        )
+        assert result.success
+
+        timing = result.timing
+        assert timing is not None, f"No _meta.timing in {result.raw_response}"
+        assert timing["handler_ms"] >= 40
+        assert timing["queue_wait_ms"] >= 0
+        assert timing["server_received_unix_ms"] > 0
+
+    def test_timing_flag_reports_capture_phases(self, server_path: str):
+        """С -timing screen_capture разбивает время на capture и encode"""
+        client = MCPClient(server_path, extra_args=["-timing"])
+        client.start()
+        try:
+            result = client.call_tool(
+                "screen_capture", {"x": 0, "y": 0, "width": 50, "height": 50}
+            )
+        finally:
+            client.stop()
+
+        assert result.success
+        phases = result.timing["phases_ms"]
+        for phase in ("robotgo.capture", "png.encode", "base64.encode"):
+            assert phase in phases, f"Phase {phase} missing: {phases}"
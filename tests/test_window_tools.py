@@ -11,6 +11,10 @@ Tools:
 - window_minimize: Свернуть окно
 - window_maximize: Развернуть окно
 - window_close: Закрыть окно
+- window_list: Список окон с фильтрами
+- window_wait_for: Ожидание появления, активации или остановки окна
+- window_capture: Снимок одного окна
+- window_arrange: Пакетная расстановка окон
 """
 
 import pytest
@@ -20,7 +24,24 @@ import os
 
 from .mcp_client import MCPClient
 from .gui_helper import _GUIWindowHelper as TestWindow
-from .conftest import assert_position_near, wait_for_condition
+from .conftest import (
+    assert_position_near,
+    decode_screenshot,
+    find_color_in_image,
+    wait_for_condition,
+)
+
+
+def wait_window_settled(mcp_client: MCPClient, pid: int, tolerance: int = 5, **expected):
+    """
+    Дождаться, пока окно дойдёт до expected (x, y, width, height) и перестанет
+    двигаться (вместо фиксированного sleep). Без expected первое наблюдение
+    может оказаться состоянием до реакции WM на запрос.
+    """
+    args = {"pid": pid, "condition": "settled", "settle_ms": 100, "timeout_ms": 2000}
+    if expected:
+        args.update(expected, tolerance=tolerance)
+    return mcp_client.call_tool("window_wait_for", args)
 
 
 class TestWindowGetActive:
@@ -160,6 +181,7 @@ class TestWindowSetActive:
         # Успех или понятная ошибка
         if result.success:
             assert result.content.get("status") == "success"
+            assert f"with PID {pid}" in result.content.get("message", "")
 
     def test_window_set_active_requires_pid(self, mcp_client: MCPClient):
         """window_set_active требует параметр pid"""
@@ -187,7 +209,7 @@ class TestWindowMove:
         if result.success:
             assert result.content.get("status") == "success"
 
-            time.sleep(0.2)
+            wait_window_settled(mcp_client, pid, x=target_x, y=target_y)
             test_window.update()
 
             # Проверяем позицию (может быть неточной из-за декораций окна)
@@ -209,7 +231,7 @@ class TestWindowMove:
             if not result.success:
                 break  # Если не поддерживается, прекращаем
 
-            time.sleep(0.1)
+            wait_window_settled(mcp_client, pid, x=x, y=y)
 
     def test_window_move_requires_params(self, mcp_client: MCPClient):
         """window_move требует pid, x и y"""
@@ -235,7 +257,10 @@ class TestWindowResize:
         if result.success:
             assert result.content.get("status") == "success"
 
-            time.sleep(0.2)
+            # Границы включают рамку WM, отсюда допуск
+            wait_window_settled(
+                mcp_client, pid, tolerance=50, width=target_width, height=target_height
+            )
             test_window.update()
 
     def test_window_resize_requires_params(self, mcp_client: MCPClient):
@@ -360,6 +385,302 @@ class TestWindowClose:
             pass
 
 
+class TestWindowList:
+    """Тесты для window_list tool"""
+
+    @pytest.mark.gui
+    def test_window_list_returns_windows(self, mcp_client: MCPClient):
+        """window_list возвращает окна с handle и границами"""
+        result = mcp_client.call_tool("window_list")
+
+        assert result.success, f"window_list failed: {result.error}"
+        assert result.content["count"] == len(result.content["windows"])
+        for window in result.content["windows"]:
+            for key in ("handle", "pid", "title", "class", "x", "y", "width", "height", "visible"):
+                assert key in window, f"Missing '{key}' field"
+
+    @pytest.mark.gui
+    def test_window_list_filters_by_title(
+        self, mcp_client: MCPClient, test_window: TestWindow
+    ):
+        """title_pattern находит тестовое окно"""
+        result = mcp_client.call_tool(
+            "window_list", {"title_pattern": "^MCP E2E Test Window$"}
+        )
+
+        assert result.success, f"window_list failed: {result.error}"
+        assert result.content["count"] >= 1
+        window = result.content["windows"][0]
+        assert window["title"] == "MCP E2E Test Window"
+        assert window["width"] > 0 and window["height"] > 0
+
+    @pytest.mark.gui
+    def test_window_list_filters_by_pid(
+        self, mcp_client: MCPClient, test_window: TestWindow
+    ):
+        """Фильтр pid возвращает только окна процесса"""
+        pid = test_window.get_pid()
+        result = mcp_client.call_tool("window_list", {"pid": pid})
+
+        assert result.success, f"window_list failed: {result.error}"
+        assert all(w["pid"] == pid for w in result.content["windows"])
+
+    @pytest.mark.gui
+    def test_window_list_no_match(self, mcp_client: MCPClient):
+        """Фильтр без совпадений возвращает пустой список"""
+        result = mcp_client.call_tool(
+            "window_list", {"title_pattern": "no such window 12345"}
+        )
+
+        assert result.success
+        assert result.content == {"windows": [], "count": 0}
+
+    def test_window_list_invalid_pattern(self, mcp_client: MCPClient):
+        """Некорректное регулярное выражение возвращает ошибку"""
+        result = mcp_client.call_tool("window_list", {"title_pattern": "("})
+
+        assert not result.success
+
+
+class TestWindowWaitFor:
+    """Тесты для window_wait_for tool"""
+
+    @pytest.mark.gui
+    def test_window_wait_for_exists(self, mcp_client: MCPClient):
+        """window_wait_for дожидается появления окна"""
+        helper = TestWindow()
+        helper.start()
+        try:
+            result = mcp_client.call_tool(
+                "window_wait_for",
+                {"title_pattern": "^MCP E2E Test Window$", "timeout_ms": 5000},
+            )
+
+            assert result.success, f"window_wait_for failed: {result.error}"
+            assert result.content["status"] == "exists"
+            assert result.content["window"]["title"] == "MCP E2E Test Window"
+        finally:
+            helper.stop()
+
+    @pytest.mark.gui
+    def test_window_wait_for_settled_after_move(
+        self, mcp_client: MCPClient, test_window: TestWindow
+    ):
+        """После window_move окно считается установившимся на новом месте"""
+        pid = test_window.get_pid()
+        move = mcp_client.call_tool("window_move", {"pid": pid, "x": 120, "y": 90})
+        if not move.success:
+            pytest.skip("window_move not supported for this window")
+
+        result = wait_window_settled(mcp_client, pid, x=120, y=90)
+
+        assert result.success, f"window_wait_for failed: {result.error}"
+        assert result.content["status"] == "settled"
+        assert_position_near(
+            (result.content["window"]["x"], result.content["window"]["y"]), (120, 90)
+        )
+        bounds = mcp_client.call_tool("window_get_bounds", {"pid": pid})
+        assert bounds.content["x"] == result.content["window"]["x"]
+        assert bounds.content["y"] == result.content["window"]["y"]
+
+    @pytest.mark.gui
+    def test_window_wait_for_timeout(self, mcp_client: MCPClient):
+        """По таймауту возвращается status=timeout, а не ошибка"""
+        start = time.time()
+        result = mcp_client.call_tool(
+            "window_wait_for",
+            {"title_pattern": "no such window 12345", "timeout_ms": 200},
+        )
+
+        assert result.success, f"window_wait_for failed: {result.error}"
+        assert result.content["status"] == "timeout"
+        assert "window" not in result.content
+        assert time.time() - start < 2
+
+    def test_window_wait_for_invalid_condition(self, mcp_client: MCPClient):
+        """Неизвестное условие возвращает ошибку"""
+        result = mcp_client.call_tool("window_wait_for", {"condition": "closed"})
+
+        assert not result.success
+
+
+class TestWindowHandle:
+    """Тесты для параметра handle (XID) у window_* tools"""
+
+    def _handle(self, mcp_client: MCPClient) -> dict:
+        result = mcp_client.call_tool(
+            "window_list", {"title_pattern": "^MCP E2E Test Window$"}
+        )
+        if not result.success or not result.content["windows"]:
+            pytest.skip("test window is not in window_list")
+        return result.content["windows"][0]
+
+    @pytest.mark.gui
+    def test_get_title_and_bounds_by_handle(
+        self, mcp_client: MCPClient, test_window: TestWindow
+    ):
+        """window_get_title и window_get_bounds принимают handle из window_list"""
+        window = self._handle(mcp_client)
+
+        title = mcp_client.call_tool("window_get_title", {"handle": window["handle"]})
+        bounds = mcp_client.call_tool("window_get_bounds", {"handle": window["handle"]})
+
+        assert title.success, f"window_get_title failed: {title.error}"
+        assert title.content["title"] == "MCP E2E Test Window"
+        assert bounds.success, f"window_get_bounds failed: {bounds.error}"
+        assert bounds.content == {
+            k: window[k] for k in ("x", "y", "width", "height")
+        }
+
+    @pytest.mark.gui
+    def test_move_by_handle(self, mcp_client: MCPClient, test_window: TestWindow):
+        """window_move по handle перемещает именно это окно"""
+        window = self._handle(mcp_client)
+
+        result = mcp_client.call_tool(
+            "window_move", {"handle": window["handle"], "x": 60, "y": 70}
+        )
+        assert result.success, f"window_move failed: {result.error}"
+
+        settled = wait_window_settled(mcp_client, window["pid"], x=60, y=70)
+        assert settled.success
+        assert settled.content["status"] == "settled"
+        assert settled.content["window"]["handle"] == window["handle"]
+        assert_position_near(
+            (settled.content["window"]["x"], settled.content["window"]["y"]), (60, 70)
+        )
+
+    @pytest.mark.gui
+    def test_active_window_xid_is_a_handle(self, mcp_client: MCPClient):
+        """Поле xid из window_get_active подходит для параметра handle"""
+        active = mcp_client.call_tool("window_get_active")
+        if not active.success or "xid" not in active.content:
+            pytest.skip("active window is not in the window index")
+
+        title = mcp_client.call_tool("window_get_title", {"handle": active.content["xid"]})
+
+        assert title.success
+        assert title.content["title"] == active.content["title"]
+
+    @pytest.mark.gui
+    def test_active_window_handle_matches_xid(self, mcp_client: MCPClient):
+        """Из индекса handle строится по XID и тоже годится для параметра handle"""
+        active = mcp_client.call_tool("window_get_active")
+        if not active.success or "xid" not in active.content:
+            pytest.skip("active window is not in the window index")
+
+        assert active.content["handle"] == {"XWin": active.content["xid"]}
+        bounds = mcp_client.call_tool(
+            "window_get_bounds", {"handle": active.content["handle"]}
+        )
+        assert bounds.success, f"window_get_bounds failed: {bounds.error}"
+
+    def test_invalid_handle_is_rejected(self, mcp_client: MCPClient):
+        """Некорректный handle возвращает ошибку"""
+        result = mcp_client.call_tool("window_get_bounds", {"handle": "not-a-window"})
+
+        assert not result.success
+
+
+class TestWindowCapture:
+    """Тесты для window_capture tool"""
+
+    @pytest.mark.gui
+    def test_window_capture_client_area(
+        self, mcp_client: MCPClient, test_window: TestWindow
+    ):
+        """window_capture возвращает снимок клиентской области окна"""
+        result = mcp_client.call_tool(
+            "window_capture", {"pid": test_window.get_pid()}
+        )
+
+        assert result.success, f"window_capture failed: {result.error}"
+        image_content, info = result.content
+        image = decode_screenshot(image_content)
+        assert (image.width, image.height) == (info["width"], info["height"])
+        assert find_color_in_image(image, (255, 0, 0), tolerance=50)
+
+    @pytest.mark.gui
+    def test_window_capture_offscreen(
+        self, mcp_client: MCPClient, test_window: TestWindow
+    ):
+        """offscreen=true читает содержимое окна через XComposite"""
+        windows = mcp_client.call_tool(
+            "window_list", {"title_pattern": "^MCP E2E Test Window$"}
+        )
+        if not windows.success or not windows.content["windows"]:
+            pytest.skip("test window is not in window_list")
+        handle = windows.content["windows"][0]["handle"]
+
+        result = mcp_client.call_tool(
+            "window_capture", {"handle": handle, "offscreen": True}
+        )
+        if not result.success and "XComposite" in str(result.error):
+            pytest.skip("XComposite is not available")
+
+        assert result.success, f"window_capture failed: {result.error}"
+        image_content, info = result.content
+        assert info["offscreen"] is True
+        image = decode_screenshot(image_content)
+        assert find_color_in_image(image, (0, 0, 255), tolerance=50)
+
+    def test_window_capture_requires_window(self, mcp_client: MCPClient):
+        """window_capture требует pid или handle"""
+        result = mcp_client.call_tool("window_capture", {})
+
+        assert not result.success
+
+
+class TestWindowArrange:
+    """Тесты для window_arrange tool"""
+
+    @pytest.mark.gui
+    def test_window_arrange_two_windows(
+        self, mcp_client: MCPClient, test_window: TestWindow
+    ):
+        """window_arrange расставляет несколько окон за один вызов"""
+        second = TestWindow()
+        second.start()
+        try:
+            pids = [test_window.get_pid(), second.get_pid()]
+            result = mcp_client.call_tool(
+                "window_arrange",
+                {
+                    "windows": [
+                        {"pid": pids[0], "x": 0, "y": 0, "width": 400, "height": 300},
+                        {"pid": pids[1], "x": 420, "y": 0, "width": 400, "height": 300},
+                    ]
+                },
+            )
+            if not result.success and "not found" in str(result.error):
+                pytest.skip("test windows are not in the window index")
+
+            assert result.success, f"window_arrange failed: {result.error}"
+            assert result.content["count"] == 2
+            by_pid = {w["pid"]: w for w in result.content["windows"]}
+            assert set(by_pid) == set(pids)
+            assert by_pid[pids[0]]["x"] < by_pid[pids[1]]["x"]
+        finally:
+            second.stop()
+
+    def test_window_arrange_requires_windows(self, mcp_client: MCPClient):
+        """window_arrange требует непустой список windows"""
+        assert not mcp_client.call_tool("window_arrange", {}).success
+        assert not mcp_client.call_tool("window_arrange", {"windows": []}).success
+
+    @pytest.mark.gui
+    def test_window_arrange_rejects_invalid_state(
+        self, mcp_client: MCPClient, test_window: TestWindow
+    ):
+        """Неизвестное состояние отклоняется до применения изменений"""
+        result = mcp_client.call_tool(
+            "window_arrange",
+            {"windows": [{"pid": test_window.get_pid(), "state": "rolled-up"}]},
+        )
+
+        assert not result.success
+
+
 class TestWindowIntegration:
     """Интеграционные тесты для window tools"""
 
@@ -406,7 +727,7 @@ class TestWindowIntegration:
         if not move_result.success:
             pytest.skip("window_move not supported for this window")
 
-        time.sleep(0.2)
+        wait_window_settled(mcp_client, pid, x=target_x, y=target_y)
 
         # Получаем границы
         bounds_result = mcp_client.call_tool("window_get_bounds", {"pid": pid})
@@ -437,7 +758,9 @@ class TestWindowIntegration:
         if not resize_result.success:
             pytest.skip("window_resize not supported for this window")
 
-        time.sleep(0.2)
+        wait_window_settled(
+            mcp_client, pid, tolerance=50, width=target_width, height=target_height
+        )
 
         # Получаем границы
         bounds_result = mcp_client.call_tool("window_get_bounds", {"pid": pid})
@@ -447,3 +770,26 @@ class TestWindowIntegration:
             # Допускаем погрешность
             actual_width = bounds_result.content["width"]
             actual_height = bounds_result.content["height"]
+
+    @pytest.mark.gui
+    def test_get_bounds_follows_move_without_sleep(
+        self, mcp_client: MCPClient, test_window: TestWindow
+    ):
+        """Индекс окон обновляется по событиям X: новые границы видны сразу"""
+        pid = test_window.get_pid()
+        before = mcp_client.call_tool("window_get_bounds", {"pid": pid})
+        if not before.success:
+            pytest.skip("window_get_bounds not supported for this window")
+
+        target_x = before.content["x"] + 40
+        move_result = mcp_client.call_tool(
+            "window_move", {"pid": pid, "x": target_x, "y": before.content["y"]}
+        )
+        if not move_result.success:
+            pytest.skip("window_move not supported for this window")
+
+        def moved():
+            bounds = mcp_client.call_tool("window_get_bounds", {"pid": pid})
+            return bounds.success and bounds.content["x"] != before.content["x"]
+
+        assert wait_for_condition(moved, timeout=2.0, interval=0.02)